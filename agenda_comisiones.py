@@ -0,0 +1,198 @@
+"""
+Agenda de consultas de reuniones por comisión.
+
+Muchas comisiones pasan meses sin reunirse. Con el histórico de reuniones_diputados.csv
+se estima la actividad de cada comisión y se decide en qué corridas pedir su listado
+de reuniones:
+- Una comisión activa se consulta en todas las corridas: la que se reunió en los
+  últimos DIAS_ACTIVA días o cuya última reunión no está atrasada respecto de su
+  frecuencia del último año (menos de FACTOR_FRECUENCIA veces el intervalo medio entre
+  sus reuniones de los últimos 365 días, si fueron al menos dos)
+- Una comisión inactiva se consulta cada vez menos: cuando desde la última consulta
+  pasó una fracción (FRACCION_INACTIVIDAD) de los días que lleva sin reunirse, con un
+  tope de INTERVALO_MAXIMO_DIAS. El intervalo se reduce a la mitad en los meses en los
+  que en otros años sí se reunió
+- Las comisiones sin reuniones registradas, o que todavía no se consultaron con la
+  agenda, se consultan siempre
+- Cada BARRIDO_COMPLETO_DIAS días se consultan todas, por las dudas
+
+Como el listado de reuniones es por año, a cada comisión se le piden también los años
+transcurridos desde su última consulta (por ejemplo, el anterior en la primera
+corrida de enero), así no se pierden reuniones de fin de año.
+
+La fecha de la última consulta completa de cada comisión y la del último barrido se
+guardan en .estado/agenda_comisiones.json.
+"""
+import csv
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+
+from estado import cargar_json, guardar_json, ruta_estado
+
+ARCHIVO_AGENDA = 'agenda_comisiones.json'
+
+DIAS_ACTIVA = 45
+FACTOR_FRECUENCIA = 1.5
+FRACCION_INACTIVIDAD = 0.25
+INTERVALO_MAXIMO_DIAS = 30
+BARRIDO_COMPLETO_DIAS = 60
+
+
+def interpretar_fecha(texto):
+    """Fecha de una reunión (dd/mm/aaaa o aaaa-mm-dd), o None"""
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime((texto or '').strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+class ActividadComision:
+    """Resumen de las reuniones registradas de una comisión"""
+
+    def __init__(self):
+        self.fechas = []
+        self.ultima = None
+        # Mes -> años en los que hubo alguna reunión ese mes
+        self.meses = defaultdict(set)
+
+    def agregar(self, fecha):
+        self.fechas.append(fecha)
+        self.ultima = fecha if self.ultima is None else max(self.ultima, fecha)
+        self.meses[fecha.month].add(fecha.year)
+
+    def intervalo_medio(self, hoy):
+        """Días promedio entre las reuniones de los últimos 365 días, o None si hubo menos de dos"""
+        recientes = sum(1 for fecha in self.fechas if 0 <= (hoy - fecha).days <= 365)
+        if recientes < 2:
+            return None
+        return 365 / recientes
+
+    def se_reune_en(self, mes, anio_actual):
+        """Si en otros años se reunió en ese mes"""
+        return any(anio != anio_actual for anio in self.meses.get(mes, ()))
+
+
+def leer_actividad(nombre_archivo):
+    """Actividad de cada comisión según el CSV de reuniones, leído fila por fila"""
+    actividad = defaultdict(ActividadComision)
+    if not os.path.exists(nombre_archivo):
+        return actividad
+    try:
+        with open(nombre_archivo, 'r', encoding='utf-8', newline='') as archivo:
+            for fila in csv.DictReader(archivo):
+                fecha = interpretar_fecha(fila.get('fecha'))
+                if fecha is not None and fila.get('comision_codigo'):
+                    actividad[fila['comision_codigo']].agregar(fecha)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"No se pudo leer la actividad de las comisiones desde {nombre_archivo}: {e}")
+    return actividad
+
+
+class AgendaComisiones:
+    """Decide qué comisiones consultar y registra las consultas hechas"""
+
+    def __init__(self, ruta=None, hoy=None):
+        self.ruta = ruta or ruta_estado(ARCHIVO_AGENDA)
+        self.hoy = hoy or date.today()
+        datos = cargar_json(self.ruta, {}) or {}
+        self.ultimo_barrido = datos.get('ultimo_barrido')
+        self.consultas = datos.get('consultas', {})
+        self.plan = None
+        self.barrido = False
+        self._lock = threading.Lock()
+        self._exitosas = defaultdict(set)
+
+    def _dias_desde(self, fecha_texto):
+        return (self.hoy - date.fromisoformat(fecha_texto)).days
+
+    def toca_barrido(self):
+        return self.ultimo_barrido is None or self._dias_desde(self.ultimo_barrido) >= BARRIDO_COMPLETO_DIAS
+
+    def motivo_consulta(self, codigo, actividad):
+        """
+        Por qué se consulta la comisión en esta corrida ('activa', 'vencida',
+        'sin_historial', 'sin_consultas'), o None si se puede saltear
+        """
+        if actividad is None or actividad.ultima is None:
+            return 'sin_historial'
+        ultima_consulta = self.consultas.get(codigo)
+        if ultima_consulta is None:
+            return 'sin_consultas'
+
+        inactiva = (self.hoy - actividad.ultima).days
+        intervalo_medio = actividad.intervalo_medio(self.hoy)
+        if inactiva <= DIAS_ACTIVA or (intervalo_medio and inactiva <= FACTOR_FRECUENCIA * intervalo_medio):
+            return 'activa'
+
+        intervalo = min(INTERVALO_MAXIMO_DIAS, inactiva * FRACCION_INACTIVIDAD)
+        if actividad.se_reune_en(self.hoy.month, self.hoy.year):
+            intervalo /= 2
+        if self._dias_desde(ultima_consulta) >= intervalo:
+            return 'vencida'
+        return None
+
+    def planificar(self, comisiones, actividad, anios, barrido_completo=False):
+        """
+        Devuelve {código: años a consultar} para cada comisión; una lista vacía indica
+        que en esta corrida no se piden sus reuniones. `anios` son los años que se
+        recorrerían sin agenda.
+        """
+        self.barrido = barrido_completo or self.toca_barrido()
+        motivos = defaultdict(int)
+        plan = {}
+        for comision in comisiones:
+            codigo = comision['codigo']
+            motivo = 'barrido' if self.barrido else self.motivo_consulta(codigo, actividad.get(codigo))
+            if motivo is None:
+                plan[codigo] = []
+                motivos['salteadas'] += 1
+                continue
+            motivos[motivo] += 1
+            # También los años transcurridos desde la última consulta, si la hubo
+            ultima_consulta = self.consultas.get(codigo)
+            desde = min(anios[0], int(ultima_consulta[:4])) if ultima_consulta else anios[0]
+            plan[codigo] = list(range(desde, anios[-1] + 1))
+
+        consultadas = len(plan) - motivos['salteadas']
+        if self.barrido:
+            print(f"Agenda de comisiones: barrido completo, se consultan las reuniones de las {consultadas} comisiones")
+        else:
+            detalle = ', '.join(f"{cantidad} {motivo.replace('_', ' ')}" for motivo, cantidad in sorted(motivos.items())
+                                if motivo != 'salteadas')
+            print(f"Agenda de comisiones: se consultan las reuniones de {consultadas} de {len(plan)} comisiones "
+                  f"({detalle}); se saltean {motivos['salteadas']} inactivas")
+        self.fijar_plan(plan, self.barrido)
+        return plan
+
+    def fijar_plan(self, plan, barrido=False):
+        """Usa un plan ya decidido (por ejemplo, el de una corrida que se reanuda)"""
+        self.plan = plan
+        self.barrido = barrido
+
+    def consultada(self, codigo, anio):
+        """Registra que se obtuvo el listado de reuniones de una comisión para un año"""
+        with self._lock:
+            self._exitosas[codigo].add(anio)
+
+    def guardar(self):
+        """
+        Guarda como consultadas hoy las comisiones cuyos años planificados se obtuvieron
+        todos, y el barrido completo si no faltó ninguna
+        """
+        hoy = self.hoy.isoformat()
+        completo = True
+        with self._lock:
+            for codigo, anios in (self.plan or {}).items():
+                if not anios:
+                    continue
+                if set(anios) <= self._exitosas.get(codigo, set()):
+                    self.consultas[codigo] = hoy
+                else:
+                    completo = False
+        if self.barrido and completo:
+            self.ultimo_barrido = hoy
+        guardar_json(self.ruta, {'ultimo_barrido': self.ultimo_barrido, 'consultas': self.consultas})
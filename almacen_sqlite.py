@@ -0,0 +1,383 @@
+"""
+Almacenamiento histórico en SQLite para los datasets de los scrapers.
+
+Cada dataset vive en una tabla con clave primaria e índices, y las combinaciones con
+los datos nuevos se hacen como upserts dentro de una transacción, en lugar de cargar y
+recorrer el CSV completo. Los CSV se siguen exportando para mantener la compatibilidad;
+la base guarda el hash de cada CSV exportado y, si el archivo cambió por otra vía
+(edición manual, otro modo de almacenamiento), la tabla se vuelve a importar desde él.
+"""
+import csv
+import hashlib
+import os
+from datetime import datetime
+
+from csv_comun import guardar_csv
+from estado import ruta_estado
+
+ARCHIVO_BASE = 'historico.sqlite'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sincronizacion (
+    tabla TEXT PRIMARY KEY,
+    archivo TEXT,
+    hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS reuniones (
+    comision_nombre TEXT,
+    comision_codigo TEXT NOT NULL,
+    id_reunion TEXT NOT NULL,
+    fecha TEXT,
+    anio,
+    texto TEXT,
+    url TEXT,
+    fecha_extraccion TEXT,
+    PRIMARY KEY (comision_codigo, id_reunion)
+);
+
+CREATE TABLE IF NOT EXISTS integrantes (
+    id INTEGER PRIMARY KEY,
+    comision_codigo TEXT NOT NULL,
+    comision_nombre TEXT,
+    codigo_diputado TEXT,
+    nombre_completo TEXT NOT NULL,
+    cargo TEXT,
+    bloque TEXT,
+    distrito TEXT,
+    fecha_inicio TEXT,
+    fecha_fin TEXT,
+    fecha_extraccion TEXT
+);
+CREATE INDEX IF NOT EXISTS integrantes_clave ON integrantes (comision_codigo, nombre_completo, bloque);
+CREATE INDEX IF NOT EXISTS integrantes_diputado ON integrantes (codigo_diputado);
+CREATE INDEX IF NOT EXISTS integrantes_periodo ON integrantes (comision_codigo, fecha_fin);
+
+CREATE TABLE IF NOT EXISTS legisladores (
+    nombre TEXT PRIMARY KEY,
+    perfil_url TEXT,
+    imagen_url TEXT,
+    bloque TEXT,
+    bloque_url TEXT,
+    mandato_inicio TEXT,
+    mandato_fin TEXT,
+    fecha_extraccion TEXT,
+    email TEXT,
+    telefono TEXT,
+    comisiones TEXT,
+    activo INTEGER,
+    fecha_alta TEXT,
+    fecha_baja TEXT
+);
+CREATE INDEX IF NOT EXISTS legisladores_activo ON legisladores (activo);
+
+CREATE TABLE IF NOT EXISTS sesiones (
+    id_sesion_lp TEXT PRIMARY KEY,
+    nro_orden_lp TEXT,
+    ano_parlamentario TEXT,
+    fecha TEXT,
+    id_sesion_tipo TEXT,
+    abrev_sesion_tipo TEXT,
+    dsc_sesion_tipo TEXT,
+    labor_documento TEXT,
+    prelabor_documento TEXT,
+    asuntos_considerados_documento TEXT,
+    archivo_vt TEXT,
+    url_detalle TEXT,
+    fecha_orden TEXT
+);
+CREATE INDEX IF NOT EXISTS sesiones_orden ON sesiones (fecha_orden, id_sesion_lp);
+"""
+
+# Columnas de legisladores que salen del perfil y se actualizan sólo si vienen en la corrida
+CAMPOS_DETALLE_LEGISLADOR = ('email', 'telefono', 'comisiones')
+
+# Orden en que se exporta cada tabla, el mismo que producen los scrapers con CSV
+ORDEN_EXPORTACION = {
+    'reuniones': 'rowid',
+    'integrantes': 'id',
+    'legisladores': 'rowid',
+    'sesiones': 'fecha_orden, id_sesion_lp',
+}
+
+
+def fecha_orden(valor):
+    """Fecha de sesión normalizada a yyyy-mm-dd para ordenar; vacía si no se puede leer"""
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(valor or '', fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return ''
+
+
+def huella_archivo(ruta):
+    """Tamaño e instante de modificación del archivo, o None si no existe"""
+    if not os.path.exists(ruta):
+        return None
+    estado = os.stat(ruta)
+    return estado.st_size, estado.st_mtime_ns
+
+
+def hash_archivo(ruta):
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, 'rb') as archivo:
+        return hashlib.sha256(archivo.read()).hexdigest()
+
+
+class AlmacenSQLite:
+    """Base SQLite con las tablas históricas de los tres scrapers"""
+
+    def __init__(self, ruta=None):
+        # sqlite3 sólo se importa si se usa la base
+        import sqlite3
+
+        self.ruta = ruta or ruta_estado(ARCHIVO_BASE)
+        self.conexion = sqlite3.connect(self.ruta)
+        self.conexion.row_factory = sqlite3.Row
+        self.conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def _columnas(self, tabla):
+        return [fila['name'] for fila in self.conexion.execute(f"PRAGMA table_info({tabla})") if fila['name'] != 'id']
+
+    def _insertar(self, tabla, filas, conflicto='ABORT'):
+        columnas = self._columnas(tabla)
+        sql = (f"INSERT OR {conflicto} INTO {tabla} ({', '.join(columnas)}) "
+               f"VALUES ({', '.join('?' for _ in columnas)})")
+        cursor = self.conexion.executemany(sql, ([self._valor(tabla, c, fila) for c in columnas] for fila in filas))
+        return cursor.rowcount
+
+    def _valor(self, tabla, columna, fila):
+        if tabla == 'sesiones' and columna == 'fecha_orden':
+            return fecha_orden(fila.get('fecha'))
+        valor = fila.get(columna)
+        if tabla == 'legisladores' and columna == 'activo':
+            if isinstance(valor, str):
+                valor = valor.lower() == 'true'
+            return None if valor is None else int(bool(valor))
+        return valor
+
+    def sincronizar_csv(self, tabla, archivo):
+        """
+        Importa el CSV a la tabla si la base no refleja su contenido actual
+        (primera vez, o el archivo cambió desde la última exportación).
+        """
+        firma = hash_archivo(archivo)
+        registro = self.conexion.execute(
+            "SELECT hash FROM sincronizacion WHERE tabla = ?", (tabla,)
+        ).fetchone()
+        if registro and registro['hash'] == firma:
+            return False
+
+        with self.conexion:
+            self.conexion.execute(f"DELETE FROM {tabla}")
+            if firma is not None:
+                with open(archivo, 'r', encoding='utf-8', newline='') as entrada:
+                    self._insertar(tabla, csv.DictReader(entrada), conflicto='REPLACE')
+            self._registrar_firma(tabla, archivo, firma)
+        print(f"Se importó {archivo} a la tabla {tabla} de {self.ruta}")
+        return True
+
+    def _registrar_firma(self, tabla, archivo, firma):
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO sincronizacion (tabla, archivo, hash) VALUES (?, ?, ?)",
+            (tabla, archivo, firma),
+        )
+
+    def filas(self, tabla):
+        """Devuelve la tabla completa como lista de diccionarios, en orden de exportación"""
+        columnas = [c for c in self._columnas(tabla) if c != 'fecha_orden']
+        cursor = self.conexion.execute(
+            f"SELECT {', '.join(columnas)} FROM {tabla} ORDER BY {ORDEN_EXPORTACION[tabla]}"
+        )
+        filas = [dict(fila) for fila in cursor]
+        if tabla == 'legisladores':
+            for fila in filas:
+                fila['activo'] = bool(fila['activo'])
+        return filas
+
+    def contar(self, tabla):
+        return self.conexion.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+    def exportar_csv(self, tabla, archivo, campos, filas=None, clave=None):
+        """
+        Exporta la tabla al CSV de siempre (si cambió algo más que las columnas
+        volátiles, ver csv_comun.guardar_csv) y, si el archivo se reescribió, recuerda su
+        hash. Si no se reescribió, la base y el CSV sólo difieren en fecha_extraccion y
+        sigue valiendo el hash ya registrado.
+        """
+        filas = self.filas(tabla) if filas is None else filas
+        antes = huella_archivo(archivo)
+        if not guardar_csv(filas, archivo, campos, clave):
+            return False
+        if huella_archivo(archivo) != antes:
+            with self.conexion:
+                self._registrar_firma(tabla, archivo, hash_archivo(archivo))
+        return True
+
+    def agregar_reuniones(self, reuniones):
+        """Inserta las reuniones cuya clave (comision_codigo, id_reunion) no existe. Devuelve cuántas"""
+        with self.conexion:
+            return self._insertar('reuniones', reuniones, conflicto='IGNORE')
+
+    def comisiones_integrantes(self):
+        """Códigos de las comisiones que tienen algún período de integrantes"""
+        return {fila[0] for fila in self.conexion.execute("SELECT DISTINCT comision_codigo FROM integrantes")}
+
+    def actualizar_integrantes(self, nuevos, fecha_actual, comisiones=None):
+        """
+        Actualiza el histórico de integrantes con la composición actual, con el mismo
+        criterio que historial_integrantes.HistorialIntegrantes.actualizar: quien sigue
+        extiende la fecha_fin de su período abierto, quien ya no está deja de extenderse y quien
+        aparece o vuelve a la comisión abre un período nuevo. Con `comisiones` sólo se
+        cierran los períodos de esas comisiones.
+        """
+        # Si una clave se repite en la extracción, vale la última aparición
+        dict_nuevos = {}
+        for integrante in nuevos:
+            dict_nuevos[(integrante['comision_codigo'], integrante['nombre_completo'], integrante['bloque'])] = integrante
+
+        agregados = []
+        with self.conexion:
+            # Fecha de la última corrida que vio cada comisión: los períodos que terminan ahí están abiertos
+            ultimas_fechas = dict(self.conexion.execute(
+                "SELECT comision_codigo, MAX(COALESCE(fecha_fin, '')) FROM integrantes GROUP BY comision_codigo"
+            ).fetchall())
+
+            self.conexion.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS claves_actuales (comision_codigo TEXT, nombre_completo TEXT, bloque TEXT)"
+            )
+            self.conexion.execute("DELETE FROM claves_actuales")
+            self.conexion.executemany("INSERT INTO claves_actuales VALUES (?, ?, ?)", dict_nuevos.keys())
+
+            # Cerramos en su fecha_inicio los períodos sin fecha_fin de quienes ya no están
+            filtro_comisiones = ''
+            parametros = [fecha_actual]
+            if comisiones is not None:
+                comisiones = list(comisiones)
+                filtro_comisiones = f"AND comision_codigo IN ({', '.join('?' for _ in comisiones)})"
+                parametros.extend(comisiones)
+            self.conexion.execute(
+                f"""
+                UPDATE integrantes SET fecha_fin = COALESCE(NULLIF(fecha_inicio, ''), ?)
+                WHERE (fecha_fin IS NULL OR fecha_fin = '')
+                  {filtro_comisiones}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM claves_actuales c
+                      WHERE c.comision_codigo = integrantes.comision_codigo
+                        AND c.nombre_completo = integrantes.nombre_completo
+                        AND c.bloque = integrantes.bloque
+                  )
+                """,
+                parametros,
+            )
+
+            for (comision, nombre, bloque), nuevo in dict_nuevos.items():
+                # El período abierto es el último de la clave, si sigue hasta la última corrida
+                ultimo = self.conexion.execute(
+                    """
+                    SELECT id, fecha_fin FROM integrantes
+                    WHERE comision_codigo = ? AND nombre_completo = ? AND bloque = ?
+                    ORDER BY id DESC LIMIT 1
+                    """,
+                    (comision, nombre, bloque),
+                ).fetchone()
+                if ultimo and (not ultimo['fecha_fin'] or ultimo['fecha_fin'] == ultimas_fechas.get(comision)):
+                    self.conexion.execute(
+                        "UPDATE integrantes SET cargo = ?, distrito = ?, fecha_fin = ? WHERE id = ?",
+                        (nuevo['cargo'], nuevo['distrito'], fecha_actual, ultimo['id']),
+                    )
+                else:
+                    agregados.append(dict(nuevo, fecha_inicio=fecha_actual, fecha_fin=fecha_actual))
+
+            self._insertar('integrantes', agregados)
+        return len(agregados)
+
+    def integrantes_en_fecha(self, comision_codigo, fecha):
+        """Integrantes de una comisión en una fecha dada (yyyy-mm-dd)"""
+        cursor = self.conexion.execute(
+            """
+            SELECT * FROM integrantes
+            WHERE comision_codigo = ? AND fecha_inicio <= ? AND (fecha_fin IS NULL OR fecha_fin = '' OR fecha_fin >= ?)
+            ORDER BY fecha_inicio, id
+            """,
+            (comision_codigo, fecha, fecha),
+        )
+        return [dict(fila) for fila in cursor]
+
+    def nombres_legisladores(self):
+        return {fila['nombre'] for fila in self.conexion.execute("SELECT nombre FROM legisladores")}
+
+    def combinar_legisladores(self, nuevos, fecha_actual, cambios=None):
+        """
+        Actualiza el histórico de legisladores con la lista actual, con el mismo criterio
+        que scraper_legiscaba.combinar_legisladores_historicos.
+        Si se pasa una lista en `cambios`, se le agregan los nombres dados de alta, de
+        baja, reincorporados o que cambiaron de bloque.
+        Devuelve (actualizados, inactivados, nuevos_agregados).
+        """
+        if cambios is None:
+            cambios = []
+        dict_nuevos = {leg['nombre']: leg for leg in nuevos}
+        actualizados = 0
+        agregados = []
+        with self.conexion:
+            self.conexion.execute("CREATE TEMP TABLE IF NOT EXISTS nombres_actuales (nombre TEXT PRIMARY KEY)")
+            self.conexion.execute("DELETE FROM nombres_actuales")
+            self.conexion.executemany("INSERT INTO nombres_actuales VALUES (?)", ((n,) for n in dict_nuevos))
+
+            condicion_baja = """
+                WHERE (activo IS NULL OR activo = 1)
+                  AND nombre NOT IN (SELECT nombre FROM nombres_actuales)
+            """
+            cambios.extend(fila['nombre'] for fila in self.conexion.execute(
+                f"SELECT nombre FROM legisladores {condicion_baja}"
+            ))
+            inactivados = self.conexion.execute(
+                f"UPDATE legisladores SET activo = 0, fecha_baja = ? {condicion_baja}",
+                (fecha_actual,),
+            ).rowcount
+
+            for nombre, nuevo in dict_nuevos.items():
+                anterior = self.conexion.execute(
+                    "SELECT bloque, activo FROM legisladores WHERE nombre = ?", (nombre,)
+                ).fetchone()
+                if anterior is None or anterior['bloque'] != nuevo['bloque'] or anterior['activo'] == 0:
+                    cambios.append(nombre)
+                cursor = self.conexion.execute(
+                    """
+                    UPDATE legisladores
+                    SET bloque = ?, bloque_url = ?, imagen_url = ?, fecha_extraccion = ?, activo = 1
+                    WHERE nombre = ?
+                    """,
+                    (nuevo['bloque'], nuevo['bloque_url'], nuevo['imagen_url'], nuevo['fecha_extraccion'], nombre),
+                )
+                if cursor.rowcount:
+                    actualizados += 1
+                    # Detalles del perfil, si se refrescaron en esta corrida
+                    detalles = {campo: nuevo[campo] for campo in CAMPOS_DETALLE_LEGISLADOR if campo in nuevo}
+                    if detalles:
+                        self.conexion.execute(
+                            f"UPDATE legisladores SET {', '.join(f'{campo} = ?' for campo in detalles)} WHERE nombre = ?",
+                            (*detalles.values(), nombre),
+                        )
+                else:
+                    agregados.append(dict(nuevo, activo=True, fecha_alta=fecha_actual))
+
+            self._insertar('legisladores', agregados)
+        return actualizados, inactivados, len(agregados)
+
+    def upsert_sesiones(self, sesiones):
+        """Inserta o reemplaza sesiones por id_sesion_lp. Devuelve cuántas se escribieron"""
+        with self.conexion:
+            return self._insertar('sesiones', sesiones, conflicto='REPLACE')
+
+    def ultima_fecha_sesion(self):
+        fila = self.conexion.execute(
+            "SELECT MAX(fecha_orden) FROM sesiones WHERE fecha_orden != ''"
+        ).fetchone()
+        return fila[0] if fila else None
@@ -0,0 +1,160 @@
+"""
+Análisis del histórico de legisladores mantenidos de forma incremental.
+
+En lugar de reconstruir todas las tablas a partir del histórico completo en cada
+corrida, se guardan en el directorio de estado los agregados (legisladores activos
+por bloque, altas por mes, activos por año de inicio de mandato, histórico por bloque)
+junto con el aporte de cada legislador a ellos. En cada corrida sólo se aplican los
+legisladores que cambiaron (altas, bajas, cambios de bloque, reincorporaciones).
+
+El estado recuerda el hash del CSV histórico que describe: si el CSV cambió por otra
+vía, o si se pide con RECALCULAR_ANALISIS=true, los agregados se recalculan completos.
+"""
+import calendar
+import csv
+import io
+import re
+from collections import Counter
+
+from csv_comun import escribir_si_cambia
+from estado import cargar_json, guardar_json, ruta_estado
+
+ARCHIVO_ESTADO = 'analisis_legisladores.json'
+
+ARCHIVO_BLOQUES = 'analisis_bloques_actuales.csv'
+ARCHIVO_ROTACION = 'analisis_rotacion_mensual.csv'
+ARCHIVO_PERIODOS = 'analisis_periodos_actuales.csv'
+ARCHIVO_HISTORIAL = 'historial_bloques.csv'
+
+
+def es_activo(valor):
+    if isinstance(valor, str):
+        return valor.lower() == 'true'
+    return bool(valor)
+
+
+def aporte(legislador):
+    """Lo que un legislador suma a los agregados: [bloque, activo, año de inicio, mes de alta]"""
+    anio = re.search(r'\d{4}', legislador.get('mandato_inicio') or '')
+    fecha_alta = legislador.get('fecha_alta') or ''
+    mes_alta = fecha_alta[:7] if re.match(r'\d{4}-\d{2}-\d{2}', fecha_alta) else None
+    return [
+        legislador.get('bloque') or '',
+        es_activo(legislador.get('activo')),
+        int(anio.group()) if anio else None,
+        mes_alta,
+    ]
+
+
+class AnalisisLegisladores:
+    """Agregados del histórico de legisladores con el aporte de cada uno"""
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or ruta_estado(ARCHIVO_ESTADO)
+        self.firma = None
+        self.aportes = {}
+        self.bloques_activos = Counter()
+        self.periodos_activos = Counter()
+        self.altas_por_mes = Counter()
+        self.historial_bloques = Counter()
+        self._cargar()
+
+    def _cargar(self):
+        datos = cargar_json(self.ruta, None)
+        if not datos:
+            return
+        self.firma = datos.get('firma')
+        self.aportes = datos.get('aportes', {})
+        self.bloques_activos = Counter(dict(datos.get('bloques_activos', [])))
+        self.periodos_activos = Counter(dict(datos.get('periodos_activos', [])))
+        self.altas_por_mes = Counter(dict(datos.get('altas_por_mes', [])))
+        self.historial_bloques = Counter({(b, a): n for b, a, n in datos.get('historial_bloques', [])})
+
+    def vigente(self, firma_historico):
+        """Indica si los agregados guardados corresponden al CSV histórico con esa firma"""
+        return self.firma is not None and self.firma == firma_historico
+
+    def _sumar(self, valores, signo):
+        bloque, activo, anio, mes_alta = valores
+        self.historial_bloques[(bloque, activo)] += signo
+        if activo:
+            self.bloques_activos[bloque] += signo
+            if anio is not None:
+                self.periodos_activos[anio] += signo
+        if mes_alta is not None:
+            self.altas_por_mes[mes_alta] += signo
+
+    def recalcular(self, legisladores):
+        """Recalcula todos los agregados a partir del histórico completo"""
+        self.aportes = {}
+        self.bloques_activos = Counter()
+        self.periodos_activos = Counter()
+        self.altas_por_mes = Counter()
+        self.historial_bloques = Counter()
+        self.aplicar_cambios(legisladores)
+
+    def aplicar_cambios(self, legisladores):
+        """Actualiza los agregados con el estado actual de los legisladores indicados"""
+        cambiados = 0
+        for legislador in legisladores:
+            nuevo = aporte(legislador)
+            anterior = self.aportes.get(legislador['nombre'])
+            if anterior == nuevo:
+                continue
+            if anterior is not None:
+                self._sumar(anterior, -1)
+            self._sumar(nuevo, 1)
+            self.aportes[legislador['nombre']] = nuevo
+            cambiados += 1
+        return cambiados
+
+    def guardar(self, firma_historico):
+        self.firma = firma_historico
+        guardar_json(self.ruta, {
+            'firma': self.firma,
+            'aportes': self.aportes,
+            'bloques_activos': sorted(self._positivos(self.bloques_activos).items()),
+            'periodos_activos': sorted(self._positivos(self.periodos_activos).items()),
+            'altas_por_mes': sorted(self._positivos(self.altas_por_mes).items()),
+            'historial_bloques': sorted([b, a, n] for (b, a), n in self._positivos(self.historial_bloques).items()),
+        })
+
+    @staticmethod
+    def _positivos(contador):
+        return {clave: cantidad for clave, cantidad in contador.items() if cantidad > 0}
+
+    def _escribir(self, nombre_archivo, encabezado, filas):
+        # Si el análisis no cambió, el archivo se deja como está
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(encabezado)
+        writer.writerows(filas)
+        escribir_si_cambia(nombre_archivo, buffer.getvalue())
+
+    def exportar(self):
+        """Escribe los CSV de análisis a partir de los agregados"""
+        bloques = sorted(self._positivos(self.bloques_activos).items(), key=lambda par: (-par[1], par[0]))
+        self._escribir(ARCHIVO_BLOQUES, ['Bloque', 'Cantidad'], bloques)
+
+        # El año se escribe como decimal (2019.0), igual que cuando se calculaba con pandas
+        periodos = [(float(anio), cantidad) for anio, cantidad in sorted(self._positivos(self.periodos_activos).items())]
+        self._escribir(ARCHIVO_PERIODOS, ['Año de inicio', 'Cantidad'], periodos)
+
+        self._escribir(ARCHIVO_ROTACION, ['Mes', 'Nuevos_Legisladores'], self._rotacion_mensual())
+
+        historial = sorted((b, a, n) for (b, a), n in self._positivos(self.historial_bloques).items())
+        self._escribir(ARCHIVO_HISTORIAL, ['Bloque', 'Activo', 'Cantidad'], historial)
+
+    def _rotacion_mensual(self):
+        """Altas por mes, del primero al último con altas, incluyendo los meses sin altas"""
+        meses = sorted(self._positivos(self.altas_por_mes))
+        if not meses:
+            return []
+        anio, mes = map(int, meses[0].split('-'))
+        ultimo = tuple(map(int, meses[-1].split('-')))
+        filas = []
+        while (anio, mes) <= ultimo:
+            fin_de_mes = f"{anio:04d}-{mes:02d}-{calendar.monthrange(anio, mes)[1]:02d}"
+            filas.append((fin_de_mes, self.altas_por_mes.get(f"{anio:04d}-{mes:02d}", 0)))
+            anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+        return filas
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Compara los backends de parseo HTML sobre páginas reales ya descargadas.
+
+Toma como corpus las páginas guardadas en la caché HTTP (ver cache_http.py) y, si se
+indican, archivos HTML con la tabla de legisladores ya renderizada. Cada página se
+extrae con la configuración original ('html.parser', documento completo) y con cada
+alternativa (lxml y/o parseo parcial). Informa el tiempo por página de cada una y
+termina con código 1 si alguna extracción no es idéntica a la original.
+
+Uso:
+    python benchmark_parseo.py
+    python benchmark_parseo.py --repeticiones 5 --legisladores debug_pagina_selenium.html
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+
+import scraper
+from cache_http import CacheHTTP
+from parseo import backend_disponible
+
+REFERENCIA = ("html.parser", False)
+ALTERNATIVAS = [
+    ("html.parser", True),
+    ("lxml", False),
+    ("lxml", True),
+]
+
+PATRON_INTEGRANTES = re.compile(r"/permanentes/([^/]+)/integrantes\.html$")
+PATRON_REUNIONES = re.compile(r"/permanentes/([^/]+)/reuniones/listado-partes\.html\?year=(\d+)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de backends de parseo HTML.")
+    parser.add_argument(
+        "--repeticiones",
+        type=int,
+        default=3,
+        help="Veces que se extrae cada página con cada configuración. Default: 3.",
+    )
+    parser.add_argument(
+        "--legisladores",
+        nargs="*",
+        default=[p for p in ("debug_pagina_selenium.html",) if os.path.exists(p)],
+        help="Archivos HTML con la tabla #data-integrantes renderizada.",
+    )
+    return parser.parse_args()
+
+
+def extractor_para_url(url: str):
+    """Devuelve la función de extracción que corresponde a la URL, o None"""
+    if url == scraper.URL_BASE:
+        return lambda html, parser, parcial: scraper.extraer_comisiones(html, parser, parcial)
+    coincidencia = PATRON_INTEGRANTES.search(url)
+    if coincidencia:
+        codigo = coincidencia.group(1)
+        return lambda html, parser, parcial: scraper.extraer_integrantes(html, codigo, codigo, parser, parcial)
+    coincidencia = PATRON_REUNIONES.search(url)
+    if coincidencia:
+        codigo, anio = coincidencia.group(1), int(coincidencia.group(2))
+        return lambda html, parser, parcial: scraper.extraer_reuniones(html, codigo, codigo, anio, parser, parcial)
+    return None
+
+
+def armar_corpus(archivos_legisladores: list[str]) -> list[tuple[str, str, object]]:
+    corpus = []
+    cache = CacheHTTP()
+    for url in sorted(cache._indice):
+        extractor = extractor_para_url(url)
+        if extractor is None:
+            continue
+        cuerpo, entrada = cache.obtener(url)
+        if cuerpo is None:
+            continue
+        html = cuerpo.decode(entrada.get("encoding") or "utf-8", errors="replace")
+        corpus.append((url, html, extractor))
+
+    if archivos_legisladores:
+        try:
+            import scraper_legiscaba
+        except ImportError as exc:
+            print(f"No se pueden medir los legisladores ({exc})", file=sys.stderr)
+        else:
+            for ruta in archivos_legisladores:
+                with open(ruta, "r", encoding="utf-8") as archivo:
+                    html = archivo.read()
+                corpus.append(
+                    (ruta, html, lambda html, parser, parcial: scraper_legiscaba.extraer_legisladores(html, parser, parcial))
+                )
+    return corpus
+
+
+def medir(corpus, parser: str, parcial: bool, repeticiones: int) -> tuple[float, list]:
+    resultados = []
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _, html, extractor in corpus:
+            for _ in range(repeticiones):
+                resultado = extractor(html, parser, parcial)
+            resultados.append(resultado)
+    segundos = time.perf_counter() - inicio
+    return segundos * 1000 / (len(corpus) * repeticiones), resultados
+
+
+def main() -> int:
+    args = parse_args()
+    corpus = armar_corpus(args.legisladores)
+    if not corpus:
+        print(
+            "No hay páginas para medir: ejecute antes scraper.py con la caché activa "
+            "o indique archivos con --legisladores.",
+            file=sys.stderr,
+        )
+        return 2
+
+    print(f"Páginas en el corpus: {len(corpus)}")
+    ms_referencia, esperados = medir(corpus, *REFERENCIA, args.repeticiones)
+    print(f"{'parser':<12} {'parcial':<8} {'ms/página':>10} {'aceleración':>12}  resultado")
+    print(f"{REFERENCIA[0]:<12} {'no':<8} {ms_referencia:>10.2f} {1:>11.2f}x  referencia")
+
+    hay_diferencias = False
+    for parser, parcial in ALTERNATIVAS:
+        if not backend_disponible(parser):
+            print(f"{parser:<12} {'sí' if parcial else 'no':<8} {'-':>10} {'-':>12}  no instalado")
+            continue
+        ms, obtenidos = medir(corpus, parser, parcial, args.repeticiones)
+        diferentes = [url for (url, _, _), a, b in zip(corpus, esperados, obtenidos) if a != b]
+        estado = "idéntico" if not diferentes else f"{len(diferentes)} páginas distintas"
+        print(f"{parser:<12} {'sí' if parcial else 'no':<8} {ms:>10.2f} {ms_referencia / ms:>11.2f}x  {estado}")
+        for url in diferentes:
+            print(f"    difiere: {url}")
+        hay_diferencias = hay_diferencias or bool(diferentes)
+
+    return 1 if hay_diferencias else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
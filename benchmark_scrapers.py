@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Mide los scrapers de punta a punta sin salir a la red.
+
+Con --grabar se ejecutan contra los sitios reales y cada respuesta queda en el
+directorio de fixtures (ver fixtures_http.py). Sin --grabar se levanta el servidor de
+fixtures y los scrapers le envían sus solicitudes mediante REMAPEO_URLS, con la latencia
+y la proporción de errores indicadas.
+
+Cada scraper corre en un proceso aparte, en un directorio temporal vacío (como una
+primera ejecución), sin caché HTTP y sin las pausas entre solicitudes. Se informa:
+páginas por segundo, milisegundos de parseo por página (extrayendo de nuevo las
+respuestas grabadas), memoria residente máxima y tiempo total.
+
+Uso:
+    python benchmark_scrapers.py --grabar
+    python benchmark_scrapers.py --latencia 0.05 --concurrencia 4
+    python benchmark_scrapers.py --scrapers sesiones --errores 0.05 --json resultados.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from fixtures_http import ArchivoFixtures, ServidorFixtures
+
+DIRECTORIO_REPO = os.path.dirname(os.path.abspath(__file__))
+SCRAPERS = ("diputados", "legiscaba", "sesiones")
+
+HOSTS = {
+    "diputados": ("www.hcdn.gob.ar",),
+    "legiscaba": ("legislatura.gob.ar", "www.legislatura.gob.ar", "parlamentaria.legislatura.gob.ar/webservices/Json.asmx/GetDiputadosActivosNuevo"),
+    "sesiones": ("parlamentaria.legislatura.gob.ar/webservices/Json.asmx/GetSesionesAvanzado",),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de los scrapers con respuestas grabadas.")
+    parser.add_argument(
+        "--fixtures",
+        default="fixtures",
+        help="Directorio de respuestas grabadas. Default: fixtures.",
+    )
+    parser.add_argument(
+        "--grabar",
+        action="store_true",
+        help="Ejecuta los scrapers contra los sitios reales y graba sus respuestas.",
+    )
+    parser.add_argument(
+        "--scrapers",
+        nargs="+",
+        choices=SCRAPERS,
+        default=list(SCRAPERS),
+        help="Scrapers a medir. Default: todos.",
+    )
+    parser.add_argument(
+        "--concurrencia",
+        type=int,
+        default=1,
+        help="Descargas en paralelo de cada scraper. Default: 1.",
+    )
+    parser.add_argument(
+        "--latencia",
+        type=float,
+        default=0.0,
+        help="Segundos que el servidor de fixtures demora cada respuesta. Default: 0.",
+    )
+    parser.add_argument(
+        "--errores",
+        type=float,
+        default=0.0,
+        help="Proporción de respuestas 503 simuladas. Default: 0.",
+    )
+    parser.add_argument(
+        "--con-pausas",
+        action="store_true",
+        help="Mantiene las pausas entre solicitudes de los scrapers.",
+    )
+    parser.add_argument(
+        "--json",
+        help="Guarda los resultados en este archivo JSON.",
+    )
+    return parser.parse_args()
+
+
+def comando_scraper(nombre: str, concurrencia: int, fecha_hasta: str) -> tuple[list[str], dict[str, str]]:
+    """Comando y variables de entorno de una corrida de primera ejecución"""
+    if nombre == "diputados":
+        return [sys.executable, "scraper.py", "--concurrencia", str(concurrencia)], {}
+    if nombre == "legiscaba":
+        return [sys.executable, "scraper_legiscaba.py"], {
+            "MODO_LEGISLADORES": "http",
+            "CONCURRENCIA_DETALLES": str(concurrencia),
+        }
+    # Rango fijo: el mismo de la grabación, para que se pidan los mismos rangos de fechas
+    return [
+        sys.executable, "scrape_sesiones.py",
+        "--desde", "01/01/1997", "--hasta", fecha_hasta,
+        "--formato", "csv", "--salida", "sesiones_legislatura.csv",
+        "--workers", str(concurrencia),
+    ], {}
+
+
+def ejecutar(comando: list[str], entorno: dict[str, str], directorio: str) -> tuple[int, float, int]:
+    """Ejecuta un scraper y devuelve (código de salida, segundos, RSS máximo en KB)"""
+    with open(os.path.join(directorio, "salida.log"), "w", encoding="utf-8") as log:
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(
+            [comando[0], os.path.join(DIRECTORIO_REPO, comando[1]), *comando[2:]],
+            cwd=directorio,
+            env=entorno,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        # wait4 devuelve el uso de recursos de este proceso en particular
+        _, estado, uso = os.wait4(proceso.pid, 0)
+        proceso.returncode = os.waitstatus_to_exitcode(estado)
+        segundos = time.perf_counter() - inicio
+    return proceso.returncode, segundos, uso.ru_maxrss
+
+
+def extractor_para(entrada: dict):
+    """Función que extrae los datos de una respuesta grabada, según su URL"""
+    url = entrada["url"]
+    if "www.hcdn.gob.ar" in url:
+        import benchmark_parseo
+
+        extractor = benchmark_parseo.extractor_para_url(url)
+        return None if extractor is None else lambda cuerpo: extractor(cuerpo.decode("utf-8", errors="replace"), None, True)
+    if url.endswith("GetSesionesAvanzado"):
+        import scrape_sesiones
+
+        return lambda cuerpo: list(scrape_sesiones.decode_sessions([cuerpo]))
+    if url.endswith("GetDiputadosActivosNuevo"):
+        import scraper_legiscaba
+
+        return lambda cuerpo: scraper_legiscaba.extraer_legisladores(
+            scraper_legiscaba.armar_tabla_legisladores(scraper_legiscaba.extraer_registros_servicio(cuerpo))
+        )
+    if "legislatura.gob.ar" in url:
+        import scraper_legiscaba
+
+        return lambda cuerpo: scraper_legiscaba.extraer_detalles_legislador(cuerpo.decode("utf-8", errors="replace"))
+    return None
+
+
+def pertenece(entrada: dict, nombre: str) -> bool:
+    url = entrada["url"].split("://", 1)[-1]
+    return any(url.startswith(host) for host in HOSTS[nombre])
+
+
+def medir_parseo(archivo: ArchivoFixtures, nombre: str) -> float | None:
+    """Milisegundos promedio de extracción por página grabada del scraper"""
+    paginas = []
+    for entrada, cuerpo in archivo.entradas():
+        if entrada["status"] != 200 or not pertenece(entrada, nombre):
+            continue
+        extractor = extractor_para(entrada)
+        if extractor is not None:
+            paginas.append((extractor, cuerpo))
+    if not paginas:
+        return None
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for extractor, cuerpo in paginas:
+            extractor(cuerpo)
+    return (time.perf_counter() - inicio) * 1000 / len(paginas)
+
+
+def main() -> int:
+    args = parse_args()
+    directorio_fixtures = os.path.abspath(args.fixtures)
+    archivo = ArchivoFixtures(directorio_fixtures)
+
+    servidor = None
+    if args.grabar:
+        fecha_hasta = datetime.now().strftime("%d/%m/%Y")
+    else:
+        if not len(archivo):
+            print(f"No hay respuestas grabadas en {args.fixtures}: ejecute antes con --grabar.", file=sys.stderr)
+            return 2
+        fecha_hasta = datetime.strptime(archivo.fecha_grabacion, "%Y-%m-%d").strftime("%d/%m/%Y")
+        servidor = ServidorFixtures(archivo, latencia=args.latencia, errores=args.errores)
+        servidor.iniciar_en_segundo_plano()
+
+    resultados = []
+    try:
+        for nombre in args.scrapers:
+            directorio = tempfile.mkdtemp(prefix=f"benchmark_{nombre}_")
+            comando, variables = comando_scraper(nombre, args.concurrencia, fecha_hasta)
+            entorno = dict(os.environ, **variables)
+            entorno.update(
+                SCRAPPERTOWN_ESTADO=os.path.join(directorio, ".estado"),
+                CACHE_HTTP="false",
+                PYTHONPATH=DIRECTORIO_REPO,
+            )
+            if not args.con_pausas:
+                entorno["ESCALA_PAUSAS"] = "0"
+            if servidor is not None:
+                entorno["REMAPEO_URLS"] = servidor.remapeo()
+                servidor.reiniciar_contadores()
+            else:
+                entorno["GRABAR_FIXTURES"] = directorio_fixtures
+                grabadas_antes = len(ArchivoFixtures(directorio_fixtures))
+
+            print(f"Ejecutando {nombre}...", file=sys.stderr)
+            codigo, segundos, rss_kb = ejecutar(comando, entorno, directorio)
+
+            if servidor is not None:
+                contadores = dict(servidor.contadores)
+            else:
+                contadores = {"solicitudes": len(ArchivoFixtures(directorio_fixtures)) - grabadas_antes}
+            paginas = contadores["solicitudes"]
+            resultados.append({
+                "scraper": nombre,
+                "codigo_salida": codigo,
+                "paginas": paginas,
+                "paginas_por_segundo": paginas / segundos if segundos else 0.0,
+                "ms_parseo_por_pagina": medir_parseo(ArchivoFixtures(directorio_fixtures), nombre),
+                "rss_max_mb": rss_kb / 1024,
+                "segundos": segundos,
+                "sin_fixture": contadores.get("sin_fixture", 0),
+                "errores_simulados": contadores.get("errores", 0),
+            })
+            if codigo == 0:
+                shutil.rmtree(directorio, ignore_errors=True)
+            else:
+                print(f"{nombre} terminó con código {codigo}; salida en {directorio}", file=sys.stderr)
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+            servidor.server_close()
+
+    print(f"{'scraper':<10} {'páginas':>8} {'pág/s':>8} {'ms parseo':>10} {'RSS MB':>8} {'segundos':>9} {'sin fixture':>12} {'errores':>8}")
+    for r in resultados:
+        parseo = "-" if r["ms_parseo_por_pagina"] is None else f"{r['ms_parseo_por_pagina']:.2f}"
+        print(
+            f"{r['scraper']:<10} {r['paginas']:>8} {r['paginas_por_segundo']:>8.1f} {parseo:>10} "
+            f"{r['rss_max_mb']:>8.1f} {r['segundos']:>9.1f} {r['sin_fixture']:>12} {r['errores_simulados']:>8}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo_json:
+            json.dump({"modo": "grabar" if args.grabar else "reproducir", "resultados": resultados},
+                      archivo_json, ensure_ascii=False, indent=2)
+
+    return 1 if any(r["codigo_salida"] != 0 for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
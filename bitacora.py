@@ -0,0 +1,99 @@
+"""
+Bitácora de recorrido para reanudar un scrapeo interrumpido.
+
+Cada unidad de trabajo terminada (por ejemplo: integrantes de una comisión, o las
+reuniones de una comisión en un año) se agrega como una línea JSON con sus filas,
+y se fuerza a disco antes de seguir. Si la corrida se corta, la siguiente puede
+reanudarse (--resume) tomando de la bitácora lo ya descargado.
+"""
+import json
+import os
+import threading
+
+
+def leer_bitacora(ruta):
+    """
+    Devuelve (encabezado, {clave: filas}) de una bitácora; ignora una última línea
+    escrita a medias
+    """
+    encabezado = None
+    completadas = {}
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        for linea in archivo:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                break
+            if 'encabezado' in registro:
+                encabezado = registro['encabezado']
+            else:
+                completadas[registro['clave']] = registro['filas']
+    return encabezado, completadas
+
+
+class BitacoraCrawl:
+    """Registro append-only de unidades de trabajo completadas"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.encabezado = None
+        self._completadas = {}
+        self._lock = threading.Lock()
+        self._archivo = None
+
+    def _leer(self):
+        return leer_bitacora(self.ruta)
+
+    def iniciar(self, encabezado, reanudar=False):
+        """
+        Abre la bitácora. Con reanudar=True conserva lo registrado por una corrida
+        anterior y devuelve su encabezado; si no, empieza una bitácora nueva.
+        """
+        if reanudar and os.path.exists(self.ruta):
+            self.encabezado, self._completadas = self._leer()
+            if self.encabezado is not None:
+                print(f"Reanudando desde {self.ruta}: {len(self._completadas)} unidades ya completadas")
+                self._archivo = open(self.ruta, 'a', encoding='utf-8')
+                return self.encabezado
+            print(f"La bitácora {self.ruta} no tiene encabezado, se empieza de cero")
+        elif os.path.exists(self.ruta):
+            print(f"Se descarta la bitácora de una corrida incompleta anterior ({self.ruta}); use --resume para reanudarla")
+
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        self.encabezado = encabezado
+        self._completadas = {}
+        self._archivo = open(self.ruta, 'w', encoding='utf-8')
+        self._escribir({'encabezado': encabezado})
+        return encabezado
+
+    def _escribir(self, registro):
+        self._archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def filas(self, clave):
+        """
+        Filas de una unidad completada en la corrida que se reanuda, o None si falta
+        hacerla. Cada unidad se entrega una sola vez y deja de ocupar memoria.
+        """
+        with self._lock:
+            return self._completadas.pop(clave, None)
+
+    def registrar(self, clave, filas):
+        # Las filas quedan sólo en disco: en memoria no se acumula el recorrido
+        with self._lock:
+            self._escribir({'clave': clave, 'filas': filas})
+
+    def cerrar(self):
+        """Cierra la bitácora conservándola en disco"""
+        with self._lock:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+
+    def finalizar(self):
+        """Cierra y borra la bitácora una vez que los resultados quedaron guardados"""
+        self.cerrar()
+        with self._lock:
+            if os.path.exists(self.ruta):
+                os.remove(self.ruta)
@@ -0,0 +1,153 @@
+"""
+Caché HTTP en disco con solicitudes condicionales.
+
+Cada URL descargada se guarda con su ETag, Last-Modified y el hash SHA-256 del cuerpo.
+En la siguiente corrida se envían If-None-Match / If-Modified-Since y, si el servidor
+responde 304, se reutiliza el cuerpo guardado. Además se puede asociar a cada página el
+resultado ya extraído de ella, para no volver a parsearla mientras su hash no cambie.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from estado import cargar_json, escribir_atomico, guardar_json, ruta_estado
+
+# Límites por defecto de la caché
+MAX_BYTES = 200 * 1024 * 1024
+MAX_EDAD_DIAS = 60
+
+
+def hash_contenido(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+
+class CacheHTTP:
+    """Caché persistente de respuestas indexada por URL"""
+
+    def __init__(self, directorio=None, max_bytes=MAX_BYTES, max_edad_dias=MAX_EDAD_DIAS):
+        self.directorio = directorio or os.path.dirname(ruta_estado('cache_http', 'indice.json'))
+        os.makedirs(self.directorio, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_edad_dias = max_edad_dias
+        self._ruta_indice = os.path.join(self.directorio, 'indice.json')
+        self._indice = cargar_json(self._ruta_indice, {})
+        self._lock = threading.Lock()
+        self._modificado = False
+
+    def _ruta(self, url, extension):
+        clave = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directorio, f"{clave}.{extension}")
+
+    def encabezados_condicionales(self, url):
+        """Encabezados para preguntar al servidor si la página cambió desde la última descarga"""
+        with self._lock:
+            entrada = self._indice.get(url)
+        if not entrada or not os.path.exists(self._ruta(url, 'bin')):
+            return {}
+        encabezados = {}
+        if entrada.get('etag'):
+            encabezados['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            encabezados['If-Modified-Since'] = entrada['last_modified']
+        return encabezados
+
+    def obtener(self, url, revalidada=False):
+        """
+        Devuelve (cuerpo, metadatos) de la página guardada, o (None, None). Con
+        revalidada=True (el servidor respondió 304) la entrada cuenta como recién
+        guardada, así las páginas que se piden seguido y no cambian no vencen.
+        """
+        with self._lock:
+            entrada = self._indice.get(url)
+            if not entrada:
+                return None, None
+            entrada['usado'] = time.time()
+            if revalidada:
+                entrada['guardado'] = entrada['usado']
+            self._modificado = True
+        try:
+            with open(self._ruta(url, 'bin'), 'rb') as archivo:
+                return archivo.read(), dict(entrada)
+        except OSError:
+            return None, None
+
+    def guardar(self, url, contenido, encabezados, encoding=None):
+        """Guarda el cuerpo de una respuesta 200 y devuelve su hash"""
+        digest = hash_contenido(contenido)
+        with self._lock:
+            anterior = self._indice.get(url, {})
+            if anterior.get('hash') != digest:
+                escribir_atomico(self._ruta(url, 'bin'), contenido, modo='wb')
+            ahora = time.time()
+            self._indice[url] = {
+                'etag': encabezados.get('ETag'),
+                'last_modified': encabezados.get('Last-Modified'),
+                'content_type': encabezados.get('Content-Type'),
+                'encoding': encoding,
+                'hash': digest,
+                'tamanio': len(contenido),
+                'guardado': ahora,
+                'usado': ahora,
+                # El resultado extraído sólo vale si corresponde al mismo cuerpo
+                'resultado_hash': anterior.get('resultado_hash') if anterior.get('hash') == digest else None,
+            }
+            self._modificado = True
+        return digest
+
+    def resultado(self, url, digest):
+        """Devuelve el resultado extraído de la página si fue calculado sobre el mismo cuerpo"""
+        with self._lock:
+            entrada = self._indice.get(url)
+            if not entrada or not digest or entrada.get('resultado_hash') != digest:
+                return None
+        try:
+            with open(self._ruta(url, 'json'), 'r', encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except (OSError, ValueError):
+            return None
+
+    def guardar_resultado(self, url, digest, datos):
+        """Asocia a la página el resultado extraído de un cuerpo con el hash indicado"""
+        with self._lock:
+            entrada = self._indice.get(url)
+            if not entrada or entrada.get('hash') != digest:
+                return
+            escribir_atomico(self._ruta(url, 'json'), json.dumps(datos, ensure_ascii=False))
+            entrada['resultado_hash'] = digest
+            self._modificado = True
+
+    def _eliminar(self, url):
+        for extension in ('bin', 'json'):
+            ruta = self._ruta(url, extension)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        del self._indice[url]
+
+    def purgar(self):
+        """
+        Elimina las entradas que no se guardaron ni revalidaron en los últimos
+        max_edad_dias y, si se supera el tamaño máximo, las usadas hace más tiempo
+        """
+        with self._lock:
+            limite = time.time() - self.max_edad_dias * 86400
+            for url in [u for u, e in self._indice.items() if e.get('guardado', 0) < limite]:
+                self._eliminar(url)
+                self._modificado = True
+
+            total = sum(e.get('tamanio', 0) for e in self._indice.values())
+            if total > self.max_bytes:
+                for url in sorted(self._indice, key=lambda u: self._indice[u].get('usado', 0)):
+                    total -= self._indice[url].get('tamanio', 0)
+                    self._eliminar(url)
+                    self._modificado = True
+                    if total <= self.max_bytes:
+                        break
+
+    def guardar_indice(self):
+        self.purgar()
+        with self._lock:
+            if self._modificado:
+                guardar_json(self._ruta_indice, self._indice)
+                self._modificado = False
@@ -0,0 +1,300 @@
+"""
+Cliente HTTP compartido por los scrapers.
+
+Mantiene una única sesión de requests con pool de conexiones por host (keep-alive),
+pide las respuestas comprimidas con gzip/deflate y usa los mismos encabezados y
+timeouts en todas las descargas. Las solicitudes GET pasan por la caché en disco
+(ver cache_http.py), salvo que se desactive con CACHE_HTTP=false. Las solicitudes que
+piden una pausa se espacian con un limitador adaptativo por host (ver limitador_http.py).
+
+Para medir sin red (ver fixtures_http.py y benchmark_scrapers.py):
+- GRABAR_FIXTURES=<directorio> guarda cada respuesta recibida
+- REMAPEO_URLS='origen=destino;...' envía las solicitudes cuya URL empieza con un
+  origen al destino correspondiente, por ejemplo al servidor de fixtures
+- ESCALA_PAUSAS multiplica las esperas del limitador entre solicitudes (0 lo desactiva)
+
+requests se importa al crear el cliente, no al importar el módulo: los comandos que no
+descargan nada (--help, modos livianos) no pagan ese costo.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from cache_http import CacheHTTP
+from limitador_http import LimitadorAIMD
+from metricas import obtener_metricas
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+HEADERS_POR_DEFECTO = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'es-AR,es;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Timeouts por defecto en segundos: (conexión, lectura)
+TIMEOUT_CONEXION = 10
+TIMEOUT_LECTURA = 30
+
+# Conexiones que se mantienen abiertas por host y solicitudes simultáneas permitidas por host
+CONEXIONES_POR_HOST = 10
+CONCURRENCIA_POR_HOST = 2
+
+
+def leer_remapeo(valor):
+    """Interpreta REMAPEO_URLS: pares origen=destino separados por ';'"""
+    remapeo = []
+    for par in (valor or '').split(';'):
+        origen, separador, destino = par.strip().partition('=')
+        if separador and origen:
+            remapeo.append((origen, destino))
+    return remapeo
+
+
+class ClienteHTTP:
+    """Sesión HTTP reutilizable con pool de conexiones y cupo de concurrencia por host"""
+
+    def __init__(self, timeout=None, conexiones_por_host=CONEXIONES_POR_HOST,
+                 concurrencia_por_host=CONCURRENCIA_POR_HOST, headers=None, cache=None,
+                 remapeo=None, fixtures=None, escala_pausas=None, limitador=None):
+        self.timeout = timeout or (TIMEOUT_CONEXION, TIMEOUT_LECTURA)
+        self.cache = cache
+        self.concurrencia_por_host = max(1, concurrencia_por_host)
+        self.remapeo = leer_remapeo(os.environ.get('REMAPEO_URLS')) if remapeo is None else remapeo
+        if fixtures is None and os.environ.get('GRABAR_FIXTURES'):
+            from fixtures_http import ArchivoFixtures
+
+            fixtures = ArchivoFixtures(os.environ['GRABAR_FIXTURES'])
+        self.fixtures = fixtures
+        if escala_pausas is None:
+            escala_pausas = float(os.environ.get('ESCALA_PAUSAS', '1'))
+        self.escala_pausas = escala_pausas
+        if limitador is None and escala_pausas > 0:
+            limitador = LimitadorAIMD(escala=escala_pausas)
+        self.limitador = limitador
+
+        import requests
+
+        self.sesion = requests.Session()
+        self.sesion.headers.update(HEADERS_POR_DEFECTO)
+        if headers:
+            self.sesion.headers.update(headers)
+
+        self.conexiones_por_host = conexiones_por_host
+        self._montar_adaptador()
+
+        self._semaforos_host = {}
+        self._lock = threading.Lock()
+
+    def _montar_adaptador(self):
+        from requests.adapters import HTTPAdapter
+
+        adaptador = HTTPAdapter(pool_connections=10,
+                                pool_maxsize=max(self.conexiones_por_host, self.concurrencia_por_host))
+        self.sesion.mount('https://', adaptador)
+        self.sesion.mount('http://', adaptador)
+
+    def fijar_concurrencia_por_host(self, concurrencia_por_host):
+        """Cambia el cupo de solicitudes simultáneas por host entre corridas, conservando la sesión"""
+        concurrencia_por_host = max(1, concurrencia_por_host)
+        if concurrencia_por_host == self.concurrencia_por_host:
+            return
+        with self._lock:
+            self.concurrencia_por_host = concurrencia_por_host
+            self._semaforos_host = {}
+        if concurrencia_por_host > self.conexiones_por_host:
+            self._montar_adaptador()
+
+    @contextmanager
+    def limite_host(self, url):
+        """Reserva un lugar en el cupo de solicitudes simultáneas del host de la URL"""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaforo = self._semaforos_host.get(host)
+            if semaforo is None:
+                semaforo = threading.BoundedSemaphore(self.concurrencia_por_host)
+                self._semaforos_host[host] = semaforo
+        with semaforo:
+            yield
+
+    def solicitar(self, metodo, url, pausa=None, timeout=None, etiqueta=None, **kwargs):
+        """
+        Hace una solicitud respetando el cupo del host.
+        Si se indica `pausa` (mínimo, máximo), antes de enviarla se espera el turno que
+        asigna el limitador del host, para no sobrecargar el servidor: el ritmo se adapta
+        a sus respuestas y nunca es más lento que una solicitud cada `máximo` segundos.
+        La solicitud queda registrada en las métricas de la corrida, agrupada por `etiqueta`.
+        """
+        metricas = obtener_metricas()
+        host = urlparse(url).netloc
+        limitar = bool(pausa) and self.limitador is not None
+        with self.limite_host(url):
+            if limitar:
+                with metricas.fase('pausas'):
+                    self.limitador.esperar(host, pausa)
+            destino = self.remapear(url)
+            inicio = time.perf_counter()
+            try:
+                with metricas.fase('descarga'):
+                    response = self.sesion.request(metodo, destino, timeout=timeout or self.timeout, **kwargs)
+            except Exception as e:
+                segundos = time.perf_counter() - inicio
+                metricas.registrar_solicitud(metodo, url, None, segundos, etiqueta=etiqueta, error=type(e).__name__)
+                if limitar:
+                    self._ajustar_ritmo(host, None, segundos)
+                raise
+            # Con stream=True el cuerpo todavía no se leyó: se usa el largo declarado
+            bytes_respuesta = (int(response.headers.get('Content-Length') or 0) if kwargs.get('stream')
+                               else len(response.content))
+            segundos = time.perf_counter() - inicio
+            response.registro_metricas = metricas.registrar_solicitud(
+                metodo, url, response.status_code, segundos, bytes_respuesta, etiqueta
+            )
+            if limitar:
+                self._ajustar_ritmo(host, response.status_code, segundos, response.headers.get('Retry-After'))
+            if self.fixtures is not None:
+                self.fixtures.grabar(metodo, self.remapear(response.request.url, inverso=True),
+                                     response.request.body, response)
+            return response
+
+    def _ajustar_ritmo(self, host, status, segundos, retry_after=None):
+        ajuste = self.limitador.observar(host, status, segundos, retry_after)
+        if ajuste:
+            obtener_metricas().contar(f"limitador_{ajuste}")
+
+    def remapear(self, url, inverso=False):
+        """Aplica REMAPEO_URLS a una URL (o lo deshace, con inverso=True)"""
+        for origen, destino in self.remapeo:
+            if inverso:
+                origen, destino = destino, origen
+            if url.startswith(origen):
+                return destino + url[len(origen):]
+        return url
+
+    def get(self, url, usar_cache=True, **kwargs):
+        """
+        Descarga una página. Con caché activa se hace una solicitud condicional y la
+        respuesta queda marcada con `hash_contenido` y `desde_cache`.
+        """
+        if not (usar_cache and self.cache) or self.fixtures is not None:
+            # Al grabar fixtures se piden las páginas completas, no respuestas 304
+            return self.solicitar('GET', url, **kwargs)
+
+        headers_pedidos = kwargs.pop('headers', None) or {}
+        headers = {**headers_pedidos, **self.cache.encabezados_condicionales(url)}
+        response = self.solicitar('GET', url, headers=headers, **kwargs)
+
+        if response.status_code == 304:
+            cuerpo, entrada = self.cache.obtener(url, revalidada=True)
+            if cuerpo is not None:
+                response.registro_metricas['cache'] = 'acierto'
+                return self._respuesta_desde_cache(response, cuerpo, entrada)
+            # La caché perdió el cuerpo: se vuelve a pedir la página completa
+            response = self.solicitar('GET', url, headers=dict(headers_pedidos), **kwargs)
+
+        response.registro_metricas['cache'] = 'fallo'
+        response.desde_cache = False
+        response.hash_contenido = None
+        if response.status_code == 200:
+            response.hash_contenido = self.cache.guardar(
+                url, response.content, response.headers, response.encoding
+            )
+        return response
+
+    def _respuesta_desde_cache(self, original, cuerpo, entrada):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = cuerpo
+        response.url = original.url
+        response.request = original.request
+        response.headers = CaseInsensitiveDict(original.headers)
+        if entrada.get('content_type'):
+            response.headers['Content-Type'] = entrada['content_type']
+        response.encoding = entrada.get('encoding')
+        response.desde_cache = True
+        response.hash_contenido = entrada.get('hash')
+        return response
+
+    def resultado_previo(self, url, response):
+        """Resultado ya extraído de esta página, si su cuerpo no cambió desde entonces"""
+        if not self.cache:
+            return None
+        return self.cache.resultado(url, getattr(response, 'hash_contenido', None))
+
+    def recordar_resultado(self, url, response, datos):
+        """Guarda lo extraído de la página para reutilizarlo mientras no cambie"""
+        if self.cache:
+            self.cache.guardar_resultado(url, getattr(response, 'hash_contenido', None), datos)
+
+    def post(self, url, **kwargs):
+        return self.solicitar('POST', url, **kwargs)
+
+    def guardar_estado(self):
+        """Guarda el índice de la caché y el ritmo aprendido de cada host"""
+        if self.cache:
+            self.cache.guardar_indice()
+        if self.limitador is not None:
+            self.limitador.guardar()
+
+    def cerrar(self):
+        self.guardar_estado()
+        if self.fixtures is not None:
+            self.fixtures.guardar()
+        self.sesion.close()
+
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+
+def crear_cache_por_defecto():
+    """Caché en disco salvo que se desactive con la variable de entorno CACHE_HTTP=false"""
+    if os.environ.get('CACHE_HTTP', 'true').lower() != 'true':
+        return None
+    return CacheHTTP()
+
+
+def _cerrar_cliente():
+    with _lock_cliente:
+        if _cliente is not None:
+            _cliente.cerrar()
+
+
+atexit.register(_cerrar_cliente)
+
+
+def obtener_cliente():
+    """Devuelve el cliente compartido, creándolo la primera vez"""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteHTTP(cache=crear_cache_por_defecto())
+        return _cliente
+
+
+def configurar_cliente(**opciones):
+    """
+    Reemplaza el cliente compartido por uno nuevo con las opciones indicadas. Si ya hay
+    uno y sólo se indica la concurrencia por host, se conserva (con sus conexiones
+    abiertas, su caché y su limitador) y sólo se cambia el cupo: así varias corridas en
+    un mismo proceso (ver vigilancia.py) reutilizan el cliente.
+    """
+    global _cliente
+    with _lock_cliente:
+        if _cliente is not None and set(opciones) <= {'concurrencia_por_host'}:
+            _cliente.fijar_concurrencia_por_host(opciones.get('concurrencia_por_host', CONCURRENCIA_POR_HOST))
+            return _cliente
+        if _cliente is not None:
+            _cliente.cerrar()
+        if 'cache' not in opciones:
+            opciones['cache'] = crear_cache_por_defecto()
+        _cliente = ClienteHTTP(**opciones)
+        return _cliente
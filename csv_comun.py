@@ -0,0 +1,283 @@
+"""
+Lectura y escritura de los CSV de los scrapers.
+
+Todos los datasets se guardan en UTF-8 con encabezado y se leen como listas de
+diccionarios; estas funciones reúnen lo que antes repetía cada scraper.
+
+La escritura tiene en cuenta los cambios: un CSV sólo se reescribe si cambió algo más
+que las columnas que se actualizan en cada corrida (COLUMNAS_VOLATILES), así los
+archivos versionados no cambian cuando los datos son los mismos. Las filas agregadas,
+eliminadas y modificadas de cada corrida se anotan en un archivo de cambios en
+DIRECTORIO_CAMBIOS (por defecto .estado/cambios/<scraper>/); una fila en la que sólo
+cambiaron las COLUMNAS_SEGUIMIENTO se escribe pero no cuenta como modificada.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+from estado import cargar_json, escribir_atomico, guardar_json, ruta_estado
+
+# Columnas que se actualizan en cada corrida aunque los datos no cambien: no cuentan al
+# decidir si un CSV cambió, y sólo se reescriben junto con algún cambio real
+COLUMNAS_VOLATILES = ('fecha_extraccion',)
+
+# Columnas que avanzan en cada corrida pero son datos publicados (fecha_fin es la última
+# fecha en que se vio un período abierto): el CSV se reescribe si cambian, pero una fila
+# en la que sólo cambiaron ellas no se anota como modificada
+COLUMNAS_SEGUIMIENTO = ('fecha_fin',)
+
+# Firma de cada CSV escrito, para no volver a leerlo si no se tocó desde entonces
+ARCHIVO_FIRMAS = 'firmas_csv.json'
+
+# Filas que se listan por archivo y por tipo de cambio en el archivo de cambios
+MAX_FILAS_CAMBIOS = 1000
+
+
+def cargar_csv(nombre_archivo, descripcion='registros', convertir=None):
+    """
+    Carga las filas de un archivo CSV como diccionarios. Si el archivo no existe o no
+    se puede leer, devuelve una lista vacía. `convertir`, si se indica, se aplica a
+    cada fila antes de agregarla.
+    """
+    filas = []
+
+    if not os.path.exists(nombre_archivo):
+        return filas
+
+    try:
+        with open(nombre_archivo, 'r', encoding='utf-8') as archivo:
+            for fila in csv.DictReader(archivo):
+                filas.append(convertir(fila) if convertir else fila)
+
+        print(f"Se cargaron {len(filas)} {descripcion} desde {nombre_archivo}")
+        return filas
+
+    except Exception as e:
+        print(f"Error al cargar {descripcion} desde {nombre_archivo}: {e}")
+        return []
+
+
+def valor_csv(valor):
+    """Texto con el que queda un valor en el CSV"""
+    return '' if valor is None else str(valor)
+
+
+def columnas_estables(campos):
+    return [campo for campo in campos if campo not in COLUMNAS_VOLATILES]
+
+
+def firma_filas(filas, campos):
+    """Hash de las filas (en orden) sin las columnas volátiles"""
+    estables = columnas_estables(campos)
+    digest = hashlib.sha256('\x1f'.join(estables).encode('utf-8') + b'\x1e')
+    for fila in filas:
+        digest.update('\x1f'.join(valor_csv(fila.get(campo)) for campo in estables).encode('utf-8') + b'\x1e')
+    return digest.hexdigest()
+
+
+def _leer_csv(nombre_archivo):
+    """Encabezado y filas de un CSV, o (None, None) si no existe o no se puede leer"""
+    try:
+        with open(nombre_archivo, 'r', encoding='utf-8', newline='') as archivo:
+            reader = csv.DictReader(archivo)
+            return reader.fieldnames or [], list(reader)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return None, None
+
+
+def _huella(nombre_archivo):
+    estado = os.stat(nombre_archivo)
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+def diferencias(anteriores, nuevas, campos, clave=None):
+    """
+    Filas agregadas, eliminadas y modificadas entre dos versiones de un dataset, sin
+    contar las columnas volátiles. Las filas se identifican con `clave(fila)`; sin
+    clave, una fila modificada figura como eliminada y agregada. Una fila en la que
+    sólo cambiaron las columnas de seguimiento no figura como modificada.
+    """
+    estables = columnas_estables(campos)
+    comparadas = [campo for campo in estables if campo not in COLUMNAS_SEGUIMIENTO]
+
+    def indexar(filas):
+        indice = {}
+        ocurrencias = Counter()
+        for fila in filas:
+            valores = {campo: valor_csv(fila.get(campo)) for campo in estables}
+            base = clave(fila) if clave else tuple(valores[campo] for campo in comparadas)
+            # Si una clave se repite, cada aparición se compara con la del mismo orden
+            ocurrencias[base] += 1
+            indice[(base, ocurrencias[base])] = valores
+        return indice
+
+    antes = indexar(anteriores)
+    despues = indexar(nuevas)
+    modificadas = []
+    for identificador, valores in despues.items():
+        previos = antes.get(identificador)
+        if previos is not None and any(previos.get(campo, '') != valores[campo] for campo in comparadas):
+            modificadas.append({
+                'clave': identificador[0],
+                'cambios': {campo: [previos.get(campo, ''), valor]
+                            for campo, valor in valores.items() if previos.get(campo, '') != valor},
+            })
+    return {
+        'agregadas': [valores for identificador, valores in despues.items() if identificador not in antes],
+        'eliminadas': [valores for identificador, valores in antes.items() if identificador not in despues],
+        'modificadas': modificadas,
+    }
+
+
+class RegistroCambios:
+    """Cambios de los CSV escritos en una corrida"""
+
+    def __init__(self, scraper=None):
+        self.scraper = scraper
+        self.inicio = datetime.now()
+        self._lock = threading.Lock()
+        self.archivos = {}
+        self.sin_cambios = []
+
+    def registrar(self, nombre_archivo, delta):
+        if not any(delta.values()):
+            self.omitir(nombre_archivo)
+            return
+        with self._lock:
+            actual = self.archivos.setdefault(nombre_archivo, {'agregadas': [], 'eliminadas': [], 'modificadas': []})
+            for tipo, filas in delta.items():
+                actual[tipo].extend(filas)
+
+    def omitir(self, nombre_archivo):
+        with self._lock:
+            self.sin_cambios.append(nombre_archivo)
+
+    def resumen(self):
+        with self._lock:
+            return {
+                'scraper': self.scraper,
+                'inicio': self.inicio.isoformat(timespec='seconds'),
+                'sin_cambios': sorted(set(self.sin_cambios) - set(self.archivos)),
+                'archivos': {
+                    nombre: {
+                        **{f"total_{tipo}": len(filas) for tipo, filas in delta.items()},
+                        **{tipo: filas[:MAX_FILAS_CAMBIOS] for tipo, filas in delta.items()},
+                    }
+                    for nombre, delta in sorted(self.archivos.items())
+                },
+            }
+
+    def escribir(self, directorio=None):
+        """Escribe el archivo de cambios de la corrida, si hubo alguno. Devuelve su ruta"""
+        resumen = self.resumen()
+        if not resumen['archivos']:
+            if resumen['sin_cambios']:
+                print("Cambios: ningún dato cambió en esta corrida", file=sys.stderr)
+            return None
+
+        directorio = (directorio or os.environ.get('DIRECTORIO_CAMBIOS')
+                      or os.path.dirname(ruta_estado('cambios', self.scraper or 'otros', '')))
+        os.makedirs(directorio, exist_ok=True)
+        nombre = self.inicio.strftime('%Y%m%d-%H%M%S')
+        ruta = os.path.join(directorio, f"{nombre}.json")
+        numero = 1
+        while os.path.exists(ruta):
+            numero += 1
+            ruta = os.path.join(directorio, f"{nombre}-{numero}.json")
+        escribir_atomico(ruta, json.dumps(resumen, ensure_ascii=False, indent=1))
+
+        totales = ', '.join(
+            f"{nombre} +{datos['total_agregadas']} -{datos['total_eliminadas']} ~{datos['total_modificadas']}"
+            for nombre, datos in resumen['archivos'].items()
+        )
+        print(f"Cambios: {totales}; detalle en {ruta}", file=sys.stderr)
+        return ruta
+
+
+_cambios = RegistroCambios()
+
+
+def obtener_cambios():
+    """Cambios de la corrida en curso"""
+    return _cambios
+
+
+def reiniciar_cambios(scraper):
+    """Empieza a anotar los cambios de una corrida nueva"""
+    global _cambios
+    _cambios = RegistroCambios(scraper)
+    return _cambios
+
+
+def escribir_si_cambia(nombre_archivo, contenido):
+    """Escribe el archivo sólo si su contenido es distinto del actual. Devuelve si lo escribió"""
+    nuevo = contenido.encode('utf-8')
+    try:
+        with open(nombre_archivo, 'rb') as archivo:
+            if archivo.read() == nuevo:
+                return False
+    except OSError:
+        pass
+    escribir_atomico(nombre_archivo, nuevo, modo='wb')
+    return True
+
+
+def guardar_csv(datos, nombre_archivo, campos, clave=None):
+    """
+    Guarda la información en un archivo CSV, salvo que sólo cambien las columnas
+    volátiles. Los cambios respecto del archivo anterior (identificando las filas con
+    `clave`) se anotan en el registro de cambios de la corrida.
+    """
+    try:
+        if not datos:
+            print(f"No hay datos para guardar en {nombre_archivo}")
+            return False
+
+        firma = firma_filas(datos, campos)
+        ruta_firmas = ruta_estado(ARCHIVO_FIRMAS)
+        firmas = cargar_json(ruta_firmas, {}) or {}
+        guardada = firmas.get(nombre_archivo)
+
+        anteriores = None
+        existe = os.path.exists(nombre_archivo)
+        if existe and guardada and guardada.get('huella') == _huella(nombre_archivo):
+            # El archivo no se tocó desde que se escribió: alcanza con la firma guardada
+            firma_anterior = guardada.get('firma')
+        elif existe:
+            encabezado, anteriores = _leer_csv(nombre_archivo)
+            firma_anterior = None if anteriores is None else firma_filas(anteriores, encabezado)
+        else:
+            firma_anterior = None
+
+        if firma == firma_anterior:
+            obtener_cambios().omitir(nombre_archivo)
+            print(f"Sin cambios en {nombre_archivo}: se conserva el archivo")
+            return True
+
+        if anteriores is None and existe:
+            _, anteriores = _leer_csv(nombre_archivo)
+        cambios = diferencias(anteriores or [], datos, campos, clave)
+
+        # Una columna que no está en `campos` hace fallar el guardado (extrasaction='raise')
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=campos)
+        writer.writeheader()
+        writer.writerows(datos)
+        escribir_atomico(nombre_archivo, buffer.getvalue())
+        obtener_cambios().registrar(nombre_archivo, cambios)
+
+        firmas[nombre_archivo] = {'firma': firma, 'huella': _huella(nombre_archivo)}
+        guardar_json(ruta_firmas, firmas)
+
+        print(f"Se ha guardado la información en {nombre_archivo}")
+        return True
+
+    except Exception as e:
+        print(f"Error al guardar el archivo CSV {nombre_archivo}: {e}")
+        return False
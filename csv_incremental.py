@@ -0,0 +1,188 @@
+"""
+Escritura incremental de CSV históricos.
+
+En lugar de cargar todo el archivo, combinarlo y reescribirlo, se mantiene un índice
+persistido con las claves de las filas ya guardadas. Las filas nuevas se agregan al
+final del CSV y sus claves al final del índice, seguidas de una marca con el tamaño del
+CSV que describen (cada línea es JSON: una clave es un texto y una marca, un objeto).
+Al abrirlo valen las claves hasta la última marca completa: si su tamaño no coincide
+con el del CSV (por ejemplo porque el CSV se editó a mano o una corrida se cortó), o el
+índice falta o está dañado, se reconstruye leyendo sólo las claves del CSV y se
+reescribe entero. Sin ruta de índice, las claves se leen del CSV al abrirlo y no se
+persisten.
+"""
+import csv
+import io
+import json
+import os
+
+from estado import escribir_atomico
+
+
+# Versión del formato del índice; uno de otra versión se reconstruye
+VERSION_INDICE = 2
+
+
+class CSVIncremental:
+    """CSV al que sólo se le agregan filas con claves que todavía no tiene"""
+
+    def __init__(self, archivo, campos, funcion_clave, ruta_indice):
+        self.archivo = archivo
+        self.campos = campos
+        self.funcion_clave = funcion_clave
+        self.ruta_indice = ruta_indice
+        # Bytes válidos del índice (hasta su última marca) y claves todavía no anotadas
+        self._fin_indice = 0
+        self._sin_indexar = []
+        self.claves = self._cargar_indice()
+
+    def _tamanio_csv(self):
+        return os.path.getsize(self.archivo) if os.path.exists(self.archivo) else 0
+
+    def _cargar_indice(self):
+        """Carga el índice de claves, o lo reconstruye si no corresponde al CSV actual"""
+        if self.ruta_indice is None:
+            return self._reconstruir_indice()
+        if os.path.exists(self.ruta_indice):
+            leido = self._leer_indice()
+            if leido is not None and leido[1] == self._tamanio_csv():
+                claves, _, self._fin_indice = leido
+                return claves
+            print(f"El índice {self.ruta_indice} no corresponde a {self.archivo}, se reconstruye")
+        return self._reconstruir_indice()
+
+    def _leer_indice(self):
+        """
+        Devuelve (claves, tamaño del CSV indexado, bytes válidos del índice), o None si
+        el archivo no es un índice de este CSV
+        """
+        with open(self.ruta_indice, 'rb') as archivo:
+            primera = archivo.readline()
+            try:
+                encabezado = json.loads(primera)
+            except ValueError:
+                return None
+            if (not isinstance(encabezado, dict) or encabezado.get('version') != VERSION_INDICE
+                    or encabezado.get('archivo') != os.path.basename(self.archivo)):
+                return None
+
+            claves = set()
+            pendientes = []
+            tamanio = None
+            fin = posicion = len(primera)
+            for linea in archivo:
+                # Una línea a medias es una escritura cortada: lo que sigue no vale
+                if not linea.endswith(b'\n'):
+                    break
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    break
+                posicion += len(linea)
+                if isinstance(registro, dict):
+                    claves.update(pendientes)
+                    pendientes = []
+                    tamanio = registro.get('tamanio')
+                    fin = posicion
+                else:
+                    pendientes.append(registro)
+        if tamanio is None:
+            return None
+        return claves, tamanio, fin
+
+    def _reconstruir_indice(self):
+        claves = set()
+        if os.path.exists(self.archivo):
+            with open(self.archivo, 'r', encoding='utf-8', newline='') as archivo:
+                reader = csv.DictReader(archivo)
+                if reader.fieldnames and list(reader.fieldnames) != list(self.campos):
+                    raise ValueError(
+                        f"Las columnas de {self.archivo} no coinciden con las esperadas: {reader.fieldnames}"
+                    )
+                for fila in reader:
+                    claves.add(self.funcion_clave(fila))
+        self._escribir_indice(claves)
+        return claves
+
+    def _marca(self, filas):
+        return json.dumps({'tamanio': self._tamanio_csv(), 'filas': filas}) + '\n'
+
+    def _escribir_indice(self, claves):
+        """Reescribe el índice completo de forma atómica"""
+        if self.ruta_indice is None:
+            return
+        encabezado = {'version': VERSION_INDICE, 'archivo': os.path.basename(self.archivo)}
+        contenido = (json.dumps(encabezado) + '\n'
+                     + ''.join(json.dumps(clave, ensure_ascii=False) + '\n' for clave in claves)
+                     + self._marca(len(claves)))
+        escribir_atomico(self.ruta_indice, contenido)
+        self._fin_indice = len(contenido.encode('utf-8'))
+        self._sin_indexar = []
+
+    def __len__(self):
+        return len(self.claves)
+
+    def guardar_indice(self):
+        """Anota al final del índice las claves agregadas desde la última vez y el tamaño del CSV"""
+        if self.ruta_indice is None or not self._sin_indexar:
+            return
+        if not os.path.exists(self.ruta_indice):
+            self._escribir_indice(self.claves)
+            return
+        contenido = (''.join(json.dumps(clave, ensure_ascii=False) + '\n' for clave in self._sin_indexar)
+                     + self._marca(len(self.claves)))
+        with open(self.ruta_indice, 'r+b') as archivo:
+            # Se descarta lo que haya quedado de una anotación cortada
+            archivo.truncate(self._fin_indice)
+            archivo.seek(self._fin_indice)
+            archivo.write(contenido.encode('utf-8'))
+            archivo.flush()
+            os.fsync(archivo.fileno())
+            self._fin_indice = archivo.tell()
+        self._sin_indexar = []
+
+    def agregar(self, filas, guardar_indice=True):
+        """
+        Agrega al final del CSV las filas cuya clave no existe todavía.
+        Si la escritura falla, el CSV se trunca a su tamaño anterior.
+        Con guardar_indice=False el índice se guarda después, con `guardar_indice()`;
+        si la corrida se corta antes, la próxima lo reconstruye.
+        Devuelve las filas efectivamente agregadas.
+        """
+        nuevas = []
+        claves_nuevas = []
+        for fila in filas:
+            clave = self.funcion_clave(fila)
+            if clave in self.claves:
+                continue
+            self.claves.add(clave)
+            claves_nuevas.append(clave)
+            nuevas.append(fila)
+
+        if not nuevas:
+            return nuevas
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.campos)
+        existe = os.path.exists(self.archivo) and self._tamanio_csv() > 0
+        if not existe:
+            writer.writeheader()
+        writer.writerows(nuevas)
+
+        tamanio_anterior = self._tamanio_csv()
+        try:
+            with open(self.archivo, 'a', newline='', encoding='utf-8') as archivo:
+                archivo.write(buffer.getvalue())
+                archivo.flush()
+                os.fsync(archivo.fileno())
+        except BaseException:
+            self.claves.difference_update(claves_nuevas)
+            if os.path.exists(self.archivo):
+                with open(self.archivo, 'r+b') as archivo:
+                    archivo.truncate(tamanio_anterior)
+            raise
+
+        self._sin_indexar.extend(claves_nuevas)
+        if guardar_indice:
+            self.guardar_indice()
+        return nuevas
@@ -0,0 +1,65 @@
+"""
+Ubicación y persistencia del estado de ejecución de los scrapers (caché HTTP, índices,
+checkpoints, etc.). Todo vive dentro de un directorio que no se versiona; en GitHub
+Actions se conserva entre corridas con actions/cache.
+"""
+import json
+import os
+import tempfile
+
+DIRECTORIO_ESTADO = os.environ.get('SCRAPPERTOWN_ESTADO', '.estado')
+
+
+def ruta_estado(*partes):
+    """Devuelve una ruta dentro del directorio de estado, creando los directorios necesarios"""
+    ruta = os.path.join(DIRECTORIO_ESTADO, *partes)
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    return ruta
+
+
+# Máscara de permisos del proceso, leída una sola vez al importar
+_MASCARA = os.umask(0)
+os.umask(_MASCARA)
+
+
+def _permisos_destino(ruta):
+    if os.path.exists(ruta):
+        return os.stat(ruta).st_mode & 0o777
+    return 0o666 & ~_MASCARA
+
+
+def escribir_atomico(ruta, contenido, modo='w', encoding='utf-8'):
+    """Escribe un archivo completo en un temporal y lo renombra, para no dejarlo a medias"""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix='.tmp_')
+    try:
+        # mkstemp crea el archivo con permisos 0600: conservamos los del archivo original
+        os.chmod(temporal, _permisos_destino(ruta))
+        kwargs = {} if 'b' in modo else {'encoding': encoding, 'newline': ''}
+        with os.fdopen(descriptor, modo, **kwargs) as archivo:
+            archivo.write(contenido)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def cargar_json(ruta, defecto=None):
+    """Carga un archivo JSON de estado; si no existe o está dañado devuelve `defecto`"""
+    if not os.path.exists(ruta):
+        return defecto
+    try:
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError) as e:
+        print(f"No se pudo leer el estado {ruta}: {e}")
+        return defecto
+
+
+def guardar_json(ruta, datos):
+    """Guarda un archivo JSON de estado de forma atómica"""
+    escribir_atomico(ruta, json.dumps(datos, ensure_ascii=False, indent=1))
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Respuestas HTTP grabadas (fixtures) y un servidor local que las reproduce.
+
+Con GRABAR_FIXTURES=<directorio>, el cliente compartido (ver cliente_http.py) guarda en
+ese directorio cada respuesta que recibe: un archivo por cuerpo y un índice con el
+método, la URL, el cuerpo de la solicitud, el status y el Content-Type.
+
+El servidor de este módulo responde esas mismas solicitudes sin salir a la red, con
+latencia y errores configurables. Los scrapers le envían sus solicitudes si se define
+REMAPEO_URLS con el valor que informa el servidor al iniciar, por ejemplo
+    REMAPEO_URLS='https://=http://127.0.0.1:8765/https/;http://=http://127.0.0.1:8765/http/'
+Las solicitudes que no están grabadas se responden con 404.
+
+Uso:
+    GRABAR_FIXTURES=fixtures CACHE_HTTP=false python scraper.py
+    python fixtures_http.py --archivo fixtures --puerto 8765 --latencia 0.05 --errores 0.01
+"""
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from estado import cargar_json, escribir_atomico, guardar_json
+
+ARCHIVO_INDICE = 'indice.json'
+DIRECTORIO_RESPUESTAS = 'respuestas'
+
+
+def como_bytes(cuerpo):
+    if cuerpo is None:
+        return b''
+    if isinstance(cuerpo, str):
+        return cuerpo.encode('utf-8')
+    return bytes(cuerpo)
+
+
+def clave_solicitud(metodo, url, cuerpo=b''):
+    """Identifica una solicitud por método, URL y cuerpo"""
+    digest = hashlib.sha1(f"{metodo.upper()}\n{url}\n".encode('utf-8'))
+    digest.update(como_bytes(cuerpo))
+    return digest.hexdigest()
+
+
+class ArchivoFixtures:
+    """Directorio con respuestas grabadas, indexadas por solicitud"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        datos = cargar_json(os.path.join(directorio, ARCHIVO_INDICE), None) or {}
+        self.fecha_grabacion = datos.get('fecha_grabacion')
+        self.respuestas = datos.get('respuestas', {})
+
+    def __len__(self):
+        return len(self.respuestas)
+
+    def _ruta_cuerpo(self, clave):
+        return os.path.join(self.directorio, DIRECTORIO_RESPUESTAS, f"{clave}.bin")
+
+    def grabar(self, metodo, url, cuerpo_solicitud, response):
+        """Guarda la respuesta a una solicitud, reemplazando la anterior si la había"""
+        clave = clave_solicitud(metodo, url, cuerpo_solicitud)
+        contenido = response.content
+        escribir_atomico(self._ruta_cuerpo(clave), contenido, modo='wb')
+        with self._lock:
+            self.respuestas[clave] = {
+                'metodo': metodo.upper(),
+                'url': url,
+                'cuerpo_solicitud': como_bytes(cuerpo_solicitud).decode('utf-8', errors='replace'),
+                'status': response.status_code,
+                'content_type': response.headers.get('Content-Type'),
+                'bytes': len(contenido),
+            }
+            self.fecha_grabacion = datetime.now().strftime("%Y-%m-%d")
+
+    def buscar(self, metodo, url, cuerpo_solicitud=b''):
+        """Devuelve (entrada, cuerpo) de la respuesta grabada, o (None, None)"""
+        clave = clave_solicitud(metodo, url, cuerpo_solicitud)
+        entrada = self.respuestas.get(clave)
+        if entrada is None:
+            return None, None
+        try:
+            with open(self._ruta_cuerpo(clave), 'rb') as archivo:
+                return entrada, archivo.read()
+        except OSError:
+            return None, None
+
+    def entradas(self):
+        """Recorre (entrada, cuerpo) de todas las respuestas grabadas, ordenadas por URL"""
+        for clave, entrada in sorted(self.respuestas.items(), key=lambda par: (par[1]['url'], par[0])):
+            _, cuerpo = self.buscar(entrada['metodo'], entrada['url'], entrada['cuerpo_solicitud'])
+            if cuerpo is not None:
+                yield entrada, cuerpo
+
+    def guardar(self):
+        with self._lock:
+            guardar_json(os.path.join(self.directorio, ARCHIVO_INDICE), {
+                'fecha_grabacion': self.fecha_grabacion,
+                'respuestas': self.respuestas,
+            })
+
+
+class ServidorFixtures(ThreadingHTTPServer):
+    """
+    Servidor HTTP que reproduce un ArchivoFixtures. La URL original viaja en la ruta:
+    /https/www.hcdn.gob.ar/comisiones/... corresponde a https://www.hcdn.gob.ar/comisiones/...
+    """
+
+    daemon_threads = True
+
+    def __init__(self, archivo, puerto=0, latencia=0.0, errores=0.0, semilla=0):
+        super().__init__(('127.0.0.1', puerto), ManejadorFixtures)
+        self.archivo = archivo
+        self.latencia = latencia
+        self.errores = errores
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.reiniciar_contadores()
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.contadores = {'solicitudes': 0, 'respondidas': 0, 'sin_fixture': 0, 'errores': 0, 'bytes': 0}
+
+    def _contar(self, **valores):
+        with self._lock:
+            for nombre, cantidad in valores.items():
+                self.contadores[nombre] += cantidad
+
+    @property
+    def origen(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def remapeo(self):
+        """Valor de REMAPEO_URLS que envía a este servidor todas las solicitudes"""
+        return f"https://={self.origen}/https/;http://={self.origen}/http/"
+
+    def iniciar_en_segundo_plano(self):
+        hilo = threading.Thread(target=self.serve_forever, daemon=True)
+        hilo.start()
+        return hilo
+
+    def responder(self, manejador, metodo):
+        largo = int(manejador.headers.get('Content-Length') or 0)
+        cuerpo_solicitud = manejador.rfile.read(largo) if largo else b''
+        self._contar(solicitudes=1)
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        esquema, _, resto = manejador.path.lstrip('/').partition('/')
+        with self._lock:
+            fallar = self.errores and self._azar.random() < self.errores
+        if fallar:
+            self._contar(errores=1)
+            self._enviar(manejador, 503, b'Error simulado', 'text/plain')
+            return
+
+        entrada, cuerpo = self.archivo.buscar(metodo, f"{esquema}://{resto}", cuerpo_solicitud)
+        if entrada is None:
+            self._contar(sin_fixture=1)
+            self._enviar(manejador, 404, f"Sin fixture para {metodo} {esquema}://{resto}".encode('utf-8'), 'text/plain')
+            return
+        self._contar(respondidas=1, bytes=len(cuerpo))
+        self._enviar(manejador, entrada['status'], cuerpo, entrada.get('content_type'))
+
+    @staticmethod
+    def _enviar(manejador, status, cuerpo, content_type):
+        manejador.send_response(status)
+        if content_type:
+            manejador.send_header('Content-Type', content_type)
+        manejador.send_header('Content-Length', str(len(cuerpo)))
+        manejador.end_headers()
+        manejador.wfile.write(cuerpo)
+
+
+class ManejadorFixtures(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Encabezados y cuerpo se escriben por separado: sin esto cada respuesta espera el ACK demorado
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.responder(self, 'GET')
+
+    def do_POST(self):
+        self.server.responder(self, 'POST')
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que reproduce respuestas HTTP grabadas.")
+    parser.add_argument('--archivo', default='fixtures', help="Directorio de fixtures. Default: fixtures.")
+    parser.add_argument('--puerto', type=int, default=8765, help="Puerto local. Default: 8765.")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Segundos de espera por solicitud. Default: 0.")
+    parser.add_argument('--errores', type=float, default=0.0,
+                        help="Proporción de solicitudes que se responden con 503. Default: 0.")
+    parser.add_argument('--semilla', type=int, default=0, help="Semilla de los errores simulados. Default: 0.")
+    args = parser.parse_args()
+
+    archivo = ArchivoFixtures(args.archivo)
+    if not len(archivo):
+        parser.error(f"no hay respuestas grabadas en {args.archivo}")
+    servidor = ServidorFixtures(archivo, args.puerto, args.latencia, args.errores, args.semilla)
+    print(f"{len(archivo)} respuestas grabadas el {archivo.fecha_grabacion}")
+    print(f"REMAPEO_URLS='{servidor.remapeo()}'")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
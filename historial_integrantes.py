@@ -0,0 +1,248 @@
+"""
+Historial de integrantes de comisiones como dimensión lentamente cambiante.
+
+Cada fila de integrantes_comisiones.csv es un período [fecha_inicio, fecha_fin] en el
+que una persona (de un bloque) integró una comisión. Una misma persona puede tener
+varios períodos en la misma comisión: si deja de aparecer y luego vuelve, se abre un
+período nuevo en lugar de estirar el anterior por encima del hueco.
+
+Un período está abierto si su fecha_fin es la de la última corrida que vio esa comisión
+(la fecha_fin más reciente entre sus filas). Así, si una corrida no pudo descargar una
+comisión, sus integrantes no quedan partidos en dos períodos.
+
+Las consultas por fecha usan un árbol de intervalos por comisión, y las consultas por
+diputado un índice por código (o por nombre cuando falta el código).
+
+Uso:
+    python historial_integrantes.py --comision agricultura --fecha 2025-10-01
+    python historial_integrantes.py --diputado nmayoraz
+"""
+import argparse
+import csv
+import os
+from collections import defaultdict
+from datetime import date, datetime
+
+ARCHIVO_INTEGRANTES = 'integrantes_comisiones.csv'
+
+# Cota superior para períodos sin fecha_fin
+SIN_FIN = '9999-12-31'
+
+
+def normalizar_fecha(fecha):
+    """Acepta date, datetime o texto yyyy-mm-dd y devuelve texto yyyy-mm-dd"""
+    if isinstance(fecha, datetime):
+        return fecha.strftime("%Y-%m-%d")
+    if isinstance(fecha, date):
+        return fecha.isoformat()
+    return str(fecha).strip()
+
+
+def clave_integrante(integrante):
+    return (integrante['comision_codigo'], integrante['nombre_completo'], integrante['bloque'])
+
+
+class IndiceIntervalos:
+    """
+    Árbol de intervalos estático sobre una lista ordenada por inicio. El árbol es
+    implícito: cada nodo es el elemento del medio de su rango y guarda el fin máximo
+    de su subárbol, lo que permite descartar ramas enteras al consultar un punto.
+    """
+
+    def __init__(self, intervalos):
+        # intervalos: iterable de (inicio, fin, dato) con fechas yyyy-mm-dd
+        self._intervalos = sorted(intervalos, key=lambda intervalo: intervalo[0])
+        self._max_fin = [''] * len(self._intervalos)
+        self._construir(0, len(self._intervalos))
+
+    def __len__(self):
+        return len(self._intervalos)
+
+    def _construir(self, inicio, fin):
+        if inicio >= fin:
+            return ''
+        medio = (inicio + fin) // 2
+        self._max_fin[medio] = max(
+            self._intervalos[medio][1],
+            self._construir(inicio, medio),
+            self._construir(medio + 1, fin),
+        )
+        return self._max_fin[medio]
+
+    def en_fecha(self, fecha):
+        """Datos de los intervalos que contienen la fecha, en orden de inicio"""
+        resultado = []
+        pendientes = [(0, len(self._intervalos))]
+        while pendientes:
+            inicio, fin = pendientes.pop()
+            if inicio >= fin:
+                continue
+            medio = (inicio + fin) // 2
+            if self._max_fin[medio] < fecha:
+                continue
+            desde, hasta, dato = self._intervalos[medio]
+            if desde <= fecha:
+                if fecha <= hasta:
+                    resultado.append((desde, medio, dato))
+                pendientes.append((medio + 1, fin))
+            pendientes.append((inicio, medio))
+        return [dato for _, _, dato in sorted(resultado, key=lambda r: (r[0], r[1]))]
+
+
+class HistorialIntegrantes:
+    """Períodos de integrantes de comisiones, indexados por clave, comisión y diputado"""
+
+    def __init__(self, filas):
+        # Las filas se conservan en su orden original, que es el del CSV
+        self.filas = list(filas)
+        self._por_clave = defaultdict(list)
+        self._por_comision = defaultdict(list)
+        self._por_diputado = defaultdict(list)
+        self._ultima_fecha = {}
+        self._arboles = {}
+        # Períodos sin fecha_fin: los únicos que hay que cerrar explícitamente al desaparecer
+        self._sin_cerrar = set()
+        for posicion in range(len(self.filas)):
+            self._indexar(posicion)
+
+    def __len__(self):
+        return len(self.filas)
+
+    @classmethod
+    def desde_csv(cls, nombre_archivo=ARCHIVO_INTEGRANTES):
+        if not os.path.exists(nombre_archivo):
+            return cls([])
+        with open(nombre_archivo, 'r', encoding='utf-8') as archivo:
+            return cls(csv.DictReader(archivo))
+
+    def _claves_diputado(self, fila):
+        codigo = (fila.get('codigo_diputado') or '').strip()
+        return {codigo, fila['nombre_completo']} - {''}
+
+    def _indexar(self, posicion):
+        fila = self.filas[posicion]
+        comision = fila['comision_codigo']
+        self._por_clave[clave_integrante(fila)].append(posicion)
+        self._por_comision[comision].append(posicion)
+        for clave in self._claves_diputado(fila):
+            self._por_diputado[clave].append(posicion)
+        self._ultima_fecha[comision] = max(self._ultima_fecha.get(comision, ''), fila.get('fecha_fin') or '')
+        self._arboles.pop(comision, None)
+        if not fila.get('fecha_fin'):
+            self._sin_cerrar.add(posicion)
+
+    def _periodo_abierto(self, clave, ultimas_fechas):
+        """Posición del período abierto de una clave, o None si la persona no estaba"""
+        periodos = self._por_clave.get(clave)
+        if not periodos:
+            return None
+        posicion = periodos[-1]
+        fecha_fin = self.filas[posicion].get('fecha_fin')
+        if not fecha_fin or fecha_fin == ultimas_fechas.get(clave[0]):
+            return posicion
+        return None
+
+    def actualizar(self, nuevos, fecha_actual, comisiones=None):
+        """
+        Incorpora la composición actual de las comisiones:
+        - Quien sigue en su período abierto extiende su fecha_fin (y actualiza cargo y distrito)
+        - Quien aparece, o vuelve tras haberse ido, abre un período nuevo
+        - Quien ya no está deja de extenderse: su período termina en la última fecha en
+          que se lo vio (los períodos sin fecha_fin se cierran en su fecha_inicio). Cerrarlo
+          en la fecha actual lo dejaría terminando en la última corrida de la comisión, y
+          se lo seguiría tomando como abierto si vuelve.
+        Con `comisiones` sólo se consideran ausentes los integrantes de esas comisiones, para
+        incorporar la composición de a una comisión por vez.
+        Devuelve la cantidad de períodos nuevos.
+        """
+        fecha_actual = normalizar_fecha(fecha_actual)
+
+        # Si una clave se repite en la extracción, vale la última aparición
+        dict_nuevos = {}
+        for integrante in nuevos:
+            dict_nuevos[clave_integrante(integrante)] = integrante
+
+        ultimas_fechas = dict(self._ultima_fecha)
+
+        for posicion in sorted(self._sin_cerrar):
+            fila = self.filas[posicion]
+            if comisiones is not None and fila['comision_codigo'] not in comisiones:
+                continue
+            if clave_integrante(fila) in dict_nuevos:
+                continue
+            fila['fecha_fin'] = fila.get('fecha_inicio') or fecha_actual
+            self._actualizar_comision(fila['comision_codigo'], fila['fecha_fin'])
+            self._sin_cerrar.discard(posicion)
+
+        agregados = 0
+        for clave, nuevo in dict_nuevos.items():
+            posicion = self._periodo_abierto(clave, ultimas_fechas)
+            if posicion is not None:
+                existente = self.filas[posicion]
+                existente['cargo'] = nuevo['cargo']
+                existente['distrito'] = nuevo['distrito']
+                existente['fecha_fin'] = fecha_actual
+                self._actualizar_comision(clave[0], fecha_actual)
+                self._sin_cerrar.discard(posicion)
+            else:
+                nuevo['fecha_inicio'] = fecha_actual
+                nuevo['fecha_fin'] = fecha_actual
+                self.filas.append(nuevo)
+                self._indexar(len(self.filas) - 1)
+                agregados += 1
+        return agregados
+
+    def _actualizar_comision(self, comision, fecha_fin):
+        self._ultima_fecha[comision] = max(self._ultima_fecha.get(comision, ''), fecha_fin)
+        self._arboles.pop(comision, None)
+
+    def _arbol(self, comision):
+        arbol = self._arboles.get(comision)
+        if arbol is None:
+            arbol = IndiceIntervalos(
+                (fila.get('fecha_inicio') or '', fila.get('fecha_fin') or SIN_FIN, fila)
+                for fila in (self.filas[p] for p in self._por_comision.get(comision, []))
+            )
+            self._arboles[comision] = arbol
+        return arbol
+
+    def integrantes_en_fecha(self, comision_codigo, fecha):
+        """Integrantes de una comisión en una fecha dada"""
+        return self._arbol(comision_codigo).en_fecha(normalizar_fecha(fecha))
+
+    def historial_diputado(self, diputado):
+        """Todos los períodos en comisiones de un diputado (por código o nombre completo), por fecha"""
+        posiciones = self._por_diputado.get(diputado.strip(), [])
+        return sorted((self.filas[p] for p in posiciones), key=lambda fila: fila.get('fecha_inicio') or '')
+
+    def comisiones(self):
+        return sorted(self._por_comision)
+
+
+def imprimir_filas(filas):
+    for fila in filas:
+        print(f"{fila['fecha_inicio']} a {fila['fecha_fin']}  {fila['comision_codigo']:<30} "
+              f"{fila['nombre_completo']} ({fila['bloque']}) {fila['cargo']}")
+    print(f"{len(filas)} períodos")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas sobre el historial de integrantes de comisiones.")
+    parser.add_argument('--archivo', default=ARCHIVO_INTEGRANTES, help="CSV de integrantes.")
+    parser.add_argument('--comision', help="Código de comisión (requiere --fecha).")
+    parser.add_argument('--fecha', default=datetime.now().strftime("%Y-%m-%d"),
+                        help="Fecha yyyy-mm-dd. Default: hoy.")
+    parser.add_argument('--diputado', help="Código o nombre completo del diputado.")
+    args = parser.parse_args()
+
+    historial = HistorialIntegrantes.desde_csv(args.archivo)
+    if args.comision:
+        imprimir_filas(historial.integrantes_en_fecha(args.comision, args.fecha))
+    elif args.diputado:
+        imprimir_filas(historial.historial_diputado(args.diputado))
+    else:
+        parser.error("indique --comision o --diputado")
+
+
+if __name__ == "__main__":
+    main()
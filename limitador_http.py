@@ -0,0 +1,167 @@
+"""
+Limitador de ritmo adaptativo por host (AIMD) para el cliente HTTP.
+
+Cada host tiene un balde de fichas que se recarga a `tasa` solicitudes por segundo;
+antes de cada solicitud se toma una ficha, esperando si no hay. La tasa se ajusta con
+lo que responde el servidor:
+- Cada respuesta sana (ni 429 ni 5xx, sin un pico de latencia) suma INCREMENTO_TASA,
+  hasta TASA_MAXIMA_HOST
+- Un 429, un 5xx o un error de conexión la multiplican por FACTOR_DESCENSO, y un pico de
+  latencia (más de FACTOR_PICO veces la latencia habitual) por FACTOR_DESCENSO_LATENCIA,
+  sin bajar del ritmo más lento que pidió el scraper. Si el servidor manda Retry-After,
+  no se le envía nada hasta entonces
+- Varias fallas seguidas (por ejemplo, de solicitudes simultáneas) cuentan como una sola
+  bajada mientras no pase el intervalo entre solicitudes
+
+La tasa y la latencia habitual de cada host se guardan en .estado/limitador_http.json,
+así la corrida siguiente arranca al ritmo que el host venía tolerando.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from estado import cargar_json, guardar_json, ruta_estado
+
+ARCHIVO_LIMITADOR = 'limitador_http.json'
+
+# Solicitudes por segundo que se suman con cada respuesta sana
+INCREMENTO_TASA = 0.05
+# Tope de solicitudes por segundo a un mismo host
+TASA_MAXIMA_HOST = float(os.environ.get('TASA_MAXIMA_HOST', '2'))
+# Solicitudes que se pueden hacer seguidas si el host estuvo un rato sin pedidos
+CAPACIDAD_BALDE = 2
+
+FACTOR_DESCENSO = 0.5
+FACTOR_DESCENSO_LATENCIA = 0.75
+# Una respuesta que tarda más de FACTOR_PICO veces la latencia habitual (y más de
+# LATENCIA_MINIMA_PICO segundos) cuenta como pico
+FACTOR_PICO = 3
+LATENCIA_MINIMA_PICO = 2.0
+# Peso de cada respuesta sana en la latencia habitual (media móvil exponencial)
+PESO_LATENCIA = 0.2
+# Espera máxima que se respeta de un Retry-After
+MAX_RETRY_AFTER = 300
+# El estado guardado de un host se descarta si tiene más de estos días
+DIAS_VIGENCIA = 14
+
+
+def segundos_retry_after(valor):
+    """Segundos de un encabezado Retry-After numérico, o None"""
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(valor)))
+    except (TypeError, ValueError):
+        return None
+
+
+class BaldeHost:
+    """Balde de fichas y tasa de un host"""
+
+    def __init__(self, tasa, latencia=None):
+        self.tasa = tasa
+        self.latencia = latencia
+        self.fichas = 1.0
+        self.recarga = time.monotonic()
+        self.bloqueado_hasta = 0.0
+        self.ultimo_descenso = 0.0
+
+    def recargar(self, ahora, escala):
+        self.fichas = min(CAPACIDAD_BALDE, self.fichas + (ahora - self.recarga) * self.tasa / escala)
+        self.recarga = ahora
+
+
+class LimitadorAIMD:
+    """Limitador por host con aumento aditivo y descenso multiplicativo de la tasa"""
+
+    def __init__(self, ruta=None, escala=1.0, tasa_maxima=TASA_MAXIMA_HOST):
+        """`escala` multiplica todas las esperas (ver ESCALA_PAUSAS en cliente_http.py)"""
+        self.ruta = ruta or ruta_estado(ARCHIVO_LIMITADOR)
+        self.escala = escala
+        self.tasa_maxima = tasa_maxima
+        self._lock = threading.Lock()
+        self._baldes = {}
+        self._guardado = {}
+        vigencia = (datetime.now() - timedelta(days=DIAS_VIGENCIA)).isoformat(timespec='seconds')
+        for host, datos in (cargar_json(self.ruta, {}) or {}).items():
+            if datos.get('actualizado', '') >= vigencia:
+                self._guardado[host] = datos
+
+    def _balde(self, host, pausa):
+        balde = self._baldes.get(host)
+        if balde is None:
+            guardado = self._guardado.get(host, {})
+            # Sin estado previo se empieza al ritmo de la pausa media que pidió el scraper
+            tasa = guardado.get('tasa') or 2 / (pausa[0] + pausa[1])
+            balde = self._baldes[host] = BaldeHost(tasa, guardado.get('latencia'))
+        balde.tasa = min(self.tasa_maxima, max(1 / pausa[1], balde.tasa))
+        return balde
+
+    def esperar(self, host, pausa):
+        """
+        Toma una ficha del balde del host, esperando lo necesario. `pausa` (mínimo,
+        máximo) es la pausa fija que usaba el scraper: el ritmo nunca baja de una
+        solicitud cada `máximo` segundos. Devuelve los segundos esperados.
+        """
+        with self._lock:
+            balde = self._balde(host, pausa)
+            ahora = time.monotonic()
+            balde.recargar(ahora, self.escala)
+            # Las fichas pueden quedar negativas: cada solicitud reserva su turno
+            espera = max(balde.bloqueado_hasta - ahora, (1 - balde.fichas) * self.escala / balde.tasa, 0.0)
+            balde.fichas -= 1
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    def observar(self, host, status, segundos, retry_after=None):
+        """
+        Ajusta la tasa del host con el resultado de una solicitud (status None si no
+        hubo respuesta). Devuelve 'aumento', 'descenso' o None.
+        """
+        with self._lock:
+            balde = self._baldes.get(host)
+            if balde is None:
+                return None
+            ahora = time.monotonic()
+
+            if status is None or status == 429 or status >= 500:
+                espera = segundos_retry_after(retry_after)
+                if espera:
+                    balde.bloqueado_hasta = max(balde.bloqueado_hasta, ahora + espera * self.escala)
+                return self._descender(balde, ahora, FACTOR_DESCENSO)
+
+            if balde.latencia and segundos > max(FACTOR_PICO * balde.latencia, LATENCIA_MINIMA_PICO):
+                return self._descender(balde, ahora, FACTOR_DESCENSO_LATENCIA)
+
+            balde.latencia = (segundos if balde.latencia is None
+                              else (1 - PESO_LATENCIA) * balde.latencia + PESO_LATENCIA * segundos)
+            if balde.tasa >= self.tasa_maxima:
+                return None
+            balde.tasa = min(self.tasa_maxima, balde.tasa + INCREMENTO_TASA)
+            return 'aumento'
+
+    def _descender(self, balde, ahora, factor):
+        if ahora - balde.ultimo_descenso < self.escala / balde.tasa:
+            return None
+        balde.ultimo_descenso = ahora
+        balde.tasa *= factor
+        return 'descenso'
+
+    def tasas(self):
+        with self._lock:
+            return {host: balde.tasa for host, balde in self._baldes.items()}
+
+    def guardar(self):
+        """Guarda la tasa y la latencia habitual de los hosts usados en la corrida"""
+        with self._lock:
+            if not self._baldes:
+                return
+            actualizado = datetime.now().isoformat(timespec='seconds')
+            datos = dict(self._guardado)
+            for host, balde in self._baldes.items():
+                datos[host] = {
+                    'tasa': round(balde.tasa, 4),
+                    'latencia': round(balde.latencia, 4) if balde.latencia is not None else None,
+                    'actualizado': actualizado,
+                }
+        guardar_json(self.ruta, datos)
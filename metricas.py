@@ -0,0 +1,202 @@
+"""
+Métricas de una corrida de los scrapers.
+
+El cliente HTTP registra cada solicitud (latencia, status, bytes, acierto de caché) y
+mide las fases de descarga y de pausas; los scrapers miden las suyas (parseo,
+combinación, escritura, etc.) con `medir_fase`. Con varios hilos, el tiempo de una fase
+es la suma de lo que tardó en cada uno. Si se asigna un `perfilador` (ver perfilado.py),
+cada fase además se perfila.
+
+Al terminar, `escribir_informe` deja en DIRECTORIO_METRICAS (por defecto
+.estado/metricas/):
+- <scraper>.json: resumen, fases, agrupación por etiqueta (comisión, año, etc.) y el
+  detalle de cada solicitud
+- <scraper>.prom: el resumen en formato textfile de Prometheus (node_exporter)
+- <scraper>_historial.jsonl: una línea de resumen por corrida, para comparar corridas
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from estado import escribir_atomico, ruta_estado
+
+# Etiquetas que se listan en el informe, de la más lenta a la más rápida
+MAX_ETIQUETAS_INFORME = 50
+
+
+def percentil(valores_ordenados, fraccion):
+    if not valores_ordenados:
+        return 0.0
+    posicion = min(len(valores_ordenados) - 1, max(0, round(fraccion * len(valores_ordenados)) - 1))
+    return valores_ordenados[posicion]
+
+
+def escapar_etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metricas:
+    """Acumula solicitudes, tiempos por fase y contadores de una corrida"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+        self.solicitudes = []
+        self.fases = defaultdict(lambda: {'segundos': 0.0, 'veces': 0})
+        self.contadores = Counter()
+        self.perfilador = None
+
+    def registrar_solicitud(self, metodo, url, status, segundos, bytes_respuesta=0, etiqueta=None, error=None):
+        """Registra una solicitud HTTP y devuelve su registro, que luego se puede completar"""
+        registro = {
+            'metodo': metodo,
+            'url': url,
+            'status': status,
+            'segundos': round(segundos, 4),
+            'bytes': bytes_respuesta,
+            'cache': None,
+            'etiqueta': etiqueta,
+        }
+        if error:
+            registro['error'] = error
+        with self._lock:
+            self.solicitudes.append(registro)
+        return registro
+
+    def sumar_fase(self, nombre, segundos):
+        with self._lock:
+            fase = self.fases[nombre]
+            fase['segundos'] += segundos
+            fase['veces'] += 1
+
+    @contextmanager
+    def fase(self, nombre):
+        perfil = self.perfilador.fase(nombre) if self.perfilador is not None else nullcontext()
+        inicio = time.perf_counter()
+        try:
+            with perfil:
+                yield
+        finally:
+            self.sumar_fase(nombre, time.perf_counter() - inicio)
+
+    def contar(self, nombre, cantidad=1):
+        with self._lock:
+            self.contadores[nombre] += cantidad
+
+    def resumen(self, scraper):
+        with self._lock:
+            solicitudes = list(self.solicitudes)
+            fases = {nombre: dict(fase) for nombre, fase in self.fases.items()}
+            contadores = dict(self.contadores)
+
+        latencias = sorted(registro['segundos'] for registro in solicitudes)
+        cache = Counter(registro['cache'] for registro in solicitudes if registro['cache'])
+        por_etiqueta = defaultdict(lambda: {'solicitudes': 0, 'segundos': 0.0, 'bytes': 0})
+        for registro in solicitudes:
+            grupo = por_etiqueta[registro['etiqueta'] or registro['url'].split('/')[2]]
+            grupo['solicitudes'] += 1
+            grupo['segundos'] += registro['segundos']
+            grupo['bytes'] += registro['bytes'] or 0
+
+        return {
+            'scraper': scraper,
+            'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+            'duracion_segundos': round(time.time() - self.inicio, 3),
+            'solicitudes': {
+                'total': len(solicitudes),
+                'por_status': dict(sorted(Counter(str(r['status']) for r in solicitudes).items())),
+                'errores': sum(1 for r in solicitudes if r.get('error')),
+                'bytes': sum(r['bytes'] or 0 for r in solicitudes),
+                'segundos': round(sum(latencias), 3),
+                'latencia_p50': percentil(latencias, 0.5),
+                'latencia_p95': percentil(latencias, 0.95),
+                'latencia_max': latencias[-1] if latencias else 0.0,
+                'cache': dict(sorted(cache.items())),
+            },
+            'fases': {nombre: {'segundos': round(f['segundos'], 3), 'veces': f['veces']}
+                      for nombre, f in sorted(fases.items())},
+            'contadores': dict(sorted(contadores.items())),
+            'por_etiqueta': [
+                {'etiqueta': etiqueta, **datos, 'segundos': round(datos['segundos'], 3)}
+                for etiqueta, datos in sorted(por_etiqueta.items(), key=lambda par: -par[1]['segundos'])
+            ][:MAX_ETIQUETAS_INFORME],
+        }
+
+    def texto_prometheus(self, resumen):
+        scraper = escapar_etiqueta(resumen['scraper'])
+        solicitudes = resumen['solicitudes']
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f"# HELP scrappertown_{nombre} {ayuda}")
+            lineas.append(f"# TYPE scrappertown_{nombre} {tipo}")
+            for sufijo, etiquetas, valor in valores:
+                texto = ','.join([f'scraper="{scraper}"'] + [f'{k}="{escapar_etiqueta(v)}"' for k, v in etiquetas])
+                lineas.append(f"scrappertown_{nombre}{sufijo}{{{texto}}} {valor}")
+
+        metrica('solicitudes', 'gauge', "Solicitudes HTTP de la última corrida, por status",
+                [('', [('status', status)], cantidad) for status, cantidad in solicitudes['por_status'].items()])
+        metrica('solicitud_segundos', 'summary', "Latencia de las solicitudes HTTP de la última corrida",
+                [('', [('quantile', '0.5')], solicitudes['latencia_p50']),
+                 ('', [('quantile', '0.95')], solicitudes['latencia_p95']),
+                 ('_sum', [], solicitudes['segundos']),
+                 ('_count', [], solicitudes['total'])])
+        metrica('bytes', 'gauge', "Bytes recibidos en la última corrida",
+                [('', [], solicitudes['bytes'])])
+        metrica('cache', 'gauge', "Solicitudes resueltas con la caché HTTP (acierto) o descargadas (fallo)",
+                [('', [('resultado', resultado)], cantidad) for resultado, cantidad in solicitudes['cache'].items()])
+        metrica('fase_segundos', 'gauge', "Segundos de cada fase en la última corrida (suma entre hilos)",
+                [('', [('fase', nombre)], fase['segundos']) for nombre, fase in resumen['fases'].items()])
+        metrica('eventos', 'gauge', "Eventos contados en la última corrida (reintentos, etc.)",
+                [('', [('evento', nombre)], cantidad) for nombre, cantidad in resumen['contadores'].items()])
+        metrica('corrida_segundos', 'gauge', "Duración de la última corrida",
+                [('', [], resumen['duracion_segundos'])])
+        metrica('corrida_fin_timestamp_segundos', 'gauge', "Momento en que terminó la última corrida",
+                [('', [], int(time.time()))])
+        return '\n'.join(lineas) + '\n'
+
+    def escribir_informe(self, scraper, directorio=None):
+        """Escribe el informe JSON, el textfile de Prometheus y agrega la corrida al historial"""
+        directorio = directorio or os.environ.get('DIRECTORIO_METRICAS') or os.path.dirname(ruta_estado('metricas', ''))
+        os.makedirs(directorio, exist_ok=True)
+        resumen = self.resumen(scraper)
+        with self._lock:
+            detalle = list(self.solicitudes)
+
+        escribir_atomico(os.path.join(directorio, f"{scraper}.json"),
+                         json.dumps({**resumen, 'detalle': detalle}, ensure_ascii=False, indent=1))
+        escribir_atomico(os.path.join(directorio, f"{scraper}.prom"), self.texto_prometheus(resumen))
+        with open(os.path.join(directorio, f"{scraper}_historial.jsonl"), 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(resumen, ensure_ascii=False) + '\n')
+
+        if self.perfilador is not None:
+            self.perfilador.escribir()
+
+        fases = ', '.join(f"{nombre} {fase['segundos']:.1f} s" for nombre, fase in resumen['fases'].items())
+        print(f"Métricas: {resumen['solicitudes']['total']} solicitudes en {resumen['duracion_segundos']:.1f} s"
+              f"{' (' + fases + ')' if fases else ''}; informe en {directorio}", file=sys.stderr)
+        return resumen
+
+
+_metricas = Metricas()
+
+
+def obtener_metricas():
+    """Métricas de la corrida en curso"""
+    return _metricas
+
+
+def reiniciar_metricas():
+    """Empieza a medir una corrida nueva"""
+    global _metricas
+    _metricas = Metricas()
+    return _metricas
+
+
+def medir_fase(nombre):
+    return obtener_metricas().fase(nombre)
@@ -0,0 +1,66 @@
+"""
+Capa de parseo HTML compartida por los scrapers.
+
+Usa el backend más rápido disponible (lxml) y cae en 'html.parser' si no está
+instalado. Cada extractor puede pedir un parseo parcial: con un SoupStrainer sólo se
+construye el árbol de los elementos que interesan (la tabla de comisiones, la tabla
+de integrantes, la sección de partes), en lugar de la página completa.
+
+BeautifulSoup se importa recién al parsear la primera página, para que los comandos
+que no parsean HTML (--help, modos livianos) arranquen rápido.
+"""
+import importlib.util
+import os
+from functools import lru_cache
+
+BACKENDS = ('lxml', 'html.parser')
+
+
+def backend_disponible(nombre):
+    if nombre == 'html.parser':
+        return True
+    # Se busca el módulo sin importarlo: lxml se carga recién al parsear
+    return importlib.util.find_spec(nombre) is not None
+
+
+def elegir_backend():
+    """Backend configurado en PARSER_HTML, o el más rápido de los instalados"""
+    preferido = os.environ.get('PARSER_HTML')
+    if preferido:
+        if preferido in BACKENDS and backend_disponible(preferido):
+            return preferido
+        print(f"El parser {preferido!r} no está disponible, se usa el automático")
+    for nombre in BACKENDS:
+        if backend_disponible(nombre):
+            return nombre
+    return 'html.parser'
+
+
+PARSER_HTML = elegir_backend()
+
+# Porciones de cada página que necesitan los extractores: (etiqueta, atributos)
+SOLO_TABLAS = ('table', ())
+SOLO_TABLA_COMISIONES = ('table', (('class', 'table-responsive'),))
+SOLO_SECCION_PARTES = ('section', (('class', 'partes'),))
+SOLO_TABLA_LEGISLADORES = ('table', (('id', 'data-integrantes'),))
+
+
+@lru_cache(maxsize=None)
+def filtro_porcion(solo):
+    """SoupStrainer que corresponde a una porción (se arma una sola vez por porción)"""
+    from bs4 import SoupStrainer
+
+    etiqueta, atributos = solo
+    return SoupStrainer(etiqueta, attrs=dict(atributos))
+
+
+def crear_sopa(html, solo=None, parser=None, parcial=True):
+    """
+    Parsea el HTML con el backend indicado (o el elegido por defecto).
+    `solo` es una de las porciones SOLO_* con la parte de la página a construir; con
+    parcial=False se ignora y se parsea el documento completo.
+    """
+    from bs4 import BeautifulSoup
+
+    filtro = filtro_porcion(solo) if parcial and solo is not None else None
+    return BeautifulSoup(html, parser or PARSER_HTML, parse_only=filtro)
@@ -0,0 +1,113 @@
+"""
+Recorridos históricos repartidos en particiones, para correrlos en varias máquinas o
+procesos.
+
+1. Se planifica el recorrido una sola vez: el manifiesto lista las unidades de trabajo
+   (por ejemplo: integrantes de una comisión, o sus reuniones de un año) y los datos
+   necesarios para descargarlas, así todas las particiones recorren lo mismo.
+2. La partición i/N descarga una de cada N unidades del manifiesto (la i-ésima, la
+   i+N-ésima, ...) y deja sus filas en particion-<i>-de-<N>.jsonl, con el formato de la
+   bitácora (ver bitacora.py). Si se corta, se reanuda como una corrida normal.
+3. La combinación junta los archivos de las particiones y entrega las filas de cada
+   unidad en el orden del manifiesto, de modo que el resultado es el mismo que el de
+   una corrida en un único proceso, sin importar cuántas particiones hubo.
+"""
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from bitacora import BitacoraCrawl, leer_bitacora
+from estado import cargar_json, guardar_json
+
+ARCHIVO_MANIFIESTO = 'manifiesto.json'
+
+# Faltantes que se listan al combinar
+MAX_FALTANTES_INFORME = 20
+
+
+def interpretar_particion(texto):
+    """Convierte 'i/N' en (i, N), con 1 <= i <= N"""
+    try:
+        indice, total = (int(parte) for parte in texto.split('/'))
+    except ValueError:
+        raise ValueError(f"partición inválida {texto!r}: se espera i/N, por ejemplo 2/4") from None
+    if not 1 <= indice <= total:
+        raise ValueError(f"partición inválida {texto!r}: i tiene que estar entre 1 y N")
+    return indice, total
+
+
+def crear_manifiesto(claves, **datos):
+    """
+    Manifiesto con las claves de las unidades, en el orden en que se combinan, y los
+    datos que necesitan las particiones. Su `id` depende sólo del contenido.
+    """
+    claves = list(claves)
+    contenido = json.dumps([datos, claves], ensure_ascii=False, sort_keys=True)
+    return {
+        'id': hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16],
+        'creado': datetime.now().isoformat(timespec='seconds'),
+        **datos,
+        'unidades': claves,
+    }
+
+
+def guardar_manifiesto(directorio, manifiesto):
+    """Guarda el manifiesto en el directorio de particiones y devuelve su ruta"""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, ARCHIVO_MANIFIESTO)
+    guardar_json(ruta, manifiesto)
+    return ruta
+
+
+def cargar_manifiesto(directorio):
+    ruta = os.path.join(directorio, ARCHIVO_MANIFIESTO)
+    manifiesto = cargar_json(ruta, None)
+    if not manifiesto or 'unidades' not in manifiesto:
+        raise FileNotFoundError(f"no hay un manifiesto válido en {ruta}; créelo con --planificar")
+    return manifiesto
+
+
+def claves_de_particion(manifiesto, indice, total):
+    """Claves de las unidades que le tocan a la partición indice/total"""
+    return manifiesto['unidades'][indice - 1::total]
+
+
+def ruta_particion(directorio, indice, total):
+    return os.path.join(directorio, f"particion-{indice}-de-{total}.jsonl")
+
+
+def abrir_particion(directorio, manifiesto, indice, total, reanudar=False):
+    """
+    Abre el archivo de resultados de una partición. Con reanudar=True conserva las
+    unidades ya descargadas, salvo que el archivo sea de otro manifiesto.
+    """
+    ruta = ruta_particion(directorio, indice, total)
+    encabezado = {'manifiesto': manifiesto['id'], 'particion': indice, 'particiones': total}
+    if reanudar and os.path.exists(ruta) and leer_bitacora(ruta)[0] != encabezado:
+        print(f"{ruta} es de otro manifiesto o de otra partición, se empieza de cero")
+        reanudar = False
+    salida = BitacoraCrawl(ruta)
+    salida.iniciar(encabezado, reanudar=reanudar)
+    return salida
+
+
+def leer_particiones(directorio, manifiesto):
+    """
+    Reúne las filas de las unidades descargadas por las particiones del manifiesto.
+    Devuelve ({clave: filas}, claves faltantes). Si una unidad aparece en más de un
+    archivo vale la del primero en orden alfabético.
+    """
+    completadas = {}
+    for ruta in sorted(glob.glob(os.path.join(directorio, 'particion-*.jsonl'))):
+        encabezado, filas_por_clave = leer_bitacora(ruta)
+        if not encabezado or encabezado.get('manifiesto') != manifiesto['id']:
+            print(f"Se ignora {ruta}: no corresponde al manifiesto {manifiesto['id']}")
+            continue
+        for clave, filas in filas_por_clave.items():
+            completadas.setdefault(clave, filas)
+        print(f"{ruta}: {len(filas_por_clave)} unidades")
+
+    faltantes = [clave for clave in manifiesto['unidades'] if clave not in completadas]
+    return completadas, faltantes
@@ -0,0 +1,152 @@
+"""
+Perfilado de CPU y memoria por fase, para la opción --profile de los scrapers.
+
+Cada fase medida con `medir_fase` (ver metricas.py) se ejecuta bajo cProfile y se
+anota el uso de memoria con tracemalloc. Si una fase empieza dentro de otra, su tiempo
+queda en la de afuera.
+
+Sólo se perfilan las fases del hilo principal: desde Python 3.12 puede haber un único
+perfilador activo en todo el proceso, así que los hilos de los pools de descarga no
+activan el suyo (en esas versiones lo que hacen mientras el hilo principal está en una
+fase queda en ella). Para perfilar las descargas y el parseo conviene correr con
+concurrencia 1, que además hace exacta la memoria: tracemalloc cuenta las asignaciones
+de todo el proceso. Si otra herramienta ya está perfilando (un depurador, coverage), se
+anota sólo la memoria.
+
+Al terminar se escribe en .estado/perfiles/<scraper>/:
+- <fase>.txt: funciones ordenadas por tiempo acumulado y por tiempo propio
+- <fase>.prof: el perfil en formato pstats (para snakeviz, pstats, etc.)
+- memoria.txt: pico y saldo de memoria de cada fase y sus principales sitios de asignación
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+from estado import ruta_estado
+
+# Funciones listadas por fase en cada orden
+FUNCIONES_POR_INFORME = 40
+# Sitios de asignación listados por fase
+SITIOS_POR_FASE = 15
+# Ejecuciones de cada fase en las que se comparan instantáneas de memoria: cada una
+# recorre todo el heap, así que en fases que se repiten (parseo, descarga) sólo las primeras
+INSTANTANEAS_POR_FASE = 2
+
+# Las instantáneas no cuentan lo que asigna el propio tracemalloc
+FILTROS_INSTANTANEAS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+class Perfilador:
+    """Perfiles de CPU y memoria acumulados por fase"""
+
+    def __init__(self, scraper, directorio=None):
+        self.scraper = scraper
+        self.directorio = directorio or os.path.dirname(ruta_estado('perfiles', scraper, ''))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._perfiles = {}
+        self._memoria = defaultdict(lambda: {'veces': 0, 'pico': 0, 'saldo': 0, 'instantaneas': 0})
+        self._sitios = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._sin_cpu = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _perfil(self, nombre):
+        with self._lock:
+            perfil = self._perfiles.get(nombre)
+            if perfil is None:
+                perfil = self._perfiles[nombre] = cProfile.Profile()
+            return perfil
+
+    @contextmanager
+    def fase(self, nombre):
+        if getattr(self._local, 'activa', None) or threading.current_thread() is not threading.main_thread():
+            yield
+            return
+
+        with self._lock:
+            memoria = self._memoria[nombre]
+            tomar_instantanea = memoria['instantaneas'] < INSTANTANEAS_POR_FASE
+            if tomar_instantanea:
+                memoria['instantaneas'] += 1
+        antes = tracemalloc.take_snapshot().filter_traces(FILTROS_INSTANTANEAS) if tomar_instantanea else None
+        actual_antes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        perfil = self._perfil(nombre)
+        try:
+            perfil.enable()
+            self._local.activa = nombre
+        except ValueError as e:
+            if not self._sin_cpu:
+                print(f"No se puede perfilar la CPU ({e}); se mide sólo la memoria", file=sys.stderr)
+            self._sin_cpu = True
+            perfil = None
+        try:
+            yield
+        finally:
+            if perfil is not None:
+                perfil.disable()
+                self._local.activa = None
+            actual, pico = tracemalloc.get_traced_memory()
+            despues = tracemalloc.take_snapshot().filter_traces(FILTROS_INSTANTANEAS) if tomar_instantanea else None
+            with self._lock:
+                memoria['veces'] += 1
+                memoria['pico'] = max(memoria['pico'], pico - actual_antes)
+                memoria['saldo'] += actual - actual_antes
+                if antes is not None:
+                    for diferencia in despues.compare_to(antes, 'lineno'):
+                        if diferencia.size_diff > 0:
+                            sitio = self._sitios[nombre][str(diferencia.traceback)]
+                            sitio[0] += diferencia.size_diff
+                            sitio[1] += diferencia.count_diff
+
+    def escribir(self):
+        """Escribe los informes de CPU y memoria de cada fase"""
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._lock:
+            perfiles = dict(self._perfiles)
+            memoria = {nombre: dict(datos) for nombre, datos in self._memoria.items()}
+            sitios = {nombre: dict(datos) for nombre, datos in self._sitios.items()}
+
+        resumen = []
+        for nombre, perfil in sorted(perfiles.items()):
+            try:
+                estadisticas = pstats.Stats(perfil, stream=io.StringIO())
+            except TypeError:
+                # La fase nunca llegó a perfilarse
+                continue
+            estadisticas.dump_stats(os.path.join(self.directorio, f"{nombre}.prof"))
+
+            texto = io.StringIO()
+            estadisticas.stream = texto
+            print(f"Fase {nombre}: {estadisticas.total_calls} llamadas en {estadisticas.total_tt:.3f} s\n",
+                  file=texto)
+            print("Por tiempo acumulado:", file=texto)
+            estadisticas.sort_stats('cumulative').print_stats(FUNCIONES_POR_INFORME)
+            print("Por tiempo propio:", file=texto)
+            estadisticas.sort_stats('tottime').print_stats(FUNCIONES_POR_INFORME)
+            with open(os.path.join(self.directorio, f"{nombre}.txt"), 'w', encoding='utf-8') as archivo:
+                archivo.write(texto.getvalue())
+            resumen.append((nombre, estadisticas.total_tt))
+
+        with open(os.path.join(self.directorio, 'memoria.txt'), 'w', encoding='utf-8') as archivo:
+            for nombre, datos in sorted(memoria.items()):
+                archivo.write(f"Fase {nombre}: {datos['veces']} ejecuciones, pico {datos['pico'] / 2**20:.1f} MB, "
+                              f"saldo {datos['saldo'] / 2**20:+.1f} MB\n")
+                principales = sorted(sitios.get(nombre, {}).items(), key=lambda par: -par[1][0])
+                if principales:
+                    archivo.write(f"  Principales sitios de asignación (en las primeras "
+                                  f"{datos['instantaneas']} ejecuciones):\n")
+                for sitio, (tamanio, cantidad) in principales[:SITIOS_POR_FASE]:
+                    archivo.write(f"    {tamanio / 1024:10.1f} KiB {cantidad:8d} bloques  {sitio}\n")
+                archivo.write('\n')
+
+        tiempos = ', '.join(f"{nombre} {segundos:.2f} s" for nombre, segundos in resumen)
+        print(f"Perfiles por fase ({tiempos}) en {self.directorio}", file=sys.stderr)
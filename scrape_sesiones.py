@@ -2,23 +2,63 @@
 from __future__ import annotations
 
 import argparse
+import bisect
 import csv
+import heapq
 import json
 import os
+import random
 import sys
-import urllib.error
-import urllib.parse
-import urllib.request
+import threading
+import time
 import xml.etree.ElementTree as ET
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
+from io import StringIO
 from pathlib import Path
+from typing import Iterable, Iterator
+
+from almacen_sqlite import AlmacenSQLite
+from cliente_http import CONCURRENCIA_POR_HOST, configurar_cliente, obtener_cliente
+from csv_comun import diferencias, obtener_cambios, reiniciar_cambios
+from estado import cargar_json, guardar_json, ruta_estado
+from metricas import medir_fase, obtener_metricas, reiniciar_metricas
 
 WS_URL = "https://parlamentaria.legislatura.gob.ar/webservices/Json.asmx/GetSesionesAvanzado"
 DETAIL_URL_TEMPLATE = "https://www.legislatura.gob.ar/InfoSesion/{session_id}"
 ARCHIVO_SESIONES = "sesiones_legislatura.csv"
 FECHA_INICIO_HISTORICA = "01/01/1997"
 
+# Tamaño de los rangos consultados: como máximo un año calendario, y se achica si el
+# servidor no responde a tiempo. El último tamaño que funcionó queda en el estado.
+ARCHIVO_ESTADO_RANGOS = "sesiones_rangos.json"
+MAX_CHUNK_DAYS = 366
+MIN_CHUNK_DAYS = 1
+MAX_BYTES_RESPUESTA = 10 * 1024 * 1024
+# Días durante los que se recuerda el menor tamaño de rango que falló
+DIAS_MEMORIA_FALLAS = 30
+# Corridas seguidas sin rangos demasiado grandes después de las cuales se olvida esa falla
+CORRIDAS_PARA_OLVIDAR_FALLA = 3
+
+# Reintentos de fallas transitorias, con espera exponencial y jitter (en segundos)
+REINTENTOS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+
+class WebserviceError(RuntimeError):
+    """Falla al consultar el webservice que no se resuelve reintentando"""
+
+
+class TransientWebserviceError(WebserviceError):
+    """Falla transitoria (conexión, 5xx, 429): vale la pena reintentar"""
+
+
+class RangeTooLargeError(TransientWebserviceError):
+    """El rango no se pudo obtener a tiempo o la respuesta es demasiado grande: conviene dividirlo"""
+
 
 @dataclass
 class Sesion:
@@ -36,7 +76,7 @@ class Sesion:
     url_detalle: str
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Scrapea sesiones de la Legislatura de CABA por rango de fechas."
     )
@@ -58,13 +98,49 @@ def parse_args() -> argparse.Namespace:
         "--salida",
         help="Ruta del archivo de salida. Si se omite, imprime en stdout.",
     )
+    parser.add_argument(
+        "--almacenamiento",
+        choices=("csv", "sqlite"),
+        default="csv",
+        help=(
+            "Cómo se combina el histórico en modo automático: csv reescribe el archivo; "
+            "sqlite hace upserts en una base indexada y exporta el CSV. Default: csv."
+        ),
+    )
+    parser.add_argument(
+        "--base-sqlite",
+        help="Ruta de la base para --almacenamiento sqlite. Default: dentro del directorio de estado.",
+    )
     parser.add_argument(
         "--timeout",
         type=int,
         default=30,
         help="Timeout HTTP en segundos. Default: 30.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--reintentos",
+        type=int,
+        default=REINTENTOS,
+        help=f"Reintentos ante fallas transitorias del webservice. Default: {REINTENTOS}.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Cantidad de rangos anuales que se consultan en paralelo. El resultado es el mismo "
+            "que en modo secuencial. Default: 1."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Perfila CPU (cProfile) y memoria (tracemalloc) de cada fase; los informes quedan "
+            "en .estado/perfiles/sesiones/."
+        ),
+    )
+    return parser.parse_args(argv)
 
 
 def normalize_date(value: str) -> tuple[str, datetime]:
@@ -77,6 +153,7 @@ def normalize_date(value: str) -> tuple[str, datetime]:
     raise ValueError(f"Fecha invalida: {value!r}. Usa dd/mm/yyyy o yyyy-mm-dd.")
 
 
+@lru_cache(maxsize=4096)
 def parse_session_date(value: str) -> datetime | None:
     for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
         try:
@@ -118,30 +195,184 @@ def infer_date_range(existing_sessions: list[dict[str, str]]) -> tuple[str, str]
     return desde, hasta
 
 
-def iter_date_ranges(desde_dt: datetime, hasta_dt: datetime) -> list[tuple[str, str]]:
-    ranges: list[tuple[str, str]] = []
-    current_start = desde_dt
+def infer_date_range_from_store(store: AlmacenSQLite) -> tuple[str, str]:
+    ultima_fecha = store.ultima_fecha_sesion()
+    if ultima_fecha:
+        desde = datetime.strptime(ultima_fecha, "%Y-%m-%d").strftime("%d/%m/%Y")
+    else:
+        desde = FECHA_INICIO_HISTORICA
+    hasta = datetime.now().strftime("%d/%m/%Y")
+    return desde, hasta
 
-    while current_start <= hasta_dt:
-        current_end = datetime(current_start.year, 12, 31)
-        if current_end > hasta_dt:
-            current_end = hasta_dt
 
-        ranges.append(
-            (
-                current_start.strftime("%d/%m/%Y"),
-                current_end.strftime("%d/%m/%Y"),
+def format_date(value: datetime) -> str:
+    return value.strftime("%d/%m/%Y")
+
+
+class AdaptiveFetcher:
+    """
+    Consulta rangos de fechas adaptando su tamaño a lo que el servidor tolera:
+    - si un rango no responde a tiempo o la respuesta es demasiado grande, se divide
+      en dos mitades y se consultan por separado;
+    - las fallas transitorias se reintentan con espera exponencial y jitter;
+    - al terminar se guarda el tamaño de rango a usar en la próxima corrida: el mayor
+      que funcionó por debajo del menor que falló y, si todo anduvo rápido, uno más
+      grande, sin pasar del que falló.
+    Sólo cuenta como falla de tamaño un rango que no respondió pero cuyas mitades sí: si
+    un rango de un día tampoco responde, el problema es el servidor y no el tamaño. La
+    falla se recuerda por DIAS_MEMORIA_FALLAS días o hasta que pasen
+    CORRIDAS_PARA_OLVIDAR_FALLA corridas seguidas sin otra; después el tamaño puede
+    volver a crecer por encima de ella.
+    """
+
+    def __init__(
+        self,
+        timeout: int,
+        retries: int = REINTENTOS,
+        state_path: str | None = None,
+        max_bytes: int | None = MAX_BYTES_RESPUESTA,
+    ) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.state_path = state_path
+        self.max_bytes = max_bytes
+        state = cargar_json(state_path, {}) if state_path else {}
+        self.chunk_days = self._clamp(state.get("chunk_days", MAX_CHUNK_DAYS))
+        self.failed_days: int | None = None
+        self.failed_on: str | None = None
+        self.clean_runs = 0
+        try:
+            failed_on = datetime.strptime(state.get("failed_on", ""), "%Y-%m-%d")
+            if datetime.now() - failed_on < timedelta(days=DIAS_MEMORIA_FALLAS):
+                self.failed_days = self._clamp(state["failed_days"])
+                self.failed_on = state["failed_on"]
+                self.clean_runs = int(state.get("clean_runs", 0))
+        except (KeyError, TypeError, ValueError):
+            pass
+        self._lock = threading.Lock()
+        self._failed_this_run = False
+        self._largest_ok_days = 0
+        self._slowest_response = 0.0
+
+    @staticmethod
+    def _clamp(days: object) -> int:
+        try:
+            return max(MIN_CHUNK_DAYS, min(MAX_CHUNK_DAYS, int(days)))
+        except (TypeError, ValueError):
+            return MAX_CHUNK_DAYS
+
+    def plan(self, desde_dt: datetime, hasta_dt: datetime) -> list[tuple[datetime, datetime]]:
+        """Divide el período en rangos dentro de cada año calendario, de chunk_days días como máximo"""
+        ranges: list[tuple[datetime, datetime]] = []
+        current_start = desde_dt
+        while current_start <= hasta_dt:
+            current_end = min(
+                datetime(current_start.year, 12, 31),
+                current_start + timedelta(days=self.chunk_days - 1),
+                hasta_dt,
             )
-        )
-        current_start = current_end + timedelta(days=1)
+            ranges.append((current_start, current_end))
+            current_start = current_end + timedelta(days=1)
+        return ranges
+
+    def fetch(self, desde_dt: datetime, hasta_dt: datetime) -> list[Sesion]:
+        days = (hasta_dt - desde_dt).days + 1
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                sessions = fetch_sessions(
+                    format_date(desde_dt), format_date(hasta_dt), timeout=self.timeout, max_bytes=self.max_bytes
+                )
+            except RangeTooLargeError as exc:
+                if days > 1:
+                    obtener_metricas().contar("divisiones_rango")
+                    middle = desde_dt + timedelta(days=days // 2 - 1)
+                    print(
+                        f"El rango {format_date(desde_dt)}-{format_date(hasta_dt)} se divide en dos: {exc}",
+                        file=sys.stderr,
+                    )
+                    sessions = self.fetch(desde_dt, middle) + self.fetch(middle + timedelta(days=1), hasta_dt)
+                    # Las mitades respondieron: el rango completo era demasiado grande
+                    self._record_failure(days)
+                    return sessions
+                error: WebserviceError = exc
+            except TransientWebserviceError as exc:
+                error = exc
+            else:
+                with self._lock:
+                    self._slowest_response = max(self._slowest_response, time.monotonic() - started)
+                    self._largest_ok_days = max(self._largest_ok_days, days)
+                return sessions
+
+            attempt += 1
+            if attempt > self.retries:
+                raise WebserviceError(
+                    f"{error} (rango {format_date(desde_dt)}-{format_date(hasta_dt)}, {self.retries} reintentos)"
+                ) from error
+            wait = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+            obtener_metricas().contar("reintentos")
+            print(f"{error}; reintento {attempt}/{self.retries} en {wait:.1f} s", file=sys.stderr)
+            time.sleep(wait)
+
+    def _record_failure(self, days: int) -> None:
+        with self._lock:
+            if self.failed_days is None or days < self.failed_days:
+                self.failed_days = days
+            self.failed_on = datetime.now().strftime("%Y-%m-%d")
+            self._failed_this_run = True
+
+    def next_chunk_days(self) -> int:
+        limit = self.failed_days or MAX_CHUNK_DAYS + 1
+        days = self.chunk_days if self.chunk_days < limit else max(MIN_CHUNK_DAYS, limit // 2)
+        days = max(days, min(self._largest_ok_days, limit - 1))
+        if self._slowest_response and self._slowest_response < self.timeout / 4:
+            # Todo anduvo rápido: se prueba un rango más grande, a mitad de camino del que falló
+            days = max(days, min(days * 2, (days + limit) // 2))
+        return self._clamp(days)
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        with self._lock:
+            if self._failed_this_run:
+                self.clean_runs = 0
+            elif self.failed_days is not None and self._largest_ok_days:
+                self.clean_runs += 1
+                if self.clean_runs >= CORRIDAS_PARA_OLVIDAR_FALLA:
+                    # Varias corridas sin rangos demasiado grandes: se deja de limitar el tamaño
+                    self.failed_days = self.failed_on = None
+                    self.clean_runs = 0
+        state: dict[str, object] = {"chunk_days": self.next_chunk_days()}
+        if self.failed_days is not None:
+            state.update(failed_days=self.failed_days, failed_on=self.failed_on, clean_runs=self.clean_runs)
+        guardar_json(self.state_path, state)
+
+
+def fetch_sessions_in_ranges(
+    desde_dt: datetime,
+    hasta_dt: datetime,
+    timeout: int,
+    workers: int = 1,
+    fetcher: AdaptiveFetcher | None = None,
+) -> list[Sesion]:
+    fetcher = fetcher or AdaptiveFetcher(timeout)
+    ranges = fetcher.plan(desde_dt, hasta_dt)
+    sessions: list[Sesion] = []
 
-    return ranges
+    if workers <= 1 or len(ranges) <= 1:
+        for rango_desde, rango_hasta in ranges:
+            sessions.extend(fetcher.fetch(rango_desde, rango_hasta))
+        return sessions
 
+    from concurrent.futures import ThreadPoolExecutor
 
-def fetch_sessions_in_ranges(desde_dt: datetime, hasta_dt: datetime, timeout: int) -> list[Sesion]:
-    sessions: list[Sesion] = []
-    for rango_desde, rango_hasta in iter_date_ranges(desde_dt, hasta_dt):
-        sessions.extend(fetch_sessions(rango_desde, rango_hasta, timeout=timeout))
+    # map devuelve los resultados en el orden de los rangos, así que la unión es la
+    # misma que en modo secuencial aunque las respuestas lleguen en otro orden.
+    with ThreadPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        chunks = pool.map(lambda rango: fetcher.fetch(*rango), ranges)
+        for chunk in chunks:
+            sessions.extend(chunk)
     return sessions
 
 
@@ -159,66 +390,286 @@ def merge_sessions(
         sesiones_por_id[session.id_sesion_lp] = asdict(session)
 
     merged_sessions = list(sesiones_por_id.values())
-    merged_sessions.sort(
-        key=lambda fila: (
-            parse_session_date(fila.get("fecha", "")) or datetime.min,
-            fila.get("id_sesion_lp", ""),
-        )
-    )
+    merged_sessions.sort(key=session_sort_key)
     return merged_sessions
 
 
-def fetch_sessions(fecha_desde: str, fecha_hasta: str, timeout: int) -> list[Sesion]:
-    payload = urllib.parse.urlencode(
-        {"FechaDesde": fecha_desde, "FechaHasta": fecha_hasta}
-    ).encode("utf-8")
-    request = urllib.request.Request(
-        WS_URL,
-        data=payload,
-        headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
-        method="POST",
+def session_row_id(fila: dict[str, str]) -> str:
+    return fila["id_sesion_lp"]
+
+
+def session_sort_key(fila: dict[str, str]) -> tuple[datetime, str]:
+    return (
+        parse_session_date(fila.get("fecha", "")) or datetime.min,
+        fila.get("id_sesion_lp", ""),
     )
 
-    try:
-        with urllib.request.urlopen(request, timeout=timeout) as response:
-            xml_bytes = response.read()
-    except urllib.error.URLError as exc:
-        raise RuntimeError(f"No se pudo consultar el webservice: {exc}") from exc
 
-    root = ET.fromstring(xml_bytes)
-    sessions: list[Sesion] = []
+class SortedSessionsCSV:
+    """
+    CSV histórico de sesiones, ordenado por (fecha, id_sesion_lp).
+
+    Al cargarlo se guarda la clave de orden y la posición en bytes de cada fila. Las
+    sesiones nuevas o actualizadas se ubican por búsqueda binaria y, como caen casi
+    siempre al final, el archivo se reescribe sólo desde la primera fila afectada.
+    Si el archivo no está ordenado, tiene ids vacíos o repetidos o columnas distintas,
+    se combina como antes y se reescribe completo (quedando ordenado para la próxima).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.headers = [field.name for field in Sesion.__dataclass_fields__.values()]
+        self.rows: list[dict[str, str]] = []
+        self.keys: list[tuple[datetime, str]] = []
+        self.offsets: list[int] = []
+        self.size = 0
+        self.incremental = False
+        if os.path.exists(path):
+            try:
+                self.incremental = self._load()
+            except Exception as exc:
+                print(f"No se pudo cargar el archivo existente {path}: {exc}", file=sys.stderr)
+                self.rows, self.keys, self.offsets = [], [], []
+                return
+            if not self.incremental:
+                self.rows = load_existing_sessions(path)
+
+    def _load(self) -> bool:
+        """Lee filas, claves y posiciones; devuelve False si el archivo no admite escritura parcial"""
+        consumed = 0
+        last_line = b""
+        with open(self.path, "rb") as archivo:
+
+            def lines() -> Iterator[str]:
+                nonlocal consumed, last_line
+                for line in archivo:
+                    consumed += len(line)
+                    last_line = line
+                    yield line.decode("utf-8")
+
+            reader = csv.reader(lines())
+            if next(reader, None) != self.headers:
+                return False
+            ids: set[str] = set()
+            start = consumed
+            for values in reader:
+                if len(values) != len(self.headers):
+                    return False
+                fila = dict(zip(self.headers, values))
+                key = session_sort_key(fila)
+                if not key[1] or key[1] in ids or (self.keys and key < self.keys[-1]):
+                    return False
+                ids.add(key[1])
+                self.rows.append(fila)
+                self.keys.append(key)
+                self.offsets.append(start)
+                start = consumed
+        self.size = consumed
+        return last_line.endswith(b"\n")
+
+    def merge(self, sessions: list[Sesion]) -> int:
+        """Combina las sesiones con el histórico y guarda el archivo. Devuelve las filas nuevas o cambiadas"""
+        if not self.incremental:
+            previous_rows = self.rows
+            self.rows = merge_sessions(self.rows, sessions)
+            write_csv_file(self.rows, self.path)
+            obtener_cambios().registrar(self.path, diferencias(previous_rows, self.rows, self.headers, session_row_id))
+            return len(sessions)
+
+        positions = {fila["id_sesion_lp"]: position for position, fila in enumerate(self.rows)}
+        incoming = {session.id_sesion_lp: asdict(session) for session in sessions}
+        cut = len(self.rows)
+        removed: set[int] = set()
+        changed: list[tuple[tuple[datetime, str], dict[str, str]]] = []
+        for session_id, fila in incoming.items():
+            position = positions.get(session_id)
+            if position is not None:
+                if self.rows[position] == fila:
+                    continue
+                removed.add(position)
+                cut = min(cut, position)
+            key = session_sort_key(fila)
+            cut = min(cut, bisect.bisect_left(self.keys, key))
+            changed.append((key, fila))
+
+        if not changed:
+            obtener_cambios().omitir(self.path)
+            print(f"Sin cambios en {Path(self.path).resolve()}", file=sys.stderr)
+            return 0
+        delta = diferencias(
+            [self.rows[position] for position in removed], [fila for _, fila in changed], self.headers, session_row_id
+        )
 
-    # El XML viene con namespace por defecto, por eso se recorren tags por sufijo.
-    for node in root.iter():
-        if not node.tag.endswith("sesiones"):
-            continue
-        get = lambda name: text_by_suffix(node, name)
-        session_id = get("id_sesion_lp")
-        sessions.append(
-            Sesion(
-                id_sesion_lp=session_id,
-                nro_orden_lp=get("nro_orden_lp"),
-                ano_parlamentario=get("ano_parlamentario"),
-                fecha=get("fch_sesion_lp"),
-                id_sesion_tipo=get("id_sesion_tipo"),
-                abrev_sesion_tipo=get("abrev_sesion_tipo"),
-                dsc_sesion_tipo=get("dsc_sesion_tipo"),
-                labor_documento=get("labor_documento"),
-                prelabor_documento=get("prelabor_documento"),
-                asuntos_considerados_documento=get("asuntos_considerados_documento"),
-                archivo_vt=get("archivo_vt"),
-                url_detalle=DETAIL_URL_TEMPLATE.format(session_id=session_id),
-            )
+        changed.sort(key=lambda par: par[0])
+        kept = [(self.keys[p], self.rows[p]) for p in range(cut, len(self.rows)) if p not in removed]
+        tail = list(heapq.merge(kept, changed, key=lambda par: par[0]))
+
+        offset = self.offsets[cut] if cut < len(self.rows) else self.size
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.headers)
+        chunks: list[bytes] = []
+        offsets: list[int] = []
+        position = offset
+        for _, fila in tail:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(fila)
+            chunk = buffer.getvalue().encode("utf-8")
+            offsets.append(position)
+            chunks.append(chunk)
+            position += len(chunk)
+
+        with open(self.path, "r+b") as archivo:
+            archivo.seek(offset)
+            previous_tail = archivo.read()
+            try:
+                archivo.seek(offset)
+                archivo.write(b"".join(chunks))
+                archivo.truncate()
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            except BaseException:
+                # Si la escritura falla se restaura el final anterior del archivo
+                archivo.seek(offset)
+                archivo.write(previous_tail)
+                archivo.truncate()
+                raise
+
+        self.rows[cut:] = [fila for _, fila in tail]
+        self.keys[cut:] = [key for key, _ in tail]
+        self.offsets[cut:] = offsets
+        self.size = position
+        obtener_cambios().registrar(self.path, delta)
+        print(
+            f"Se guardaron los resultados en: {Path(self.path).resolve()} "
+            f"({len(changed)} sesiones nuevas o cambiadas, {len(tail)} filas reescritas)",
+            file=sys.stderr,
         )
+        return len(changed)
 
-    return sessions
 
+def fetch_sessions(
+    fecha_desde: str,
+    fecha_hasta: str,
+    timeout: int,
+    max_bytes: int | None = None,
+) -> list[Sesion]:
+    import requests
+    from urllib3.exceptions import ReadTimeoutError
 
-def text_by_suffix(node: ET.Element, suffix: str) -> str:
-    for child in node:
-        if child.tag.endswith(suffix):
-            return (child.text or "").strip()
-    return ""
+    try:
+        response = obtener_cliente().post(
+            WS_URL,
+            data={"FechaDesde": fecha_desde, "FechaHasta": fecha_hasta},
+            headers={"Content-Type": "application/x-www-form-urlencoded; charset=UTF-8"},
+            timeout=timeout,
+            stream=True,
+            etiqueta=fecha_desde[-4:],
+        )
+        with response:
+            if response.status_code in STATUS_TRANSITORIOS:
+                raise TransientWebserviceError(f"El webservice respondió {response.status_code}")
+            response.raise_for_status()
+            # Se decodifica a medida que llegan los bloques, sin armar el árbol completo
+            chunks = limit_bytes(response.iter_content(chunk_size=CHUNK_XML), max_bytes)
+            # El cuerpo se lee mientras se decodifica: esta fase incluye su descarga
+            with medir_fase("parseo"):
+                return list(decode_sessions(chunks))
+    except requests.ReadTimeout as exc:
+        # Sólo la demora en responder se atribuye al tamaño del rango
+        raise RangeTooLargeError(f"El webservice no respondió a tiempo: {exc}") from exc
+    except (requests.ConnectionError, requests.Timeout) as exc:
+        # Un timeout mientras se lee el cuerpo llega como ConnectionError
+        if exc.args and isinstance(exc.args[0], ReadTimeoutError):
+            raise RangeTooLargeError(f"El webservice no respondió a tiempo: {exc}") from exc
+        # No poder conectarse (incluido ConnectTimeout) no depende del rango: se reintenta igual
+        raise TransientWebserviceError(f"No se pudo consultar el webservice: {exc}") from exc
+    except requests.RequestException as exc:
+        raise WebserviceError(f"No se pudo consultar el webservice: {exc}") from exc
+
+
+def limit_bytes(chunks: Iterable[bytes], max_bytes: int | None) -> Iterator[bytes]:
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise RangeTooLargeError(f"La respuesta supera {max_bytes} bytes")
+        yield chunk
+
+
+# Tamaño de los bloques leídos de la respuesta
+CHUNK_XML = 64 * 1024
+
+SESSION_TAG = "sesiones"
+
+# Tabla de despacho: elemento hijo de <sesiones> -> campo de Sesion, en el orden de la dataclass
+SESSION_FIELDS_BY_TAG = {
+    "id_sesion_lp": "id_sesion_lp",
+    "nro_orden_lp": "nro_orden_lp",
+    "ano_parlamentario": "ano_parlamentario",
+    "fch_sesion_lp": "fecha",
+    "id_sesion_tipo": "id_sesion_tipo",
+    "abrev_sesion_tipo": "abrev_sesion_tipo",
+    "dsc_sesion_tipo": "dsc_sesion_tipo",
+    "labor_documento": "labor_documento",
+    "prelabor_documento": "prelabor_documento",
+    "asuntos_considerados_documento": "asuntos_considerados_documento",
+    "archivo_vt": "archivo_vt",
+}
+
+
+def decode_sessions(chunks: Iterable[bytes]) -> Iterator[Sesion]:
+    """
+    Decodifica la respuesta XML de GetSesionesAvanzado en una sola pasada, a medida que
+    llegan los bloques. El XML viene con namespace por defecto: cada tag distinto se
+    resuelve una sola vez a su nombre local y de ahí, por la tabla de despacho, al campo
+    de Sesion. Cada sesión se quita de su elemento padre apenas se lee, así que el árbol
+    no crece con la cantidad de sesiones de la respuesta.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    resolved: dict[str, str | None] = {}
+    # Elementos abiertos, para saber de qué padre quitar cada sesión ya leída
+    open_elements: list[ET.Element] = []
+
+    def process_events() -> Iterator[Sesion]:
+        for event, element in parser.read_events():
+            if event == "start":
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            tag = element.tag
+            try:
+                target = resolved[tag]
+            except KeyError:
+                local = tag.rpartition("}")[2]
+                target = resolved[tag] = SESSION_TAG if local == SESSION_TAG else SESSION_FIELDS_BY_TAG.get(local)
+            if target != SESSION_TAG:
+                continue
+
+            # Los hijos ya terminaron de leerse, así que sus tags ya están resueltos
+            values: dict[str, str] = {}
+            for child in element:
+                field = resolved.get(child.tag)
+                # Si un campo se repite, vale la primera aparición
+                if field is not None and field not in values:
+                    values[field] = (child.text or "").strip()
+            if open_elements:
+                open_elements[-1].remove(element)
+            yield build_session(values)
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from process_events()
+    parser.close()
+    yield from process_events()
+
+
+def build_session(values: dict[str, str]) -> Sesion:
+    session_id = values.get("id_sesion_lp", "")
+    return Sesion(
+        *[values.get(field, "") for field in SESSION_FIELDS_BY_TAG.values()],
+        url_detalle=DETAIL_URL_TEMPLATE.format(session_id=session_id),
+    )
 
 
 def serialize_json(sessions: list[Sesion]) -> str:
@@ -233,8 +684,6 @@ def serialize_csv(sessions: list[Sesion]) -> str:
         headers = list(asdict(sessions[0]).keys())
         rows = [asdict(session) for session in sessions]
 
-    from io import StringIO
-
     buffer = StringIO()
     writer = csv.DictWriter(buffer, fieldnames=headers)
     writer.writeheader()
@@ -262,9 +711,22 @@ def write_csv_file(sessions: list[dict[str, str]], output_path: str) -> None:
     print(f"Se guardaron los resultados en: {Path(output_path).resolve()}", file=sys.stderr)
 
 
-def main() -> int:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    metricas = reiniciar_metricas()
+    reiniciar_cambios("sesiones")
+    if args.profile:
+        from perfilado import Perfilador
 
+        metricas.perfilador = Perfilador("sesiones")
+    try:
+        return run(args)
+    finally:
+        obtener_cambios().escribir()
+        metricas.escribir_informe("sesiones")
+
+
+def run(args: argparse.Namespace) -> int:
     if bool(args.desde) != bool(args.hasta):
         print(
             "Debes informar --desde y --hasta juntos, o no informar ninguno para modo automático.",
@@ -274,10 +736,26 @@ def main() -> int:
 
     usar_rango_automatico = not args.desde and not args.hasta
     dataset_output_path = args.salida or ARCHIVO_SESIONES
-    existing_sessions = load_existing_sessions(dataset_output_path)
+
+    store = None
+    sessions_file = None
+    existing_sessions: list[dict[str, str]] = []
+    with medir_fase("lectura"):
+        if usar_rango_automatico and args.formato == "csv" and args.almacenamiento == "sqlite":
+            store = AlmacenSQLite(args.base_sqlite)
+            store.sincronizar_csv("sesiones", dataset_output_path)
+        elif usar_rango_automatico and args.formato == "csv":
+            sessions_file = SortedSessionsCSV(dataset_output_path)
+            existing_sessions = sessions_file.rows
+        else:
+            existing_sessions = load_existing_sessions(dataset_output_path)
 
     try:
-        if usar_rango_automatico:
+        if store is not None:
+            desde_text, hasta_text = infer_date_range_from_store(store)
+            desde_dt = datetime.strptime(desde_text, "%d/%m/%Y")
+            hasta_dt = datetime.strptime(hasta_text, "%d/%m/%Y")
+        elif usar_rango_automatico:
             desde_text, hasta_text = infer_date_range(existing_sessions)
             desde_dt = datetime.strptime(desde_text, "%d/%m/%Y")
             hasta_dt = datetime.strptime(hasta_text, "%d/%m/%Y")
@@ -292,18 +770,40 @@ def main() -> int:
         print("La fecha --desde no puede ser mayor que --hasta.", file=sys.stderr)
         return 2
 
+    if args.workers > CONCURRENCIA_POR_HOST:
+        # Todos los rangos van al mismo host: el cupo por host no debe frenar a los workers
+        configurar_cliente(concurrencia_por_host=args.workers)
+
+    fetcher = AdaptiveFetcher(
+        args.timeout,
+        retries=args.reintentos,
+        state_path=ruta_estado(ARCHIVO_ESTADO_RANGOS),
+    )
     try:
-        sessions = fetch_sessions_in_ranges(desde_dt, hasta_dt, timeout=args.timeout)
+        sessions = fetch_sessions_in_ranges(
+            desde_dt, hasta_dt, timeout=args.timeout, workers=args.workers, fetcher=fetcher
+        )
     except (RuntimeError, ET.ParseError) as exc:
         print(str(exc), file=sys.stderr)
         return 1
-
-    if usar_rango_automatico and args.formato == "csv":
-        merged_sessions = merge_sessions(existing_sessions, sessions)
-        write_csv_file(merged_sessions, dataset_output_path)
+    finally:
+        # Lo aprendido sobre el tamaño de los rangos sirve aunque la corrida falle
+        fetcher.save()
+
+    if store is not None:
+        with medir_fase("combinacion"):
+            store.upsert_sesiones([asdict(session) for session in sessions])
+        with medir_fase("escritura"):
+            headers = [field.name for field in Sesion.__dataclass_fields__.values()]
+            store.exportar_csv("sesiones", dataset_output_path, headers, clave=session_row_id)
+            store.cerrar()
+    elif sessions_file is not None:
+        with medir_fase("combinacion"):
+            sessions_file.merge(sessions)
     else:
-        content = serialize_json(sessions) if args.formato == "json" else serialize_csv(sessions)
-        write_output(content, args.salida)
+        with medir_fase("escritura"):
+            content = serialize_json(sessions) if args.formato == "json" else serialize_csv(sessions)
+            write_output(content, args.salida)
 
     print(f"Sesiones encontradas: {len(sessions)}", file=sys.stderr)
     return 0
@@ -1,78 +1,80 @@
-import requests
-from bs4 import BeautifulSoup
-import csv
+import argparse
 from datetime import datetime
-import time
 import os
-import random
 import re
 
+from agenda_comisiones import AgendaComisiones, leer_actividad
+from almacen_sqlite import AlmacenSQLite
+from bitacora import BitacoraCrawl, leer_bitacora
+from cliente_http import CONCURRENCIA_POR_HOST, configurar_cliente, obtener_cliente
+from csv_comun import cargar_csv, diferencias, guardar_csv, obtener_cambios, reiniciar_cambios
+from csv_incremental import CSVIncremental
+from estado import ruta_estado
+from historial_integrantes import HistorialIntegrantes, clave_integrante
+from metricas import medir_fase, obtener_metricas, reiniciar_metricas
+from particiones import (MAX_FALTANTES_INFORME, abrir_particion, cargar_manifiesto, claves_de_particion,
+                         crear_manifiesto, guardar_manifiesto, interpretar_particion, leer_particiones,
+                         ruta_particion)
+from parseo import SOLO_SECCION_PARTES, SOLO_TABLA_COMISIONES, SOLO_TABLAS, crear_sopa
+
 # URL base
 URL_BASE = 'https://www.hcdn.gob.ar/comisiones/permanentes/'
 
+# Archivos CSV generados
+ARCHIVO_COMISIONES = 'comisiones_diputados.csv'
+ARCHIVO_REUNIONES = 'reuniones_diputados.csv'
+ARCHIVO_INTEGRANTES = 'integrantes_comisiones.csv'
+
+# Primer año con listados de reuniones
+ANIO_INICIAL = 2017
+
+# Manifiesto y resultados de un recorrido repartido en particiones (ver particiones.py)
+DIRECTORIO_PARTICIONES = 'particiones_diputados'
+
+# Bitácora de unidades completadas, dentro del directorio de estado
+ARCHIVO_BITACORA = 'bitacora_diputados.jsonl'
+
+# Índice de claves de reuniones para el almacenamiento incremental
+ARCHIVO_INDICE_REUNIONES = 'indice_reuniones_diputados.txt'
+
+CAMPOS_COMISIONES = ['orden', 'nombre', 'codigo', 'url', 'tipo', 'horario', 
+                     'secretario', 'sede_contacto', 'fecha_extraccion']
+CAMPOS_INTEGRANTES = ['comision_codigo', 'comision_nombre', 'codigo_diputado', 
+                      'nombre_completo', 'cargo', 'bloque', 'distrito', 
+                      'fecha_inicio', 'fecha_fin', 'fecha_extraccion']
+CAMPOS_REUNIONES = ['comision_nombre', 'comision_codigo', 'id_reunion', 'fecha', 
+                    'anio', 'texto', 'url', 'fecha_extraccion']
+
+def refrescar_fecha_extraccion(filas):
+    """Marca con la fecha de hoy filas reutilizadas de una página que no cambió"""
+    fecha_actual = datetime.now().strftime("%Y-%m-%d")
+    for fila in filas:
+        fila['fecha_extraccion'] = fecha_actual
+    return filas
+
 def obtener_comisiones():
     """Extrae la información de las comisiones desde la página principal"""
     try:
         # Hacemos la solicitud HTTP
         print("Obteniendo información de comisiones...")
-        response = requests.get(URL_BASE)
+        # El limitador del cliente espacia las solicitudes al host (como mucho 3 segundos)
+        cliente = obtener_cliente()
+        response = cliente.get(URL_BASE, pausa=(1, 3))
         
         if response.status_code != 200:
             print(f"Error al obtener la página: {response.status_code}")
             return []
         
-        # Añadimos una pausa para evitar sobrecargar el servidor
-        time.sleep(random.uniform(1, 3))  # Pausa aleatoria entre 1 y 3 segundos
-            
-        # Parseamos el HTML con BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Si la página no cambió desde la última corrida, reutilizamos lo ya extraído
+        previas = cliente.resultado_previo(URL_BASE, response)
+        if previas is not None:
+            print(f"Se encontraron {len(previas)} comisiones (página sin cambios)")
+            return refrescar_fecha_extraccion(previas)
         
-        # Encontramos la tabla de comisiones
-        tabla = soup.find('table', class_='table-responsive')
+        with medir_fase('parseo'):
+            comisiones = extraer_comisiones(response.text)
         
-        if not tabla:
-            print("No se encontró la tabla de comisiones en el HTML")
-            return []
-        
-        comisiones = []
-        
-        # Iteramos por cada fila de la tabla, saltando la cabecera
-        for fila in tabla.find('tbody').find_all('tr'):
-            celdas = fila.find_all('td')
-            
-            # Extraemos los datos de cada celda
-            orden = celdas[0].text.strip()
-            
-            # Extraemos el nombre y la URL de la comisión
-            link_comision = celdas[1].find('a')
-            nombre = link_comision.text.strip()
-            url_comision = f"https://www.hcdn.gob.ar{link_comision['href']}"
-            codigo_comision = link_comision['href'].split('/')[-1]
-            
-            tipo = celdas[2].text.strip()
-            horario = celdas[3].text.strip()
-            secretario = celdas[4].text.strip()
-            
-            # La última celda contiene información de contacto
-            sede_contacto = celdas[5].text.strip().replace('\n', ' ').replace('\t', ' ')
-            while '  ' in sede_contacto:
-                sede_contacto = sede_contacto.replace('  ', ' ')
-            
-            # Creamos un diccionario con la información
-            comision = {
-                'orden': orden,
-                'nombre': nombre,
-                'codigo': codigo_comision,
-                'url': url_comision,
-                'tipo': tipo,
-                'horario': horario,
-                'secretario': secretario,
-                'sede_contacto': sede_contacto,
-                'fecha_extraccion': datetime.now().strftime("%Y-%m-%d")
-            }
-            
-            comisiones.append(comision)
-            
+        cliente.recordar_resultado(URL_BASE, response, comisiones)
         print(f"Se encontraron {len(comisiones)} comisiones")
         return comisiones
         
@@ -80,325 +82,632 @@ def obtener_comisiones():
         print(f"Error al obtener las comisiones: {e}")
         return []
 
-def obtener_integrantes_comision(codigo_comision, nombre_comision):
-    """Obtiene los integrantes de una comisión específica"""
+def extraer_comisiones(html, parser=None, parcial=True):
+    """Extrae las comisiones de la tabla de la página principal"""
+    # Parseamos sólo la tabla de comisiones
+    soup = crear_sopa(html, SOLO_TABLA_COMISIONES, parser, parcial)
+    
+    # Encontramos la tabla de comisiones
+    tabla = soup.find('table', class_='table-responsive')
+    
+    if not tabla:
+        print("No se encontró la tabla de comisiones en el HTML")
+        return []
+    
+    comisiones = []
+    
+    # Iteramos por cada fila de la tabla, saltando la cabecera
+    for fila in tabla.find('tbody').find_all('tr'):
+        celdas = fila.find_all('td')
+        
+        # Extraemos los datos de cada celda
+        orden = celdas[0].text.strip()
+        
+        # Extraemos el nombre y la URL de la comisión
+        link_comision = celdas[1].find('a')
+        nombre = link_comision.text.strip()
+        url_comision = f"https://www.hcdn.gob.ar{link_comision['href']}"
+        codigo_comision = link_comision['href'].split('/')[-1]
+        
+        tipo = celdas[2].text.strip()
+        horario = celdas[3].text.strip()
+        secretario = celdas[4].text.strip()
+        
+        # La última celda contiene información de contacto
+        sede_contacto = celdas[5].text.strip().replace('\n', ' ').replace('\t', ' ')
+        while '  ' in sede_contacto:
+            sede_contacto = sede_contacto.replace('  ', ' ')
+        
+        # Creamos un diccionario con la información
+        comision = {
+            'orden': orden,
+            'nombre': nombre,
+            'codigo': codigo_comision,
+            'url': url_comision,
+            'tipo': tipo,
+            'horario': horario,
+            'secretario': secretario,
+            'sede_contacto': sede_contacto,
+            'fecha_extraccion': datetime.now().strftime("%Y-%m-%d")
+        }
+        
+        comisiones.append(comision)
+    
+    return comisiones
+
+def obtener_integrantes_comision(codigo_comision, nombre_comision, estricto=False):
+    """
+    Obtiene los integrantes de una comisión específica.
+    Con estricto=True los errores de descarga se propagan en lugar de devolver una lista vacía.
+    """
     # Construimos la URL para los integrantes de la comisión
     url_integrantes = f"https://www.hcdn.gob.ar/comisiones/permanentes/{codigo_comision}/integrantes.html"
     
     try:
         print(f"Obteniendo integrantes de {nombre_comision}...")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url_integrantes, headers=headers)
+        # El limitador del cliente espacia las solicitudes al host (como mucho 4 segundos)
+        cliente = obtener_cliente()
+        response = cliente.get(url_integrantes, pausa=(1.5, 4), etiqueta=codigo_comision)
         
         if response.status_code != 200:
             print(f"Error al obtener integrantes de {nombre_comision}: {response.status_code}")
+            if estricto:
+                raise RuntimeError(f"HTTP {response.status_code} en {url_integrantes}")
             return []
         
-        # Añadimos una pausa para evitar sobrecargar el servidor
-        time.sleep(random.uniform(1.5, 4))  # Pausa aleatoria entre 1.5 y 4 segundos
-            
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Buscamos la tabla de integrantes
-        tabla = soup.find('table', id='tablaintegrantes')
-        
-        # Si no encontramos por ID, buscamos por clase
-        if not tabla:
-            tabla = soup.find('table', class_='tablaIntegrantes')
-        
-        # Si aún no encontramos, buscamos cualquier tabla con información de diputados
-        if not tabla:
-            tablas = soup.find_all('table')
-            for t in tablas:
-                if t.find(string=re.compile('diputado|Diputado|cargo|Cargo', re.IGNORECASE)):
-                    tabla = t
-                    break
-        
-        if not tabla:
-            print(f"No se encontró la tabla de integrantes para {nombre_comision}")
-            return []
+        # Si la página no cambió desde la última corrida, reutilizamos lo ya extraído
+        previos = cliente.resultado_previo(url_integrantes, response)
+        if previos is not None:
+            print(f"Se encontraron {len(previos)} integrantes en {nombre_comision} (página sin cambios)")
+            return refrescar_fecha_extraccion(previos)
         
-        integrantes = []
-        
-        # Buscamos el tbody o usamos directamente las filas de la tabla
-        tbody = tabla.find('tbody')
-        if tbody:
-            filas = tbody.find_all('tr')
-        else:
-            filas = tabla.find_all('tr')
-        
-        # Iteramos por cada fila, saltando encabezados
-        for fila in filas:
-            # Saltamos filas de encabezado
-            if fila.find('th'):
-                continue
-                
-            celdas = fila.find_all('td')
-            
-            # Verificamos que haya suficientes celdas
-            if len(celdas) < 4:  # Mínimo necesario: imagen, cargo, nombre, bloque
-                continue
-            
-            # Extraer cargo
-            cargo = celdas[1].text.strip()
-            
-            # Extraer nombre y URL del perfil
-            nombre_cell = celdas[2]
-            link_diputado = nombre_cell.find('a')
-            
-            if link_diputado:
-                nombre_completo = link_diputado.text.strip()
-                codigo_diputado = link_diputado['href'].split('/')[-1] if '/' in link_diputado['href'] else None
-            else:
-                nombre_completo = nombre_cell.text.strip()
-                codigo_diputado = None
-            
-            # Extraer bloque político
-            bloque = celdas[3].text.strip()
-            
-            # Extraer distrito (si existe)
-            distrito = celdas[4].text.strip() if len(celdas) > 4 else None
-            
-            # Crear diccionario con la información del integrante
-            integrante = {
-                'comision_codigo': codigo_comision,
-                'comision_nombre': nombre_comision,
-                'codigo_diputado': codigo_diputado,
-                'nombre_completo': nombre_completo,
-                'cargo': cargo,
-                'bloque': bloque,
-                'distrito': distrito,
-                'fecha_extraccion': datetime.now().strftime("%Y-%m-%d")
-            }
-            
-            integrantes.append(integrante)
+        with medir_fase('parseo'):
+            integrantes = extraer_integrantes(response.text, codigo_comision, nombre_comision)
         
+        cliente.recordar_resultado(url_integrantes, response, integrantes)
         print(f"Se encontraron {len(integrantes)} integrantes en {nombre_comision}")
         return integrantes
         
     except Exception as e:
         print(f"Error al obtener integrantes de {nombre_comision}: {e}")
+        if estricto:
+            raise
         return []
 
-def obtener_reuniones_comision(codigo_comision, nombre_comision, anios):
-    """Obtiene todas las reuniones de una comisión para los años especificados"""
-    todas_reuniones = []
+def extraer_integrantes(html, codigo_comision, nombre_comision, parser=None, parcial=True):
+    """Extrae los integrantes de la tabla de la página de una comisión"""
+    # Parseamos sólo las tablas de la página
+    soup = crear_sopa(html, SOLO_TABLAS, parser, parcial)
     
-    for anio in anios:
-        # Construimos la URL para las reuniones del año
-        url = f"https://www.hcdn.gob.ar/comisiones/permanentes/{codigo_comision}/reuniones/listado-partes.html?year={anio}&carpeta={codigo_comision}"
-        
-        try:
-            print(f"Obteniendo reuniones de {nombre_comision} para el año {anio}...")
-            response = requests.get(url)
-            
-            if response.status_code != 200:
-                print(f"Error al obtener la página de reuniones: {response.status_code}")
-                continue
-            
-            # Añadimos una pausa para evitar sobrecargar el servidor
-            time.sleep(random.uniform(1.5, 4))  # Pausa aleatoria entre 1.5 y 4 segundos
-                
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Buscamos la sección de partes
-            seccion_partes = soup.find('section', class_='partes')
-            if not seccion_partes:
-                print(f"No se encontró la sección de partes para {nombre_comision} en {anio}")
-                continue
-                
-            # Buscamos todos los enlaces a partes de reuniones
-            enlaces = seccion_partes.find_all('a', href=True)
-            
-            for enlace in enlaces:
-                if 'parte.html?id_reunion=' in enlace['href']:
-                    # Extraemos la información del enlace
-                    texto = enlace.text.strip()
-                    url_parte = f"https://www.hcdn.gob.ar/comisiones/permanentes/{codigo_comision}/reuniones/{enlace['href']}"
-                    
-                    # Extraemos el ID de la reunión y la fecha
-                    id_reunion = enlace['href'].split('id_reunion=')[1].split('&')[0]
-                    fecha = enlace['href'].split('fecha=')[1] if 'fecha=' in enlace['href'] else None
-                    
-                    # Si no pudimos extraer la fecha del parámetro, intentamos extraerla del texto
-                    if not fecha and 'del ' in texto:
-                        fecha = texto.split('del ')[1].strip()
-                    
-                    # Creamos un diccionario con la información de la reunión
-                    reunion = {
-                        'comision_nombre': nombre_comision,
-                        'comision_codigo': codigo_comision,
-                        'id_reunion': id_reunion,
-                        'fecha': fecha,
-                        'anio': anio,
-                        'texto': texto,
-                        'url': url_parte,
-                        'fecha_extraccion': datetime.now().strftime("%Y-%m-%d")
-                    }
-                    
-                    todas_reuniones.append(reunion)
-            
-            print(f"Se encontraron {len(enlaces)} enlaces para {nombre_comision} en {anio}")
-            
-        except Exception as e:
-            print(f"Error al obtener reuniones de {nombre_comision} para {anio}: {e}")
+    # Buscamos la tabla de integrantes
+    tabla = soup.find('table', id='tablaintegrantes')
+    
+    # Si no encontramos por ID, buscamos por clase
+    if not tabla:
+        tabla = soup.find('table', class_='tablaIntegrantes')
+    
+    # Si aún no encontramos, buscamos cualquier tabla con información de diputados
+    if not tabla:
+        tablas = soup.find_all('table')
+        for t in tablas:
+            if t.find(string=re.compile('diputado|Diputado|cargo|Cargo', re.IGNORECASE)):
+                tabla = t
+                break
+    
+    if not tabla:
+        print(f"No se encontró la tabla de integrantes para {nombre_comision}")
+        return []
     
-    return todas_reuniones
-
-def cargar_integrantes_existentes(nombre_archivo):
-    """Carga los integrantes existentes desde un archivo CSV"""
     integrantes = []
     
-    if not os.path.exists(nombre_archivo):
-        return integrantes
+    # Buscamos el tbody o usamos directamente las filas de la tabla
+    tbody = tabla.find('tbody')
+    if tbody:
+        filas = tbody.find_all('tr')
+    else:
+        filas = tabla.find_all('tr')
+    
+    # Iteramos por cada fila, saltando encabezados
+    for fila in filas:
+        # Saltamos filas de encabezado
+        if fila.find('th'):
+            continue
+            
+        celdas = fila.find_all('td')
+        
+        # Verificamos que haya suficientes celdas
+        if len(celdas) < 4:  # Mínimo necesario: imagen, cargo, nombre, bloque
+            continue
+        
+        # Extraer cargo
+        cargo = celdas[1].text.strip()
+        
+        # Extraer nombre y URL del perfil
+        nombre_cell = celdas[2]
+        link_diputado = nombre_cell.find('a')
+        
+        if link_diputado:
+            nombre_completo = link_diputado.text.strip()
+            codigo_diputado = link_diputado['href'].split('/')[-1] if '/' in link_diputado['href'] else None
+        else:
+            nombre_completo = nombre_cell.text.strip()
+            codigo_diputado = None
+        
+        # Extraer bloque político
+        bloque = celdas[3].text.strip()
+        
+        # Extraer distrito (si existe)
+        distrito = celdas[4].text.strip() if len(celdas) > 4 else None
+        
+        # Crear diccionario con la información del integrante
+        integrante = {
+            'comision_codigo': codigo_comision,
+            'comision_nombre': nombre_comision,
+            'codigo_diputado': codigo_diputado,
+            'nombre_completo': nombre_completo,
+            'cargo': cargo,
+            'bloque': bloque,
+            'distrito': distrito,
+            'fecha_extraccion': datetime.now().strftime("%Y-%m-%d")
+        }
         
+        integrantes.append(integrante)
+    
+    return integrantes
+
+def obtener_reuniones_anio(codigo_comision, nombre_comision, anio, estricto=False):
+    """
+    Obtiene las reuniones de una comisión para un año.
+    Con estricto=True los errores de descarga se propagan en lugar de devolver una lista vacía.
+    """
+    # Construimos la URL para las reuniones del año
+    url = f"https://www.hcdn.gob.ar/comisiones/permanentes/{codigo_comision}/reuniones/listado-partes.html?year={anio}&carpeta={codigo_comision}"
+    
     try:
-        with open(nombre_archivo, 'r', encoding='utf-8') as archivo:
-            reader = csv.DictReader(archivo)
-            for fila in reader:
-                integrantes.append(fila)
-                
-        print(f"Se cargaron {len(integrantes)} registros de integrantes desde {nombre_archivo}")
-        return integrantes
+        print(f"Obteniendo reuniones de {nombre_comision} para el año {anio}...")
+        # El limitador del cliente espacia las solicitudes al host (como mucho 4 segundos)
+        cliente = obtener_cliente()
+        response = cliente.get(url, pausa=(1.5, 4), etiqueta=codigo_comision)
+        
+        if response.status_code != 200:
+            print(f"Error al obtener la página de reuniones: {response.status_code}")
+            if estricto:
+                raise RuntimeError(f"HTTP {response.status_code} en {url}")
+            return []
+        
+        # Si la página no cambió desde la última corrida, reutilizamos lo ya extraído
+        previas = cliente.resultado_previo(url, response)
+        if previas is not None:
+            print(f"Se encontraron {len(previas)} reuniones para {nombre_comision} en {anio} (página sin cambios)")
+            return refrescar_fecha_extraccion(previas)
+        
+        with medir_fase('parseo'):
+            reuniones = extraer_reuniones(response.text, codigo_comision, nombre_comision, anio)
+        if reuniones is None:
+            return []
+        
+        cliente.recordar_resultado(url, response, reuniones)
+        print(f"Se encontraron {len(reuniones)} reuniones para {nombre_comision} en {anio}")
+        return reuniones
         
     except Exception as e:
-        print(f"Error al cargar integrantes desde {nombre_archivo}: {e}")
+        print(f"Error al obtener reuniones de {nombre_comision} para {anio}: {e}")
+        if estricto:
+            raise
         return []
 
-def actualizar_integrantes_con_fechas(existentes, nuevos):
+def extraer_reuniones(html, codigo_comision, nombre_comision, anio, parser=None, parcial=True):
     """
-    Actualiza los integrantes con fechas de inicio y fin.
-    - Si el integrante sigue: actualiza fecha_fin
-    - Si el integrante cambió: cierra el anterior y agrega el nuevo
+    Extrae las reuniones del listado de partes de un año.
+    Devuelve None si la página no tiene la sección de partes.
     """
-    fecha_actual = datetime.now().strftime("%Y-%m-%d")
+    # Parseamos sólo la sección de partes
+    soup = crear_sopa(html, SOLO_SECCION_PARTES, parser, parcial)
+    
+    # Buscamos la sección de partes
+    seccion_partes = soup.find('section', class_='partes')
+    if not seccion_partes:
+        print(f"No se encontró la sección de partes para {nombre_comision} en {anio}")
+        return None
+    
+    reuniones = []
+    
+    # Buscamos todos los enlaces a partes de reuniones
+    enlaces = seccion_partes.find_all('a', href=True)
     
-    # Crear diccionario para búsqueda rápida: clave = comision_codigo + nombre_completo + bloque
-    # Esto maneja casos donde hay personas con el mismo nombre en diferentes bloques
-    dict_nuevos = {}
-    for integrante in nuevos:
-        clave = f"{integrante['comision_codigo']}_{integrante['nombre_completo']}_{integrante['bloque']}"
-        dict_nuevos[clave] = integrante
-    
-    # Crear diccionario de existentes por clave similar
-    dict_existentes = {}
-    for integrante in existentes:
-        clave = f"{integrante['comision_codigo']}_{integrante['nombre_completo']}_{integrante['bloque']}"
-        dict_existentes[clave] = integrante
-    
-    resultado = []
-    
-    # Procesar integrantes existentes
-    for clave, existente in dict_existentes.items():
-        if clave in dict_nuevos:
-            # La misma persona del mismo bloque sigue en la misma comisión
-            nuevo = dict_nuevos[clave]
+    for enlace in enlaces:
+        if 'parte.html?id_reunion=' in enlace['href']:
+            # Extraemos la información del enlace
+            texto = enlace.text.strip()
+            url_parte = f"https://www.hcdn.gob.ar/comisiones/permanentes/{codigo_comision}/reuniones/{enlace['href']}"
             
-            # Actualizar datos que pueden cambiar (cargo puede cambiar, bloque se mantiene en la clave)
-            existente['cargo'] = nuevo['cargo']  # El cargo puede haber cambiado
-            existente['distrito'] = nuevo['distrito']  # El distrito puede haber cambiado
-            existente['fecha_fin'] = fecha_actual  # Actualizar fecha fin
+            # Extraemos el ID de la reunión y la fecha
+            id_reunion = enlace['href'].split('id_reunion=')[1].split('&')[0]
+            fecha = enlace['href'].split('fecha=')[1] if 'fecha=' in enlace['href'] else None
             
-            resultado.append(existente)
+            # Si no pudimos extraer la fecha del parámetro, intentamos extraerla del texto
+            if not fecha and 'del ' in texto:
+                fecha = texto.split('del ')[1].strip()
             
-            # Remover de nuevos para no duplicar
-            del dict_nuevos[clave]
-        else:
-            # La persona ya no está en la comisión con ese bloque, cerrar
-            if not existente.get('fecha_fin') or existente.get('fecha_fin') == existente.get('fecha_inicio'):
-                existente['fecha_fin'] = fecha_actual
-            resultado.append(existente)
+            # Creamos un diccionario con la información de la reunión
+            reunion = {
+                'comision_nombre': nombre_comision,
+                'comision_codigo': codigo_comision,
+                'id_reunion': id_reunion,
+                'fecha': fecha,
+                'anio': anio,
+                'texto': texto,
+                'url': url_parte,
+                'fecha_extraccion': datetime.now().strftime("%Y-%m-%d")
+            }
+            
+            reuniones.append(reunion)
     
-    # Agregar todos los nuevos integrantes que no existían antes
-    for clave, nuevo in dict_nuevos.items():
-        nuevo['fecha_inicio'] = fecha_actual
-        nuevo['fecha_fin'] = fecha_actual
-        resultado.append(nuevo)
+    return reuniones
+
+def ejecutar_en_orden(tareas, concurrencia=1, pendientes_maximos=None):
+    """
+    Ejecuta tareas (funciones sin argumentos) y devuelve sus resultados en el mismo
+    orden en que fueron recibidas.
+    Con concurrencia 1 se ejecutan de a una; con más, en un pool de hilos acotado. Las
+    tareas se toman de a poco: como mucho `pendientes_maximos` (por defecto el doble de
+    la concurrencia) quedan en curso o esperando que se consuma su resultado, así los
+    resultados no se acumulan en memoria.
+    """
+    if concurrencia <= 1:
+        for tarea in tareas:
+            yield tarea()
+        return
+    
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    pendientes_maximos = pendientes_maximos or 2 * concurrencia
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        futuros = deque()
+        for tarea in tareas:
+            futuros.append(pool.submit(tarea))
+            if len(futuros) >= pendientes_maximos:
+                yield futuros.popleft().result()
+        while futuros:
+            yield futuros.popleft().result()
+
+def armar_unidades(comisiones, anios, anios_por_comision=None):
+    """
+    Divide el recorrido en unidades de trabajo (comisión, recurso, año): los integrantes
+    de cada comisión y luego un listado de reuniones por año. Con `anios_por_comision`
+    (ver agenda_comisiones.py) cada comisión recorre sus propios años.
+    """
+    for comision in comisiones:
+        yield (comision, 'integrantes', None)
+        for anio in anios_de_comision(comision, anios, anios_por_comision):
+            yield (comision, 'reuniones', anio)
+
+def anios_de_comision(comision, anios, anios_por_comision=None):
+    if anios_por_comision is None:
+        return anios
+    return anios_por_comision.get(comision['codigo'], anios)
+
+def agrupar_por_comision(resultados, comisiones, anios, anios_por_comision=None):
+    """
+    Reúne los resultados de las unidades (en el orden de armar_unidades) y genera
+    (comisión, integrantes, reuniones) apenas se completa cada comisión. Si no se
+    pudieron descargar los integrantes, se entregan como None; un listado de reuniones
+    que falló no aporta reuniones.
+    """
+    for comision in comisiones:
+        integrantes = next(resultados)
+        reuniones = []
+        for _ in anios_de_comision(comision, anios, anios_por_comision):
+            reuniones.extend(next(resultados) or [])
+        yield comision, integrantes, reuniones
+
+def clave_unidad(comision, recurso, anio):
+    return f"{comision['codigo']}|{recurso}|{anio if anio is not None else ''}"
+
+def procesar_unidad(unidad, bitacora=None, agenda=None):
+    """
+    Descarga una unidad de trabajo y la registra en la bitácora al terminar.
+    Si la bitácora ya la tiene (corrida reanudada) devuelve esas filas sin descargar.
+    Si la descarga falla la unidad no se registra, para reintentarla al reanudar, y se
+    devuelve None. Los listados de reuniones obtenidos se anotan en la agenda, si se indica.
+    """
+    comision, recurso, anio = unidad
+    clave = clave_unidad(comision, recurso, anio)
     
-    print(f"Actualización de integrantes: {len(existentes)} existentes, {len(nuevos)} nuevos, {len(resultado)} total final")
+    if bitacora:
+        previas = bitacora.filas(clave)
+        if previas is not None:
+            if agenda and recurso == 'reuniones':
+                agenda.consultada(comision['codigo'], anio)
+            return previas
     
-    return resultado
+    try:
+        if recurso == 'integrantes':
+            filas = obtener_integrantes_comision(comision['codigo'], comision['nombre'], estricto=True)
+        else:
+            filas = obtener_reuniones_anio(comision['codigo'], comision['nombre'], anio, estricto=True)
+    except Exception as e:
+        print(f"La unidad {clave} quedó pendiente: {e}")
+        return None
+    
+    if bitacora:
+        bitacora.registrar(clave, filas)
+    if agenda and recurso == 'reuniones':
+        agenda.consultada(comision['codigo'], anio)
+    return filas
+
+def cargar_integrantes_existentes(nombre_archivo):
+    """Carga los integrantes existentes desde un archivo CSV"""
+    return cargar_csv(nombre_archivo, 'registros de integrantes')
 
 def cargar_reuniones_existentes(nombre_archivo):
     """Carga las reuniones existentes desde un archivo CSV"""
-    reuniones = []
-    
-    if not os.path.exists(nombre_archivo):
-        return reuniones
-        
+    return cargar_csv(nombre_archivo, 'reuniones existentes')
+
+def clave_reunion(reunion):
+    return f"{reunion['comision_codigo']}_{reunion['id_reunion']}"
+
+def clave_periodo(integrante):
+    return (*clave_integrante(integrante), integrante.get('fecha_inicio'))
+
+def clave_comision(comision):
+    return comision['codigo']
+
+class DestinoIntegrantesCSV:
+    """
+    Incorpora al histórico los integrantes de cada comisión apenas se descargan (ver
+    historial_integrantes.py): quien sigue extiende su período, quien aparece o vuelve
+    abre uno nuevo. Los períodos de una comisión cuyos integrantes no se pudieron
+    descargar no se tocan. El CSV se escribe al terminar el recorrido.
+    """
+
+    def __init__(self, nombre_archivo):
+        self.nombre_archivo = nombre_archivo
+        self.fecha_actual = datetime.now().strftime("%Y-%m-%d")
+        existentes = cargar_integrantes_existentes(nombre_archivo)
+        self.existentes = len(existentes)
+        self.historial = HistorialIntegrantes(existentes)
+        # Comisiones del histórico que todavía no se incorporaron en esta corrida
+        self.pendientes = set(self.historial.comisiones())
+        self.recibidos = 0
+        self.agregados = 0
+
+    def agregar(self, codigo_comision, integrantes):
+        self.recibidos += len(integrantes)
+        self.agregados += self.historial.actualizar(integrantes, self.fecha_actual, {codigo_comision})
+        self.pendientes.discard(codigo_comision)
+
+    def omitir(self, codigo_comision):
+        """La comisión no se pudo descargar: sus períodos quedan como estaban"""
+        self.pendientes.discard(codigo_comision)
+
+    def cerrar(self):
+        # Las comisiones que ya no figuran se actualizan como si no tuvieran integrantes
+        if self.pendientes:
+            self.historial.actualizar([], self.fecha_actual, self.pendientes)
+        resultado = self.historial.filas
+        print(f"Actualización de integrantes: {self.existentes} existentes, {self.recibidos} nuevos, "
+              f"{self.agregados} períodos agregados, {len(resultado)} total final")
+        if resultado:
+            guardar_csv(resultado, self.nombre_archivo, CAMPOS_INTEGRANTES, clave_periodo)
+
+class DestinoIntegrantesSQLite:
+    """Como DestinoIntegrantesCSV, con upserts en la base SQLite; al terminar exporta el CSV"""
+
+    def __init__(self, almacen, nombre_archivo):
+        self.almacen = almacen
+        self.nombre_archivo = nombre_archivo
+        self.fecha_actual = datetime.now().strftime("%Y-%m-%d")
+        self.existentes = almacen.contar('integrantes')
+        self.pendientes = almacen.comisiones_integrantes()
+        self.recibidos = 0
+
+    def agregar(self, codigo_comision, integrantes):
+        self.recibidos += len(integrantes)
+        self.almacen.actualizar_integrantes(integrantes, self.fecha_actual, [codigo_comision])
+        self.pendientes.discard(codigo_comision)
+
+    def omitir(self, codigo_comision):
+        self.pendientes.discard(codigo_comision)
+
+    def cerrar(self):
+        if self.pendientes:
+            self.almacen.actualizar_integrantes([], self.fecha_actual, self.pendientes)
+        print(f"Actualización de integrantes: {self.existentes} existentes, {self.recibidos} nuevos, "
+              f"{self.almacen.contar('integrantes')} total final")
+        self.almacen.exportar_csv('integrantes', self.nombre_archivo, CAMPOS_INTEGRANTES, clave=clave_periodo)
+
+class DestinoReunionesCSV:
+    """
+    Agrega al final del CSV las reuniones de cada comisión apenas se descargan, salteando
+    las que ya estaban (por clave), sin cargar el histórico. Con `ruta_indice` las claves
+    se guardan en un índice persistido (almacenamiento incremental); si no, se leen del
+    CSV al empezar.
+    """
+
+    def __init__(self, nombre_archivo, ruta_indice=None):
+        self.nombre_archivo = nombre_archivo
+        try:
+            self.csv = CSVIncremental(nombre_archivo, CAMPOS_REUNIONES, clave_reunion, ruta_indice)
+        except ValueError as e:
+            # Un CSV con otras columnas se reescribe una vez con las actuales
+            print(f"{e}; se reescribe con las columnas actuales")
+            guardar_csv(cargar_reuniones_existentes(nombre_archivo), nombre_archivo, CAMPOS_REUNIONES, clave_reunion)
+            self.csv = CSVIncremental(nombre_archivo, CAMPOS_REUNIONES, clave_reunion, ruta_indice)
+        self.agregadas = 0
+
+    def agregar(self, reuniones):
+        unicas = self.csv.agregar(reuniones, guardar_indice=False)
+        self.agregadas += len(unicas)
+        obtener_cambios().registrar(self.nombre_archivo, diferencias([], unicas, CAMPOS_REUNIONES, clave_reunion))
+
+    def cerrar(self):
+        self.csv.guardar_indice()
+        print(f"Se encontraron {self.agregadas} nuevas reuniones únicas")
+        print(f"Total de reuniones después de combinar: {len(self.csv)}")
+
+class DestinoReunionesSQLite:
+    """Inserta las reuniones nuevas de cada comisión en la base; al terminar exporta el CSV"""
+
+    def __init__(self, almacen, nombre_archivo):
+        self.almacen = almacen
+        self.nombre_archivo = nombre_archivo
+        self.agregadas = 0
+
+    def agregar(self, reuniones):
+        self.agregadas += self.almacen.agregar_reuniones(reuniones)
+
+    def cerrar(self):
+        print(f"Se encontraron {self.agregadas} nuevas reuniones únicas")
+        print(f"Total de reuniones después de combinar: {self.almacen.contar('reuniones')}")
+        self.almacen.exportar_csv('reuniones', self.nombre_archivo, CAMPOS_REUNIONES, clave=clave_reunion)
+
+def tipo_particion(texto):
     try:
-        with open(nombre_archivo, 'r', encoding='utf-8') as archivo:
-            reader = csv.DictReader(archivo)
-            for fila in reader:
-                reuniones.append(fila)
-                
-        print(f"Se cargaron {len(reuniones)} reuniones existentes desde {nombre_archivo}")
-        return reuniones
-        
-    except Exception as e:
-        print(f"Error al cargar reuniones desde {nombre_archivo}: {e}")
-        return []
+        return interpretar_particion(texto)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
-def combinar_reuniones(reuniones_existentes, nuevas_reuniones):
-    """Combina las reuniones existentes con las nuevas, evitando duplicados"""
-    # Creamos un conjunto con los IDs de las reuniones existentes
-    ids_existentes = set()
-    for reunion in reuniones_existentes:
-        id_clave = f"{reunion['comision_codigo']}_{reunion['id_reunion']}"
-        ids_existentes.add(id_clave)
-    
-    # Filtramos las nuevas reuniones para excluir las que ya existen
-    reuniones_unicas = []
-    for reunion in nuevas_reuniones:
-        id_clave = f"{reunion['comision_codigo']}_{reunion['id_reunion']}"
-        if id_clave not in ids_existentes:
-            reuniones_unicas.append(reunion)
-            ids_existentes.add(id_clave)  # Añadimos a existentes para no duplicar
-    
-    # Combinamos las existentes con las nuevas únicas
-    todas_reuniones = reuniones_existentes + reuniones_unicas
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Scrapea comisiones, integrantes y reuniones de la Cámara de Diputados."
+    )
+    parser.add_argument(
+        "--concurrencia",
+        type=int,
+        default=int(os.environ.get('CONCURRENCIA', '1')),
+        help="Cantidad máxima de páginas descargadas en paralelo. Default: 1 (secuencial).",
+    )
+    parser.add_argument(
+        "--almacenamiento",
+        choices=("completo", "incremental", "sqlite"),
+        default=os.environ.get('ALMACENAMIENTO', 'completo'),
+        help="completo: agrega las reuniones nuevas leyendo las claves del CSV; incremental: igual, "
+             "con un índice de claves persistido; sqlite: combina en una base SQLite indexada y exporta "
+             "los CSV. Default: completo.",
+    )
+    parser.add_argument(
+        "--base-sqlite",
+        help="Ruta de la base para --almacenamiento sqlite. Default: dentro del directorio de estado.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reanuda una corrida interrumpida salteando las unidades ya registradas en la bitácora.",
+    )
+    parser.add_argument(
+        "--barrido-completo",
+        action="store_true",
+        help="Consulta las reuniones de todas las comisiones, incluso las que la agenda saltearía "
+             "por inactivas.",
+    )
+    parser.add_argument(
+        "--concurrencia-por-host",
+        type=int,
+        default=int(os.environ.get('CONCURRENCIA_POR_HOST', str(CONCURRENCIA_POR_HOST))),
+        help=f"Cantidad máxima de solicitudes simultáneas a un mismo host. Default: {CONCURRENCIA_POR_HOST}.",
+    )
+    modos = parser.add_mutually_exclusive_group()
+    modos.add_argument(
+        "--planificar",
+        action="store_true",
+        help="Planifica un recorrido histórico completo en particiones: guarda en --dir-particiones "
+             "el manifiesto con las unidades (comisión, recurso, año) sin descargarlas.",
+    )
+    modos.add_argument(
+        "--shard",
+        metavar="I/N",
+        type=tipo_particion,
+        help="Descarga sólo la partición I de N del manifiesto y guarda sus filas en --dir-particiones, "
+             "sin tocar los CSV. Con --resume retoma las unidades que faltaban.",
+    )
+    modos.add_argument(
+        "--combinar",
+        action="store_true",
+        help="Combina los resultados de todas las particiones del manifiesto en los CSV, igual que "
+             "una corrida en un solo proceso.",
+    )
+    parser.add_argument(
+        "--dir-particiones",
+        default=DIRECTORIO_PARTICIONES,
+        help=f"Directorio del manifiesto y de los resultados de las particiones. Default: {DIRECTORIO_PARTICIONES}.",
+    )
+    parser.add_argument(
+        "--desde",
+        type=int,
+        default=ANIO_INICIAL,
+        help=f"Primer año del recorrido planificado con --planificar. Default: {ANIO_INICIAL}.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila CPU (cProfile) y memoria (tracemalloc) de cada fase; los informes quedan "
+             "en .estado/perfiles/diputados/.",
+    )
+    return parser.parse_args(argv)
+
+def guardar_recorrido(comisiones, anios, resultados, args, anios_por_comision=None):
+    """
+    Guarda las comisiones y combina con el histórico los resultados de las unidades
+    (en el orden de armar_unidades), comisión por comisión.
+    """
+    # Guarda la información de comisiones en un archivo CSV
+    with medir_fase('escritura'):
+        guardar_csv(comisiones, ARCHIVO_COMISIONES, CAMPOS_COMISIONES, clave_comision)
     
-    print(f"Se encontraron {len(reuniones_unicas)} nuevas reuniones únicas")
-    print(f"Total de reuniones después de combinar: {len(todas_reuniones)}")
+    almacen = None
+    with medir_fase('lectura'):
+        if args.almacenamiento == 'sqlite':
+            # La base se pone al día con los CSV si estos cambiaron desde la última exportación
+            almacen = AlmacenSQLite(args.base_sqlite)
+            almacen.sincronizar_csv('integrantes', ARCHIVO_INTEGRANTES)
+            almacen.sincronizar_csv('reuniones', ARCHIVO_REUNIONES)
+            destino_integrantes = DestinoIntegrantesSQLite(almacen, ARCHIVO_INTEGRANTES)
+            destino_reuniones = DestinoReunionesSQLite(almacen, ARCHIVO_REUNIONES)
+        else:
+            # Del histórico de reuniones sólo se necesitan las claves, para no duplicar
+            destino_integrantes = DestinoIntegrantesCSV(ARCHIVO_INTEGRANTES)
+            ruta_indice = ruta_estado(ARCHIVO_INDICE_REUNIONES) if args.almacenamiento == 'incremental' else None
+            destino_reuniones = DestinoReunionesCSV(ARCHIVO_REUNIONES, ruta_indice)
     
-    return todas_reuniones
-
-def guardar_csv(datos, nombre_archivo, campos):
-    """Guarda la información en un archivo CSV"""
-    try:
-        if not datos:
-            print(f"No hay datos para guardar en {nombre_archivo}")
-            return False
-        
-        # Creamos el archivo CSV
-        with open(nombre_archivo, 'w', newline='', encoding='utf-8') as archivo:
-            writer = csv.DictWriter(archivo, fieldnames=campos)
-            writer.writeheader()
-            writer.writerows(datos)
-            
-        print(f"Se ha guardado la información en {nombre_archivo}")
-        return True
+    # Cada comisión se combina y se guarda apenas se completa, sin acumular el recorrido
+    for comision, integrantes_comision, reuniones_comision in agrupar_por_comision(
+        resultados, comisiones, anios, anios_por_comision
+    ):
+        # Mostramos cuántos integrantes y reuniones encontramos
+        if integrantes_comision is None:
+            # Sin la composición actual no se puede saber quién dejó la comisión
+            print(f"No se pudieron obtener los integrantes de {comision['nombre']}: se conservan sus períodos")
+        else:
+            print(f"Total de integrantes para {comision['nombre']}: {len(integrantes_comision)}")
+        print(f"Total de reuniones para {comision['nombre']}: {len(reuniones_comision)}")
         
-    except Exception as e:
-        print(f"Error al guardar el archivo CSV {nombre_archivo}: {e}")
-        return False
-
-def main():
-    # Definimos los archivos CSV
-    archivo_comisiones = 'comisiones_diputados.csv'
-    archivo_reuniones = 'reuniones_diputados.csv'
-    archivo_integrantes = 'integrantes_comisiones.csv'
+        with medir_fase('combinacion'):
+            if integrantes_comision is None:
+                destino_integrantes.omitir(comision['codigo'])
+            else:
+                destino_integrantes.agregar(comision['codigo'], integrantes_comision)
+        with medir_fase('escritura'):
+            destino_reuniones.agregar(reuniones_comision)
     
+    with medir_fase('escritura'):
+        destino_integrantes.cerrar()
+        destino_reuniones.cerrar()
+    if almacen is not None:
+        almacen.cerrar()
+
+def recorrer(args):
+    """Corrida normal: descarga las comisiones y sus unidades y actualiza los CSV"""
     # Verificamos si es primera ejecución o actualización
-    es_primera_ejecucion = not (os.path.exists(archivo_comisiones) and os.path.exists(archivo_reuniones))
+    es_primera_ejecucion = not (os.path.exists(ARCHIVO_COMISIONES) and os.path.exists(ARCHIVO_REUNIONES))
     
     # Definimos los años a escanear
     anio_actual = datetime.now().year
     if es_primera_ejecucion:
-        anios_a_escanear = list(range(2017, anio_actual + 1))
-        print(f"Primera ejecución detectada: escaneando años 2017-{anio_actual}")
+        anios_a_escanear = list(range(ANIO_INICIAL, anio_actual + 1))
+        print(f"Primera ejecución detectada: escaneando años {ANIO_INICIAL}-{anio_actual}")
     else:
         anios_a_escanear = [anio_actual]
         print(f"Actualización detectada: escaneando solo el año actual ({anio_actual})")
@@ -406,62 +715,152 @@ def main():
     # Obtiene la información de las comisiones
     comisiones = obtener_comisiones()
     
-    # Guarda la información de comisiones en un archivo CSV
     if comisiones:
-        campos_comisiones = ['orden', 'nombre', 'codigo', 'url', 'tipo', 'horario', 
-                            'secretario', 'sede_contacto', 'fecha_extraccion']
-        guardar_csv(comisiones, archivo_comisiones, campos_comisiones)
-        
-        # Cargamos los integrantes existentes (si los hay)
-        integrantes_existentes = cargar_integrantes_existentes(archivo_integrantes)
-        
-        # Cargamos las reuniones existentes (si las hay)
-        reuniones_existentes = cargar_reuniones_existentes(archivo_reuniones)
-        
-        # Ahora obtenemos las reuniones e integrantes para cada comisión
-        nuevas_reuniones = []
-        nuevos_integrantes = []
-        
-        for comision in comisiones:
-            # Obtenemos los integrantes para esta comisión
-            integrantes_comision = obtener_integrantes_comision(
-                comision['codigo'], 
-                comision['nombre']
+        # La agenda decide a qué comisiones pedirles las reuniones según su actividad
+        agenda = AgendaComisiones()
+        with medir_fase('lectura'):
+            anios_por_comision = agenda.planificar(
+                comisiones, leer_actividad(ARCHIVO_REUNIONES), anios_a_escanear,
+                barrido_completo=es_primera_ejecucion or args.barrido_completo,
             )
-            
-            nuevos_integrantes.extend(integrantes_comision)
-            
-            # Obtenemos las reuniones para esta comisión
-            reuniones_comision = obtener_reuniones_comision(
-                comision['codigo'], 
-                comision['nombre'],
-                anios_a_escanear
-            )
-            
-            nuevas_reuniones.extend(reuniones_comision)
-            
-            # Mostramos cuántos integrantes y reuniones encontramos
-            print(f"Total de integrantes para {comision['nombre']}: {len(integrantes_comision)}")
-            print(f"Total de reuniones para {comision['nombre']}: {len(reuniones_comision)}")
-        
-        # Actualizamos los integrantes con fechas de inicio y fin
-        todos_integrantes = actualizar_integrantes_con_fechas(integrantes_existentes, nuevos_integrantes)
-        
-        # Guardamos todos los integrantes en un archivo CSV
-        if todos_integrantes:
-            campos_integrantes = ['comision_codigo', 'comision_nombre', 'codigo_diputado', 
-                                'nombre_completo', 'cargo', 'bloque', 'distrito', 
-                                'fecha_inicio', 'fecha_fin', 'fecha_extraccion']
-            guardar_csv(todos_integrantes, archivo_integrantes, campos_integrantes)
         
-        # Combinamos las reuniones existentes con las nuevas
-        todas_reuniones = combinar_reuniones(reuniones_existentes, nuevas_reuniones)
-        
-        # Guardamos todas las reuniones en un archivo CSV
-        if todas_reuniones:
-            campos_reuniones = ['comision_nombre', 'comision_codigo', 'id_reunion', 'fecha', 
-                               'anio', 'texto', 'url', 'fecha_extraccion']
-            guardar_csv(todas_reuniones, archivo_reuniones, campos_reuniones)
+        # La bitácora registra cada unidad terminada; al reanudar se usan los años de la corrida original
+        bitacora = BitacoraCrawl(ruta_estado(ARCHIVO_BITACORA))
+        encabezado = bitacora.iniciar({
+            'anios': anios_a_escanear,
+            'anios_por_comision': anios_por_comision,
+            'barrido_completo': agenda.barrido,
+        }, reanudar=args.resume)
+        anios_a_escanear = encabezado['anios']
+        anios_por_comision = encabezado.get('anios_por_comision')
+        agenda.fijar_plan(anios_por_comision, encabezado.get('barrido_completo', False))
+        if anios_por_comision is not None:
+            obtener_metricas().contar('reuniones_salteadas', sum(1 for anios in anios_por_comision.values() if not anios))
+        
+        # Armamos una tarea por página: integrantes y luego un listado de reuniones por año.
+        # Los resultados se consumen en este mismo orden, así los CSV quedan iguales
+        # sin importar el nivel de concurrencia.
+        pendientes = []
+        
+        def procesar(unidad):
+            filas = procesar_unidad(unidad, bitacora, agenda)
+            if filas is None:
+                pendientes.append(clave_unidad(*unidad))
+            return filas
+        
+        tareas = (
+            lambda u=unidad: procesar(u)
+            for unidad in armar_unidades(comisiones, anios_a_escanear, anios_por_comision)
+        )
+        
+        if args.concurrencia > 1:
+            print(f"Modo concurrente: {args.concurrencia} descargas en paralelo, "
+                  f"{args.concurrencia_por_host} por host")
+        guardar_recorrido(comisiones, anios_a_escanear, ejecutar_en_orden(tareas, args.concurrencia), args,
+                          anios_por_comision)
+        agenda.guardar()
+        
+        if pendientes:
+            # Se conserva la bitácora para descargar sólo lo que falta con --resume
+            bitacora.cerrar()
+            print(f"Quedaron {len(pendientes)} unidades pendientes; vuelva a correr con --resume para completarlas")
+            return 1
+        # Los resultados ya quedaron guardados: la bitácora deja de ser necesaria
+        bitacora.finalizar()
+    return 0
+
+def planificar(args):
+    """Guarda el manifiesto de un recorrido histórico completo para repartirlo en particiones"""
+    comisiones = obtener_comisiones()
+    if not comisiones:
+        print("No se pudieron obtener las comisiones: no se planificó el recorrido")
+        return 1
+    
+    anios = list(range(args.desde, datetime.now().year + 1))
+    manifiesto = crear_manifiesto(
+        (clave_unidad(*unidad) for unidad in armar_unidades(comisiones, anios)),
+        anios=anios,
+        comisiones=comisiones,
+    )
+    ruta = guardar_manifiesto(args.dir_particiones, manifiesto)
+    print(f"Manifiesto {manifiesto['id']}: {len(comisiones)} comisiones, años {anios[0]}-{anios[-1]}, "
+          f"{len(manifiesto['unidades'])} unidades en {ruta}")
+    return 0
+
+def descargar_particion(args):
+    """Descarga las unidades de una partición del manifiesto y guarda sus filas"""
+    indice, total = args.shard
+    try:
+        manifiesto = cargar_manifiesto(args.dir_particiones)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+    claves = set(claves_de_particion(manifiesto, indice, total))
+    unidades = [
+        unidad for unidad in armar_unidades(manifiesto['comisiones'], manifiesto['anios'])
+        if clave_unidad(*unidad) in claves
+    ]
+    print(f"Partición {indice}/{total} del manifiesto {manifiesto['id']}: "
+          f"{len(unidades)} de {len(manifiesto['unidades'])} unidades")
+    
+    # Los resultados se registran unidad por unidad en el archivo de la partición
+    salida = abrir_particion(args.dir_particiones, manifiesto, indice, total, reanudar=args.resume)
+    tareas = (lambda u=unidad: procesar_unidad(u, salida) for unidad in unidades)
+    for _ in ejecutar_en_orden(tareas, args.concurrencia):
+        pass
+    salida.cerrar()
+    
+    _, completadas = leer_bitacora(ruta_particion(args.dir_particiones, indice, total))
+    faltantes = len(claves - set(completadas))
+    if faltantes:
+        print(f"Quedaron {faltantes} unidades pendientes; vuelva a correr la partición con --resume")
+        return 1
+    print(f"Partición {indice}/{total} completa")
+    return 0
+
+def combinar(args):
+    """Combina los resultados de todas las particiones en los CSV"""
+    try:
+        manifiesto = cargar_manifiesto(args.dir_particiones)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+    completadas, faltantes = leer_particiones(args.dir_particiones, manifiesto)
+    if faltantes:
+        print(f"Faltan {len(faltantes)} de {len(manifiesto['unidades'])} unidades del manifiesto "
+              f"{manifiesto['id']}: {', '.join(faltantes[:MAX_FALTANTES_INFORME])}"
+              f"{' ...' if len(faltantes) > MAX_FALTANTES_INFORME else ''}")
+        return 1
+    
+    comisiones, anios = manifiesto['comisiones'], manifiesto['anios']
+    print(f"Combinando {len(completadas)} unidades del manifiesto {manifiesto['id']}")
+    # Las unidades se entregan en el orden del manifiesto, como en una corrida normal
+    resultados = (completadas.pop(clave_unidad(*unidad)) for unidad in armar_unidades(comisiones, anios))
+    guardar_recorrido(comisiones, anios, resultados, args)
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    metricas = reiniciar_metricas()
+    reiniciar_cambios('diputados')
+    if args.profile:
+        from perfilado import Perfilador
+
+        metricas.perfilador = Perfilador('diputados')
+    configurar_cliente(concurrencia_por_host=args.concurrencia_por_host)
+    
+    if args.planificar:
+        codigo = planificar(args)
+    elif args.shard:
+        codigo = descargar_particion(args)
+    elif args.combinar:
+        codigo = combinar(args)
+    else:
+        codigo = recorrer(args)
+    
+    obtener_cambios().escribir()
+    metricas.escribir_informe('diputados')
+    return codigo
 
 if __name__ == '__main__':
-    main()
+    raise SystemExit(main())
@@ -1,26 +1,127 @@
-import requests
-from bs4 import BeautifulSoup
-import csv
-from datetime import datetime
+import argparse
+from datetime import datetime, timedelta
+import html as html_lib
 import time
 import os
-import random
-import pandas as pd
 import re
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+import xml.etree.ElementTree as ET
+
+from almacen_sqlite import AlmacenSQLite, hash_archivo
+from analisis_legisladores import AnalisisLegisladores
+from cliente_http import CONCURRENCIA_POR_HOST, USER_AGENT, configurar_cliente, obtener_cliente
+from csv_comun import cargar_csv, guardar_csv, obtener_cambios, reiniciar_cambios
+from estado import cargar_json, guardar_json, ruta_estado
+from metricas import medir_fase, reiniciar_metricas
+from parseo import SOLO_TABLA_LEGISLADORES, crear_sopa
 
 # URL base
 URL_BASE = 'https://legislatura.gob.ar/seccion/composicion-actual.html'
 
+# Servicio del que la página carga la tabla #data-integrantes por AJAX
+URL_SERVICIO_LEGISLADORES = 'https://parlamentaria.legislatura.gob.ar/webservices/Json.asmx/GetDiputadosActivosNuevo'
+URL_SITIO = 'https://legislatura.gob.ar/'
+
+# Registro de cuándo se obtuvieron los detalles de cada perfil (por perfil_url)
+ARCHIVO_DETALLES = 'detalles_legisladores.json'
+CAMPOS_DETALLE = ('email', 'telefono', 'comisiones')
+
+# MODO_LEGISLADORES: 'auto' (servicio HTTP y, si falla, Selenium), 'http' o 'selenium'
+MODOS_LEGISLADORES = ('auto', 'http', 'selenium')
+
 def obtener_legisladores():
+    """Obtiene los legisladores actuales según MODO_LEGISLADORES"""
+    modo = os.environ.get('MODO_LEGISLADORES', 'auto').lower()
+    if modo not in MODOS_LEGISLADORES:
+        print(f"MODO_LEGISLADORES desconocido: {modo}, se usa 'auto'")
+        modo = 'auto'
+
+    if modo in ('auto', 'http'):
+        legisladores = obtener_legisladores_http()
+        if legisladores or modo == 'http':
+            return legisladores
+        print("No se pudieron obtener los legisladores del servicio, se usa el navegador")
+
+    return obtener_legisladores_selenium()
+
+def obtener_legisladores_http():
+    """
+    Obtiene los legisladores directamente del servicio que consulta la página, sin navegador.
+    Arma las mismas filas que dibuja la tabla y las procesa con extraer_legisladores.
+    """
+    try:
+        print("Consultando el servicio de legisladores...")
+        cliente = obtener_cliente()
+        response = cliente.post(URL_SERVICIO_LEGISLADORES, data={'id_bloque': ''}, etiqueta='legisladores')
+
+        if response.status_code != 200:
+            print(f"Error al consultar el servicio de legisladores: {response.status_code}")
+            return []
+
+        with medir_fase('parseo'):
+            registros = extraer_registros_servicio(response.content)
+        print(f"El servicio devolvió {len(registros)} legisladores")
+        if not registros:
+            return []
+
+        with medir_fase('parseo'):
+            return extraer_legisladores(armar_tabla_legisladores(registros))
+
+    except Exception as e:
+        print(f"Error al consultar el servicio de legisladores: {str(e)}")
+        return []
+
+def extraer_registros_servicio(contenido):
+    """Lee los elementos <diputados> de la respuesta XML del servicio como diccionarios"""
+    raiz = ET.fromstring(contenido)
+    registros = []
+    for elemento in raiz.iter():
+        # El servicio puede responder con espacio de nombres: comparamos el nombre local
+        if elemento.tag.rsplit('}', 1)[-1] != 'diputados':
+            continue
+        registros.append({
+            hijo.tag.rsplit('}', 1)[-1]: (hijo.text or '')
+            for hijo in elemento
+        })
+    return registros
+
+def armar_tabla_legisladores(registros):
+    """
+    Arma el HTML de la tabla #data-integrantes tal como lo dibuja la página con los datos
+    del servicio: mismas celdas, ordenadas por la columna del nombre.
+    """
+    filas = []
+    for registro in registros:
+        nombre = (f"{html_lib.escape(registro.get('apellido', ''))}, <br>"
+                  f"{html_lib.escape(registro.get('nombre', ''))}")
+        celdas = [
+            f'<img class="img-circle" src="{html_lib.escape(registro.get("foto", ""))}" width="50px" />',
+            f"<a href='{html_lib.escape(URL_SITIO + registro.get('url_legislador', ''))}'>{nombre}</a>",
+            f"<a href='{html_lib.escape(URL_SITIO + registro.get('url_bloque', ''))}'>"
+            f"{html_lib.escape(registro.get('bloque', ''))}</a>",
+            f"<center>{html_lib.escape(registro.get('fch_desde', '')[:10])}</center>",
+            f"<center>{html_lib.escape(registro.get('fch_hasta', '')[:10])}</center>",
+        ]
+        # La tabla se ordena por el nombre sin etiquetas y en minúsculas, como DataTables
+        orden = f"{registro.get('apellido', '')}, {registro.get('nombre', '')}".lower()
+        filas.append((orden, '<tr>' + ''.join(f'<td>{celda}</td>' for celda in celdas) + '</tr>'))
+
+    filas.sort(key=lambda fila: fila[0])
+    return ('<table id="data-integrantes"><tbody>'
+            + ''.join(fila for _, fila in filas)
+            + '</tbody></table>')
+
+def obtener_legisladores_selenium():
     """Extrae la información de los legisladores usando Selenium para renderizar JavaScript"""
     try:
+        # Selenium sólo hace falta en este modo
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from webdriver_manager.chrome import ChromeDriverManager
+
         print("Iniciando navegador para obtener información de legisladores...")
         
         # Configurar opciones de Chrome para GitHub Actions
@@ -30,7 +131,7 @@ def obtener_legisladores():
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
         
         # Crear el driver
         service = Service(ChromeDriverManager().install())
@@ -68,8 +169,20 @@ def obtener_legisladores():
         finally:
             driver.quit()
         
-        # Ahora procesar el HTML con BeautifulSoup
-        soup = BeautifulSoup(html, 'html.parser')
+        with medir_fase('parseo'):
+            return extraer_legisladores(html)
+        
+    except Exception as e:
+        print(f"Error al obtener los legisladores: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return []
+
+def extraer_legisladores(html, parser=None, parcial=True):
+    """Extrae los legisladores de la tabla #data-integrantes ya renderizada"""
+    try:
+        # Parseamos sólo la tabla de legisladores
+        soup = crear_sopa(html, SOLO_TABLA_LEGISLADORES, parser, parcial)
         
         # Encontrar la tabla
         table = soup.find('table', id='data-integrantes')
@@ -162,13 +275,16 @@ def obtener_legisladores():
         return legisladores
         
     except Exception as e:
-        print(f"Error al obtener los legisladores: {str(e)}")
+        print(f"Error al procesar la tabla de legisladores: {str(e)}")
         import traceback
         traceback.print_exc()
         return []
 
-def obtener_detalles_legislador(url_perfil, nombre_legislador):
-    """Obtiene información detallada del perfil de un legislador"""
+def obtener_detalles_legislador(url_perfil, nombre_legislador, estricto=False):
+    """
+    Obtiene información detallada del perfil de un legislador.
+    Con estricto=True los errores se propagan en lugar de devolver un resultado vacío.
+    """
     detalles = {}
     
     if not url_perfil:
@@ -176,76 +292,173 @@ def obtener_detalles_legislador(url_perfil, nombre_legislador):
         
     try:
         print(f"Obteniendo información detallada de {nombre_legislador}...")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url_perfil, headers=headers)
+        # El limitador del cliente espacia las solicitudes al host (como mucho 4 segundos)
+        cliente = obtener_cliente()
+        response = cliente.get(url_perfil, pausa=(1.5, 4), etiqueta='perfiles')
         
         if response.status_code != 200:
             print(f"Error al obtener el perfil de {nombre_legislador}: {response.status_code}")
+            if estricto:
+                response.raise_for_status()
+                raise RuntimeError(f"Respuesta inesperada {response.status_code}")
             return detalles
         
-        # Añadimos una pausa para evitar sobrecargar el servidor
-        time.sleep(random.uniform(1.5, 4))  # Pausa aleatoria entre 1.5 y 4 segundos
-            
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # Si el perfil no cambió desde la última corrida, reutilizamos lo ya extraído
+        previos = cliente.resultado_previo(url_perfil, response)
+        if previos is not None:
+            return previos
         
-        # Extraer correo electrónico (ejemplo, ajustar según la estructura real)
-        email_element = soup.find('a', href=lambda href: href and 'mailto:' in href)
-        if email_element:
-            detalles['email'] = email_element['href'].replace('mailto:', '')
-        
-        # Extraer teléfono (ejemplo, ajustar según la estructura real)
-        telefono_element = soup.find('span', class_='telefono')
-        if telefono_element:
-            detalles['telefono'] = telefono_element.text.strip()
-            
-        # Extraer información de comisiones (ejemplo, ajustar según la estructura real)
-        comisiones_section = soup.find('div', id='comisiones') or soup.find('section', class_=lambda c: c and 'comisiones' in c)
-        if comisiones_section:
-            comisiones = []
-            for comision_item in comisiones_section.find_all(['li', 'div', 'p']):
-                comision_texto = comision_item.text.strip()
-                if comision_texto:
-                    comisiones.append(comision_texto)
-            
-            if comisiones:
-                detalles['comisiones'] = "|".join(comisiones)
+        with medir_fase('parseo'):
+            detalles = extraer_detalles_legislador(response.text)
         
+        cliente.recordar_resultado(url_perfil, response, detalles)
         return detalles
         
     except Exception as e:
         print(f"Error al obtener detalles de {nombre_legislador}: {e}")
+        if estricto:
+            raise
         return detalles
 
+def obtener_detalles_en_paralelo(perfiles, concurrencia):
+    """
+    Descarga los perfiles indicados ({perfil_url: nombre}) con un pool acotado de hilos.
+    El cliente HTTP limita además las solicitudes simultáneas y el ritmo por host.
+    Devuelve {perfil_url: detalles} sólo con los perfiles que se pudieron descargar.
+    """
+    resultados = {}
+    if not perfiles:
+        return resultados
+
+    if concurrencia <= 1:
+        # En el hilo principal, así --profile también perfila estas descargas
+        for url, nombre in perfiles.items():
+            try:
+                resultados[url] = obtener_detalles_legislador(url, nombre, True)
+            except Exception:
+                pass
+        return resultados
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrencia)) as pool:
+        futuros = {
+            pool.submit(obtener_detalles_legislador, url, nombre, True): url
+            for url, nombre in perfiles.items()
+        }
+        for futuro in as_completed(futuros):
+            try:
+                resultados[futuros[futuro]] = futuro.result()
+            except Exception:
+                # Ya se informó el error; el perfil queda pendiente para la próxima corrida
+                pass
+    return resultados
+
+def detalles_vigentes(registro, fecha_actual, dias_vigencia):
+    """Indica si los detalles registrados de un perfil todavía no deben refrescarse"""
+    if not registro:
+        return False
+    if dias_vigencia < 0:
+        return True
+    try:
+        fecha = datetime.strptime(registro.get('fecha', ''), "%Y-%m-%d")
+    except ValueError:
+        return False
+    return fecha + timedelta(days=dias_vigencia) > fecha_actual
+
+def completar_detalles(legisladores, nombres_existentes, concurrencia, dias_vigencia):
+    """
+    Agrega email, teléfono y comisiones a los legisladores. Se descargan los perfiles de
+    los legisladores nuevos y los de los existentes cuyos detalles tienen más de
+    `dias_vigencia` días (con un valor negativo, los existentes no se refrescan).
+    Cada perfil_url se descarga una sola vez aunque aparezca repetido.
+    """
+    ruta_registro = ruta_estado(ARCHIVO_DETALLES)
+    registro = cargar_json(ruta_registro, {})
+    ahora = datetime.now()
+
+    pendientes = {}
+    for legislador in legisladores:
+        url = legislador.get('perfil_url')
+        if not url or url in pendientes:
+            continue
+        # Perfil ya descargado y vigente (también si aparece con otro nombre)
+        if detalles_vigentes(registro.get(url), ahora, dias_vigencia):
+            continue
+        # Sin refresco, de los existentes no se vuelve a descargar nada
+        if dias_vigencia < 0 and legislador['nombre'] in nombres_existentes:
+            continue
+        pendientes[url] = legislador['nombre']
+
+    print(f"Perfiles a descargar: {len(pendientes)} "
+          f"(de {len(legisladores)} legisladores, {concurrencia} en paralelo)")
+    descargados = obtener_detalles_en_paralelo(pendientes, concurrencia)
+
+    fecha_actual = ahora.strftime("%Y-%m-%d")
+    for url, detalles in descargados.items():
+        registro[url] = {'fecha': fecha_actual, 'detalles': detalles}
+    if descargados:
+        guardar_json(ruta_registro, registro)
+
+    # Los detalles se aplican a los nuevos y a los existentes refrescados en esta corrida
+    for legislador in legisladores:
+        url = legislador.get('perfil_url')
+        if url in descargados or (url in registro and legislador['nombre'] not in nombres_existentes):
+            legislador.update(registro[url]['detalles'])
+
+    return len(descargados)
+
+def extraer_detalles_legislador(html):
+    """Extrae correo, teléfono y comisiones de la página de perfil de un legislador"""
+    detalles = {}
+    soup = crear_sopa(html)
+    
+    # Extraer correo electrónico (ejemplo, ajustar según la estructura real)
+    email_element = soup.find('a', href=lambda href: href and 'mailto:' in href)
+    if email_element:
+        detalles['email'] = email_element['href'].replace('mailto:', '')
+    
+    # Extraer teléfono (ejemplo, ajustar según la estructura real)
+    telefono_element = soup.find('span', class_='telefono')
+    if telefono_element:
+        detalles['telefono'] = telefono_element.text.strip()
+        
+    # Extraer información de comisiones (ejemplo, ajustar según la estructura real)
+    comisiones_section = soup.find('div', id='comisiones') or soup.find('section', class_=lambda c: c and 'comisiones' in c)
+    if comisiones_section:
+        comisiones = []
+        for comision_item in comisiones_section.find_all(['li', 'div', 'p']):
+            comision_texto = comision_item.text.strip()
+            if comision_texto:
+                comisiones.append(comision_texto)
+        
+        if comisiones:
+            detalles['comisiones'] = "|".join(comisiones)
+    
+    return detalles
+
+def convertir_legislador(fila):
+    # Convertir 'activo' de string a booleano
+    if 'activo' in fila:
+        fila['activo'] = fila['activo'].lower() == 'true'
+    return fila
+
+def clave_legislador(legislador):
+    return legislador['nombre']
+
 def cargar_legisladores_existentes(nombre_archivo):
     """Carga los legisladores existentes desde un archivo CSV"""
-    legisladores = []
-    
-    if not os.path.exists(nombre_archivo):
-        return legisladores
-        
-    try:
-        with open(nombre_archivo, 'r', encoding='utf-8') as archivo:
-            reader = csv.DictReader(archivo)
-            for fila in reader:
-                # Convertir 'activo' de string a booleano
-                if 'activo' in fila:
-                    fila['activo'] = fila['activo'].lower() == 'true'
-                legisladores.append(fila)
-                
-        print(f"Se cargaron {len(legisladores)} registros de legisladores desde {nombre_archivo}")
-        return legisladores
-        
-    except Exception as e:
-        print(f"Error al cargar legisladores desde {nombre_archivo}: {e}")
-        return []
+    return cargar_csv(nombre_archivo, 'registros de legisladores', convertir_legislador)
 
-def combinar_legisladores_historicos(existentes, nuevos):
+def combinar_legisladores_historicos(existentes, nuevos, cambios=None):
     """
     Combina los legisladores existentes con los nuevos, manteniendo un registro histórico.
     Si un legislador existente ya no está en la lista actual, se marca como inactivo.
+    Si se pasa una lista en `cambios`, se le agregan los legisladores dados de alta, de
+    baja, reincorporados o que cambiaron de bloque.
     """
+    if cambios is None:
+        cambios = []
     # Convertir a dict para búsqueda rápida
     dict_nuevos = {leg['nombre']: leg for leg in nuevos}
     
@@ -266,12 +479,19 @@ def combinar_legisladores_historicos(existentes, nuevos):
         
         # Si el legislador sigue activo en la nueva lista
         if nombre in dict_nuevos:
+            if existente['bloque'] != dict_nuevos[nombre]['bloque'] or not existente.get('activo', True):
+                cambios.append(existente)
+            
             # Actualizar datos que pueden cambiar
             existente['bloque'] = dict_nuevos[nombre]['bloque']
             existente['bloque_url'] = dict_nuevos[nombre]['bloque_url']
             existente['imagen_url'] = dict_nuevos[nombre]['imagen_url']
             existente['fecha_extraccion'] = dict_nuevos[nombre]['fecha_extraccion']
             existente['activo'] = True
+            # Detalles del perfil, si se refrescaron en esta corrida
+            for campo in CAMPOS_DETALLE:
+                if campo in dict_nuevos[nombre]:
+                    existente[campo] = dict_nuevos[nombre][campo]
             
             # Eliminar de nuevos para no duplicar
             del dict_nuevos[nombre]
@@ -282,6 +502,7 @@ def combinar_legisladores_historicos(existentes, nuevos):
             existente['activo'] = False
             existente['fecha_baja'] = fecha_actual
             inactivados += 1
+            cambios.append(existente)
         
         combinados.append(existente)
     
@@ -290,71 +511,32 @@ def combinar_legisladores_historicos(existentes, nuevos):
         nuevo['activo'] = True
         nuevo['fecha_alta'] = fecha_actual
         combinados.append(nuevo)
+        cambios.append(nuevo)
         nuevos_agregados += 1
     
     print(f"Actualización histórica: {actualizados} actualizados, {inactivados} inactivados, {nuevos_agregados} nuevos")
     return combinados
 
-def guardar_csv(datos, nombre_archivo, campos):
-    """Guarda la información en un archivo CSV"""
-    try:
-        if not datos:
-            print(f"No hay datos para guardar en {nombre_archivo}")
-            return False
-        
-        # Creamos el archivo CSV
-        with open(nombre_archivo, 'w', newline='', encoding='utf-8') as archivo:
-            writer = csv.DictWriter(archivo, fieldnames=campos)
-            writer.writeheader()
-            writer.writerows(datos)
-            
-        print(f"Se ha guardado la información en {nombre_archivo}")
-        return True
-        
-    except Exception as e:
-        print(f"Error al guardar el archivo CSV {nombre_archivo}: {e}")
-        return False
-
-def generar_analisis(legisladores):
-    """Genera análisis de los datos de legisladores"""
+def generar_analisis(legisladores, cambios=None, firma_anterior=None, firma_actual=None):
+    """
+    Genera análisis de los datos de legisladores (ver analisis_legisladores.py).
+    Si los agregados guardados corresponden al histórico anterior (`firma_anterior`),
+    sólo se aplican los legisladores en `cambios`; si no, se recalculan completos.
+    """
     try:
-        # Convertimos a DataFrame para análisis
-        df = pd.DataFrame(legisladores)
-        
-        # Filtrar legisladores activos para el análisis actual
-        df_activos = df[df['activo'] == True]
+        analisis = AnalisisLegisladores()
+        recalcular = os.environ.get('RECALCULAR_ANALISIS', 'false').lower() == 'true'
         
-        # Análisis por bloque (legisladores activos)
-        analisis_bloques = df_activos['bloque'].value_counts().reset_index()
-        analisis_bloques.columns = ['Bloque', 'Cantidad']
-        
-        # Análisis histórico de cambios
-        if 'fecha_alta' in df.columns and 'fecha_baja' in df.columns:
-            # Preparar datos para análisis temporal
-            df['fecha_alta'] = pd.to_datetime(df['fecha_alta'], errors='coerce')
-            df['fecha_baja'] = pd.to_datetime(df['fecha_baja'], errors='coerce')
-            
-            # Análisis de rotación por mes
-            df_rotacion = df.groupby(pd.Grouper(key='fecha_alta', freq='M')).size().reset_index()
-            df_rotacion.columns = ['Mes', 'Nuevos_Legisladores']
-            
-            # Guardar análisis temporal
-            df_rotacion.to_csv('analisis_rotacion_mensual.csv', index=False, encoding='utf-8')
-        
-        # Análisis por periodo de mandato
-        df_activos['anio_inicio'] = df_activos['mandato_inicio'].str.extract(r'(\d{4})').astype(float)
-        analisis_periodos = df_activos['anio_inicio'].value_counts().reset_index()
-        analisis_periodos.columns = ['Año de inicio', 'Cantidad']
-        analisis_periodos = analisis_periodos.sort_values('Año de inicio')
+        if cambios is None or recalcular or not analisis.vigente(firma_anterior):
+            print("Recalculando los análisis a partir del histórico completo")
+            analisis.recalcular(legisladores)
+        else:
+            aplicados = analisis.aplicar_cambios(cambios)
+            print(f"Análisis actualizados con {aplicados} legisladores modificados")
         
         # Guardamos los análisis
-        analisis_bloques.to_csv('analisis_bloques_actuales.csv', index=False, encoding='utf-8')
-        analisis_periodos.to_csv('analisis_periodos_actuales.csv', index=False, encoding='utf-8')
-        
-        # Análisis histórico total
-        historial_bloques = df.groupby(['bloque', 'activo']).size().reset_index()
-        historial_bloques.columns = ['Bloque', 'Activo', 'Cantidad']
-        historial_bloques.to_csv('historial_bloques.csv', index=False, encoding='utf-8')
+        analisis.exportar()
+        analisis.guardar(firma_actual)
         
         print("Análisis generados correctamente")
         return True
@@ -363,53 +545,108 @@ def generar_analisis(legisladores):
         print(f"Error al generar análisis: {e}")
         return False
 
-def main():
+def parse_args(argv=None):
+    # El resto de la configuración se toma de variables de entorno
+    parser = argparse.ArgumentParser(description="Scrapea los legisladores de la Legislatura de CABA.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila CPU (cProfile) y memoria (tracemalloc) de cada fase; los informes quedan "
+             "en .estado/perfiles/legiscaba/.",
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
     # Definimos los archivos CSV
     archivo_legisladores = 'legisladores_historico.csv'
+    metricas = reiniciar_metricas()
+    reiniciar_cambios('legiscaba')
+    if args.profile:
+        from perfilado import Perfilador
+
+        metricas.perfilador = Perfilador('legiscaba')
+    
+    # Cupo de solicitudes simultáneas por host, compartido por todas las descargas
+    configurar_cliente(concurrencia_por_host=int(os.environ.get('CONCURRENCIA_POR_HOST', str(CONCURRENCIA_POR_HOST))))
     
     # Obtiene la información de los legisladores actuales
     nuevos_legisladores = obtener_legisladores()
     
     if not nuevos_legisladores:
         print("No se encontraron legisladores. Abortando operación.")
+        metricas.escribir_informe('legiscaba')
         return
     
-    # Si existen legisladores previos, los cargamos
-    legisladores_existentes = cargar_legisladores_existentes(archivo_legisladores)
+    # Firma del histórico anterior, para saber si los análisis guardados le corresponden
+    firma_anterior = hash_archivo(archivo_legisladores)
     
-    # Obtener detalles solo para nuevos legisladores
-    if os.environ.get('OBTENER_DETALLES', 'true').lower() == 'true':
-        # Creamos un conjunto con los nombres de legisladores existentes
-        nombres_existentes = {leg['nombre'] for leg in legisladores_existentes}
-        
-        print("Obteniendo detalles de legisladores nuevos...")
-        for legislador in nuevos_legisladores:
-            # Solo obtenemos detalles para los que no existen aún
-            if legislador['nombre'] not in nombres_existentes and legislador['perfil_url']:
-                detalles = obtener_detalles_legislador(
-                    legislador['perfil_url'], 
-                    legislador['nombre']
-                )
-                # Actualizamos el diccionario con los detalles obtenidos
-                legislador.update(detalles)
+    # Con ALMACENAMIENTO=sqlite el histórico se combina en una base indexada
+    usar_sqlite = os.environ.get('ALMACENAMIENTO', 'csv').lower() == 'sqlite'
+    
+    with medir_fase('lectura'):
+        if usar_sqlite:
+            # La base se pone al día con el CSV si este cambió desde la última exportación
+            almacen = AlmacenSQLite()
+            almacen.sincronizar_csv('legisladores', archivo_legisladores)
+            nombres_existentes = almacen.nombres_legisladores()
+        else:
+            # Si existen legisladores previos, los cargamos
+            legisladores_existentes = cargar_legisladores_existentes(archivo_legisladores)
+            nombres_existentes = {leg['nombre'] for leg in legisladores_existentes}
     
-    # Combinamos los legisladores existentes con los nuevos, manteniendo historial
-    todos_legisladores = combinar_legisladores_historicos(legisladores_existentes, nuevos_legisladores)
+    # Obtener detalles de los legisladores nuevos y refrescar los de perfiles vencidos
+    if os.environ.get('OBTENER_DETALLES', 'true').lower() == 'true':
+        print("Obteniendo detalles de legisladores...")
+        completar_detalles(
+            nuevos_legisladores,
+            nombres_existentes,
+            concurrencia=int(os.environ.get('CONCURRENCIA_DETALLES', '4')),
+            dias_vigencia=int(os.environ.get('DIAS_VIGENCIA_DETALLES', '30')),
+        )
     
     # Definimos los campos para el CSV
     campos = ['nombre', 'perfil_url', 'imagen_url', 'bloque', 'bloque_url', 
              'mandato_inicio', 'mandato_fin', 'fecha_extraccion', 
              'email', 'telefono', 'comisiones', 'activo', 'fecha_alta', 'fecha_baja']
     
-    # Guardamos todos los legisladores en un archivo CSV
-    guardar_csv(todos_legisladores, archivo_legisladores, campos)
+    if usar_sqlite:
+        # Combinamos con upserts indexados y exportamos el CSV de siempre
+        fecha_actual = datetime.now().strftime("%Y-%m-%d")
+        nombres_cambiados = []
+        with medir_fase('combinacion'):
+            actualizados, inactivados, nuevos_agregados = almacen.combinar_legisladores(
+                nuevos_legisladores, fecha_actual, nombres_cambiados
+            )
+            print(f"Actualización histórica: {actualizados} actualizados, {inactivados} inactivados, {nuevos_agregados} nuevos")
+            todos_legisladores = almacen.filas('legisladores')
+        with medir_fase('escritura'):
+            almacen.exportar_csv('legisladores', archivo_legisladores, campos, todos_legisladores, clave=clave_legislador)
+            almacen.cerrar()
+        nombres_cambiados = set(nombres_cambiados)
+        cambios = [leg for leg in todos_legisladores if leg['nombre'] in nombres_cambiados]
+    else:
+        # Combinamos los legisladores existentes con los nuevos, manteniendo historial
+        cambios = []
+        with medir_fase('combinacion'):
+            todos_legisladores = combinar_legisladores_historicos(legisladores_existentes, nuevos_legisladores, cambios)
+        
+        # Guardamos todos los legisladores en un archivo CSV
+        with medir_fase('escritura'):
+            guardar_csv(todos_legisladores, archivo_legisladores, campos, clave_legislador)
     
-    # Generamos análisis de los datos
-    generar_analisis(todos_legisladores)
+    # Actualizamos los análisis con los cambios de esta corrida
+    with medir_fase('analisis'):
+        generar_analisis(todos_legisladores, cambios, firma_anterior, hash_archivo(archivo_legisladores))
     
     # Generamos un CSV solo con legisladores activos para fácil consulta
     legisladores_activos = [leg for leg in todos_legisladores if leg.get('activo', False)]
-    guardar_csv(legisladores_activos, 'legisladores_activos.csv', campos)
+    with medir_fase('escritura'):
+        guardar_csv(legisladores_activos, 'legisladores_activos.csv', campos, clave_legislador)
+    
+    obtener_cambios().escribir()
+    metricas.escribir_informe('legiscaba')
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,46 @@
+"""
+Punto de entrada común de los scrapers: `python -m scrappertown <scraper> [opciones]`.
+
+Los scrapers siguen siendo los scripts de la raíz del repositorio; este paquete sólo
+los ubica y los importa cuando se eligen, para que `--help` y los comandos que no
+scrapean respondan sin cargar requests ni BeautifulSoup.
+"""
+import os
+import sys
+
+DIRECTORIO_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nombre del comando -> (módulo, descripción)
+SCRAPERS = {
+    'diputados': ('scraper', "Comisiones, integrantes y reuniones de Diputados Nacionales"),
+    'legiscaba': ('scraper_legiscaba', "Legisladores de la Legislatura porteña"),
+    'sesiones': ('scrape_sesiones', "Sesiones de la Legislatura porteña"),
+    'vigilar': ('vigilancia', "Corre los scrapers de forma continua y emite eventos con sus cambios"),
+}
+
+
+def cargar_scraper(nombre):
+    """Importa el módulo del scraper indicado"""
+    import importlib
+
+    if DIRECTORIO_REPO not in sys.path:
+        sys.path.insert(0, DIRECTORIO_REPO)
+    modulo, _ = SCRAPERS[nombre]
+    return importlib.import_module(modulo)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m scrappertown',
+        description="Ejecuta uno de los scrapers. Las opciones que siguen al nombre se pasan al scraper "
+                    "(por ejemplo `python -m scrappertown sesiones --help`).",
+    )
+    parser.add_argument('scraper', choices=SCRAPERS,
+                        help='; '.join(f"{nombre}: {descripcion}" for nombre, (_, descripcion) in SCRAPERS.items()))
+    parser.add_argument('opciones', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    resultado = cargar_scraper(args.scraper).main(args.opciones)
+    return resultado if isinstance(resultado, int) else 0
@@ -0,0 +1,3 @@
+from scrappertown import main
+
+raise SystemExit(main())
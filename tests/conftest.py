@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Los scripts están en la raíz del repositorio, no en un paquete instalable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import estado  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def directorio_estado(tmp_path, monkeypatch):
+    """Cada prueba usa su propio directorio de estado"""
+    directorio = tmp_path / 'estado'
+    monkeypatch.setattr(estado, 'DIRECTORIO_ESTADO', str(directorio))
+    monkeypatch.delenv('DIRECTORIO_CAMBIOS', raising=False)
+    return directorio
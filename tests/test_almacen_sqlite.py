@@ -0,0 +1,48 @@
+import csv
+
+from almacen_sqlite import AlmacenSQLite
+from scraper import CAMPOS_INTEGRANTES, clave_periodo
+
+
+def integrante(fecha_fin, fecha_extraccion):
+    return {'comision_codigo': 'cagyp', 'comision_nombre': 'Agricultura', 'codigo_diputado': 'dip1',
+            'nombre_completo': 'Diputada Uno', 'cargo': 'Vocal', 'bloque': 'B', 'distrito': 'D',
+            'fecha_inicio': '2024-01-01', 'fecha_fin': fecha_fin, 'fecha_extraccion': fecha_extraccion}
+
+
+def test_la_firma_registrada_describe_el_csv_exportado(tmp_path):
+    ruta = str(tmp_path / 'integrantes.csv')
+    almacen = AlmacenSQLite(str(tmp_path / 'base.sqlite'))
+
+    almacen.actualizar_integrantes([integrante('2024-05-01', '2024-05-01')], '2024-05-01')
+    almacen.exportar_csv('integrantes', ruta, CAMPOS_INTEGRANTES, clave=clave_periodo)
+    assert not almacen.sincronizar_csv('integrantes', ruta)
+
+    # Avanza la fecha_fin del período abierto: el CSV se reescribe y la firma lo sigue
+    almacen.actualizar_integrantes([integrante('', '2024-05-08')], '2024-05-08')
+    almacen.exportar_csv('integrantes', ruta, CAMPOS_INTEGRANTES, clave=clave_periodo)
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        assert [fila['fecha_fin'] for fila in csv.DictReader(archivo)] == ['2024-05-08']
+    assert not almacen.sincronizar_csv('integrantes', ruta)
+
+    # Otra corrida el mismo día: sólo cambiaría fecha_extraccion y el CSV queda igual
+    contenido = open(ruta, 'rb').read()
+    almacen.actualizar_integrantes([integrante('', '2024-05-09')], '2024-05-08')
+    almacen.exportar_csv('integrantes', ruta, CAMPOS_INTEGRANTES, clave=clave_periodo)
+    assert open(ruta, 'rb').read() == contenido
+    assert not almacen.sincronizar_csv('integrantes', ruta)
+    almacen.cerrar()
+
+
+def test_quien_se_va_tras_una_sola_vez_y_vuelve_abre_un_periodo_nuevo(tmp_path):
+    almacen = AlmacenSQLite(str(tmp_path / 'base.sqlite'))
+    ana = dict(integrante('', ''), codigo_diputado='ana', nombre_completo='Ana')
+    beto = dict(integrante('', ''), codigo_diputado='beto', nombre_completo='Beto')
+    almacen.actualizar_integrantes([ana, beto], '2024-01-01')
+    almacen.actualizar_integrantes([ana], '2024-02-01')
+    assert almacen.actualizar_integrantes([ana, beto], '2024-03-01') == 1
+
+    assert [f['nombre_completo'] for f in almacen.integrantes_en_fecha('cagyp', '2024-02-15')] == ['Ana']
+    assert [(f['fecha_inicio'], f['fecha_fin']) for f in almacen.integrantes_en_fecha('cagyp', '2024-03-01')
+            if f['nombre_completo'] == 'Beto'] == [('2024-03-01', '2024-03-01')]
+    almacen.cerrar()
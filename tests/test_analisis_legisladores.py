@@ -0,0 +1,43 @@
+import csv
+
+from analisis_legisladores import ARCHIVO_BLOQUES, ARCHIVO_PERIODOS, AnalisisLegisladores
+
+
+def legislador(nombre, bloque, mandato_inicio='10/12/2019', activo=True, fecha_alta='2024-03-05'):
+    return {'nombre': nombre, 'bloque': bloque, 'mandato_inicio': mandato_inicio,
+            'activo': activo, 'fecha_alta': fecha_alta}
+
+
+def leer(nombre_archivo):
+    with open(nombre_archivo, encoding='utf-8', newline='') as archivo:
+        return list(csv.reader(archivo))
+
+
+def test_periodos_conservan_el_anio_decimal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    analisis = AnalisisLegisladores()
+    analisis.recalcular([legislador('A', 'X'), legislador('B', 'Y', '10/12/2021'), legislador('C', 'X')])
+    analisis.exportar()
+    assert leer(ARCHIVO_PERIODOS) == [['Año de inicio', 'Cantidad'], ['2019.0', '2'], ['2021.0', '1']]
+    assert leer(ARCHIVO_BLOQUES) == [['Bloque', 'Cantidad'], ['X', '2'], ['Y', '1']]
+
+
+def test_aplicar_cambios_equivale_a_recalcular(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    historico = [legislador('A', 'X'), legislador('B', 'Y'), legislador('C', 'X', '10/12/2021')]
+    incremental = AnalisisLegisladores()
+    incremental.recalcular(historico)
+    incremental.guardar('firma-1')
+
+    # B cambia de bloque, C deja el cargo y entra D
+    cambios = [legislador('B', 'X'), legislador('C', 'X', '10/12/2021', activo=False),
+               legislador('D', 'Z', '10/12/2023', fecha_alta='2024-06-01')]
+    cargado = AnalisisLegisladores()
+    assert cargado.vigente('firma-1')
+    assert cargado.aplicar_cambios(cambios) == 3
+
+    completo = AnalisisLegisladores(str(tmp_path / 'otro.json'))
+    completo.recalcular([historico[0], *cambios])
+    for agregado in ('bloques_activos', 'periodos_activos', 'altas_por_mes', 'historial_bloques'):
+        assert (cargado._positivos(getattr(cargado, agregado))
+                == completo._positivos(getattr(completo, agregado)))
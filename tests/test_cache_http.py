@@ -0,0 +1,29 @@
+import time
+
+from cache_http import CacheHTTP
+
+
+def test_entrada_revalidada_no_vence(tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'cache'), max_edad_dias=60)
+    cache.guardar('http://a/frecuente', b'frecuente', {})
+    cache.guardar('http://a/abandonada', b'abandonada', {})
+    hace_tres_meses = time.time() - 90 * 86400
+    for entrada in cache._indice.values():
+        entrada['guardado'] = entrada['usado'] = hace_tres_meses
+
+    cuerpo, _ = cache.obtener('http://a/frecuente', revalidada=True)
+    cache.purgar()
+
+    assert cuerpo == b'frecuente'
+    assert set(cache._indice) == {'http://a/frecuente'}
+
+
+def test_por_tamanio_se_eliminan_las_usadas_hace_mas_tiempo(tmp_path):
+    cache = CacheHTTP(str(tmp_path / 'cache'), max_bytes=15)
+    cache.guardar('http://a/1', b'x' * 10, {})
+    cache.guardar('http://a/2', b'y' * 10, {})
+    cache._indice['http://a/2']['usado'] -= 100
+    cache._indice['http://a/1']['usado'] -= 200
+    cache.obtener('http://a/1', revalidada=True)
+    cache.purgar()
+    assert set(cache._indice) == {'http://a/1'}
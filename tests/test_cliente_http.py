@@ -0,0 +1,62 @@
+import requests
+
+from cache_http import CacheHTTP
+from cliente_http import ClienteHTTP
+
+URL = 'http://ejemplo.test/pagina'
+
+
+class SesionFalsa:
+    """Responde con las respuestas indicadas, en orden, y anota los encabezados enviados"""
+
+    def __init__(self, respuestas):
+        self.respuestas = list(respuestas)
+        self.encabezados = []
+
+    def request(self, metodo, url, timeout=None, headers=None, **kwargs):
+        self.encabezados.append(dict(headers or {}))
+        status, cuerpo, encabezados = self.respuestas.pop(0)
+        response = requests.Response()
+        response.status_code = status
+        response._content = cuerpo
+        response.headers.update(encabezados)
+        response.url = url
+        response.request = requests.Request(metodo, url).prepare()
+        return response
+
+    def close(self):
+        pass
+
+
+def crear_cliente(tmp_path, respuestas):
+    cliente = ClienteHTTP(cache=CacheHTTP(str(tmp_path / 'cache')), remapeo=[], escala_pausas=0)
+    cliente.sesion = SesionFalsa(respuestas)
+    return cliente
+
+
+def test_reintento_sin_cuerpo_en_cache_conserva_los_encabezados(tmp_path):
+    cliente = crear_cliente(tmp_path, [
+        (200, b'<html>v1</html>', {'ETag': '"v1"'}),
+        (304, b'', {}),
+        (200, b'<html>v1</html>', {'ETag': '"v1"'}),
+    ])
+    cliente.get(URL)
+    # Se pierde el cuerpo guardado pero no su entrada en el índice
+    cliente.cache.obtener = lambda url, revalidada=False: (None, None)
+
+    response = cliente.get(URL, headers={'X-Prueba': 'si'})
+
+    condicional, completa = cliente.sesion.encabezados[1:]
+    assert condicional == {'X-Prueba': 'si', 'If-None-Match': '"v1"'}
+    assert completa == {'X-Prueba': 'si'}
+    assert response.status_code == 200 and response.content == b'<html>v1</html>'
+
+
+def test_respuesta_304_usa_el_cuerpo_guardado(tmp_path):
+    cliente = crear_cliente(tmp_path, [
+        (200, b'<html>v1</html>', {'ETag': '"v1"'}),
+        (304, b'', {}),
+    ])
+    cliente.get(URL)
+    response = cliente.get(URL)
+    assert response.desde_cache and response.content == b'<html>v1</html>'
@@ -0,0 +1,57 @@
+import csv
+
+from csv_comun import guardar_csv, reiniciar_cambios
+
+CAMPOS = ['comision_codigo', 'nombre_completo', 'cargo', 'fecha_inicio', 'fecha_fin', 'fecha_extraccion']
+
+
+def periodo(nombre, cargo='Vocal', fecha_fin='2024-05-01', fecha_extraccion='2024-05-01'):
+    return {'comision_codigo': 'cagyp', 'nombre_completo': nombre, 'cargo': cargo,
+            'fecha_inicio': '2024-01-01', 'fecha_fin': fecha_fin, 'fecha_extraccion': fecha_extraccion}
+
+
+def clave(fila):
+    return (fila['comision_codigo'], fila['nombre_completo'])
+
+
+def leer(ruta):
+    with open(ruta, encoding='utf-8', newline='') as archivo:
+        return list(csv.DictReader(archivo))
+
+
+def test_solo_fecha_extraccion_no_reescribe(tmp_path):
+    ruta = str(tmp_path / 'integrantes.csv')
+    guardar_csv([periodo('A')], ruta, CAMPOS, clave)
+    cambios = reiniciar_cambios('prueba')
+    guardar_csv([periodo('A', fecha_extraccion='2024-05-08')], ruta, CAMPOS, clave)
+    assert leer(ruta)[0]['fecha_extraccion'] == '2024-05-01'
+    assert cambios.resumen()['archivos'] == {}
+
+
+def test_fecha_fin_se_publica_sin_contar_como_modificacion(tmp_path):
+    ruta = str(tmp_path / 'integrantes.csv')
+    guardar_csv([periodo('A'), periodo('B')], ruta, CAMPOS, clave)
+    cambios = reiniciar_cambios('prueba')
+    guardar_csv([periodo('A', fecha_fin='2024-05-08'), periodo('B', fecha_fin='2024-05-08')], ruta, CAMPOS, clave)
+    assert [fila['fecha_fin'] for fila in leer(ruta)] == ['2024-05-08', '2024-05-08']
+    assert cambios.resumen()['archivos'] == {}
+    assert cambios.resumen()['sin_cambios'] == [ruta]
+
+
+def test_cambio_real_incluye_fecha_fin(tmp_path):
+    ruta = str(tmp_path / 'integrantes.csv')
+    guardar_csv([periodo('A'), periodo('B')], ruta, CAMPOS, clave)
+    cambios = reiniciar_cambios('prueba')
+    guardar_csv([periodo('A', 'Presidente', '2024-05-08'), periodo('B', fecha_fin='2024-05-08')], ruta, CAMPOS, clave)
+    modificadas = cambios.resumen()['archivos'][ruta]['modificadas']
+    assert modificadas == [{'clave': ('cagyp', 'A'),
+                            'cambios': {'cargo': ['Vocal', 'Presidente'], 'fecha_fin': ['2024-05-01', '2024-05-08']}}]
+
+
+def test_una_columna_desconocida_es_un_error(tmp_path):
+    ruta = str(tmp_path / 'integrantes.csv')
+    guardar_csv([periodo('A')], ruta, CAMPOS, clave)
+    cambios = reiniciar_cambios('prueba')
+    assert not guardar_csv([dict(periodo('A', 'Presidente'), extra='x')], ruta, CAMPOS, clave)
+    assert leer(ruta)[0]['cargo'] == 'Vocal'
+    assert cambios.resumen()['archivos'] == {}
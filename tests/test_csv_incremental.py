@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from csv_incremental import CSVIncremental
+
+CAMPOS = ['id', 'texto']
+
+
+def clave(fila):
+    return fila['id']
+
+
+def filas(*ids):
+    return [{'id': str(i), 'texto': f"fila {i}"} for i in ids]
+
+
+def abrir(tmp_path):
+    return CSVIncremental(str(tmp_path / 'datos.csv'), CAMPOS, clave, str(tmp_path / 'indice.txt'))
+
+
+def test_agregar_anota_al_final_del_indice_sin_reescribirlo(tmp_path):
+    incremental = abrir(tmp_path)
+    incremental.agregar(filas(1, 2, 3))
+    anterior = (tmp_path / 'indice.txt').read_bytes()
+
+    assert incremental.agregar(filas(3, 4)) == filas(4)
+    actual = (tmp_path / 'indice.txt').read_bytes()
+    assert actual.startswith(anterior)
+    lineas = actual[len(anterior):].decode('utf-8').splitlines()
+    assert json.loads(lineas[0]) == '4'
+    assert json.loads(lineas[1])['tamanio'] == (tmp_path / 'datos.csv').stat().st_size
+
+
+def test_se_reabre_sin_reconstruir(tmp_path, monkeypatch):
+    incremental = abrir(tmp_path)
+    incremental.agregar(filas(1, 2))
+    incremental.agregar(filas(3))
+
+    monkeypatch.setattr(CSVIncremental, '_reconstruir_indice', lambda self: pytest.fail("se reconstruyó"))
+    assert abrir(tmp_path).claves == {'1', '2', '3'}
+
+
+def test_anotacion_cortada_se_descarta(tmp_path):
+    incremental = abrir(tmp_path)
+    incremental.agregar(filas(1, 2))
+    with open(tmp_path / 'indice.txt', 'a', encoding='utf-8') as archivo:
+        archivo.write('"9"\n{"tama')
+
+    reabierto = abrir(tmp_path)
+    assert reabierto.claves == {'1', '2'}
+    reabierto.agregar(filas(3))
+    assert abrir(tmp_path).claves == {'1', '2', '3'}
+    assert '"9"' not in (tmp_path / 'indice.txt').read_text(encoding='utf-8')
+
+
+def test_indice_de_otro_csv_o_formato_se_reconstruye(tmp_path):
+    incremental = abrir(tmp_path)
+    incremental.agregar(filas(1, 2))
+    # Filas agregadas sin anotar en el índice (por ejemplo, una corrida cortada)
+    incremental.agregar(filas(3), guardar_indice=False)
+    assert abrir(tmp_path).claves == {'1', '2', '3'}
+
+    (tmp_path / 'indice.txt').write_text('{"archivo": "datos.csv", "tamanio": 0}\n1\n', encoding='utf-8')
+    assert abrir(tmp_path).claves == {'1', '2', '3'}
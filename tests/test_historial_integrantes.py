@@ -0,0 +1,58 @@
+from historial_integrantes import HistorialIntegrantes
+
+
+def integrante(nombre, comision='cagyp', bloque='B'):
+    return {'comision_codigo': comision, 'comision_nombre': comision, 'codigo_diputado': nombre.lower(),
+            'nombre_completo': nombre, 'cargo': 'Vocal', 'bloque': bloque, 'distrito': 'D'}
+
+
+def periodos(historial, nombre):
+    return [(fila['fecha_inicio'], fila['fecha_fin']) for fila in historial.historial_diputado(nombre)]
+
+
+def test_quien_vuelve_abre_un_periodo_nuevo():
+    historial = HistorialIntegrantes([])
+    historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-01-01')
+    historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-02-01')
+    historial.actualizar([integrante('Ana')], '2024-03-01')
+    assert historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-04-01') == 1
+
+    assert periodos(historial, 'Ana') == [('2024-01-01', '2024-04-01')]
+    assert periodos(historial, 'Beto') == [('2024-01-01', '2024-02-01'), ('2024-04-01', '2024-04-01')]
+    assert [f['nombre_completo'] for f in historial.integrantes_en_fecha('cagyp', '2024-03-01')] == ['Ana']
+
+
+def test_una_comision_que_no_se_actualiza_conserva_sus_periodos_abiertos():
+    historial = HistorialIntegrantes([])
+    historial.actualizar([integrante('Ana'), integrante('Ciro', 'ccultura')], '2024-01-01')
+    # La corrida siguiente sólo pudo descargar cagyp
+    historial.actualizar([integrante('Ana')], '2024-02-01', {'cagyp'})
+    historial.actualizar([integrante('Ana'), integrante('Ciro', 'ccultura')], '2024-03-01')
+    assert periodos(historial, 'Ciro') == [('2024-01-01', '2024-03-01')]
+
+
+def test_quien_se_va_tras_una_sola_vez_y_vuelve_abre_un_periodo_nuevo():
+    historial = HistorialIntegrantes([])
+    historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-01-01')
+    historial.actualizar([integrante('Ana')], '2024-02-01')
+    assert historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-03-01') == 1
+
+    assert periodos(historial, 'Beto') == [('2024-01-01', '2024-01-01'), ('2024-03-01', '2024-03-01')]
+    assert [f['nombre_completo'] for f in historial.integrantes_en_fecha('cagyp', '2024-02-15')] == ['Ana']
+
+
+def test_el_periodo_cerrado_sigue_cerrado_al_releer_las_filas():
+    historial = HistorialIntegrantes([])
+    historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-01-01')
+    historial.actualizar([integrante('Ana')], '2024-02-01')
+    # Cada corrida del scraper parte de lo publicado en el CSV
+    historial = HistorialIntegrantes([dict(fila) for fila in historial.filas])
+    assert historial.actualizar([integrante('Ana'), integrante('Beto')], '2024-03-01') == 1
+    assert periodos(historial, 'Beto') == [('2024-01-01', '2024-01-01'), ('2024-03-01', '2024-03-01')]
+
+
+def test_un_periodo_sin_fecha_fin_se_cierra_en_su_inicio():
+    fila = dict(integrante('Beto'), fecha_inicio='2024-01-01', fecha_fin='')
+    historial = HistorialIntegrantes([fila, dict(integrante('Ana'), fecha_inicio='2024-01-01', fecha_fin='2024-02-01')])
+    historial.actualizar([integrante('Ana')], '2024-03-01')
+    assert periodos(historial, 'Beto') == [('2024-01-01', '2024-01-01')]
@@ -0,0 +1,62 @@
+import pytest
+
+from limitador_http import FACTOR_DESCENSO, INCREMENTO_TASA, LimitadorAIMD
+
+HOST = 'www.hcdn.gob.ar'
+PAUSA = (1, 4)
+
+
+def crear(tmp_path, **opciones):
+    return LimitadorAIMD(str(tmp_path / 'limitador.json'), escala=0.001, **opciones)
+
+
+def test_aumenta_con_respuestas_sanas_hasta_el_tope(tmp_path):
+    limitador = crear(tmp_path, tasa_maxima=1.0)
+    limitador.esperar(HOST, PAUSA)
+    inicial = limitador.tasas()[HOST]
+    assert limitador.observar(HOST, 200, 0.1) == 'aumento'
+    assert limitador.tasas()[HOST] == pytest.approx(inicial + INCREMENTO_TASA)
+    for _ in range(100):
+        limitador.observar(HOST, 200, 0.1)
+    assert limitador.tasas()[HOST] == 1.0
+    assert limitador.observar(HOST, 200, 0.1) is None
+
+
+def test_fallas_seguidas_bajan_la_tasa_una_sola_vez(tmp_path):
+    limitador = LimitadorAIMD(str(tmp_path / 'limitador.json'), escala=1.0)
+    limitador.esperar(HOST, PAUSA)
+    tasa = limitador.tasas()[HOST]
+    assert limitador.observar(HOST, 503, 0.1) == 'descenso'
+    assert limitador.observar(HOST, 429, 0.1) is None
+    assert limitador.observar(HOST, None, 0.1) is None
+    assert limitador.tasas()[HOST] == pytest.approx(tasa * FACTOR_DESCENSO)
+
+
+def test_nunca_baja_del_ritmo_minimo_del_scraper(tmp_path):
+    limitador = crear(tmp_path)
+    for _ in range(20):
+        limitador.esperar(HOST, PAUSA)
+        limitador.observar(HOST, 503, 0.1)
+        limitador._baldes[HOST].ultimo_descenso = 0.0
+    limitador.esperar(HOST, PAUSA)
+    assert limitador.tasas()[HOST] == pytest.approx(1 / PAUSA[1])
+
+
+def test_retry_after_bloquea_el_host(tmp_path):
+    limitador = crear(tmp_path)
+    limitador.esperar(HOST, PAUSA)
+    limitador.observar(HOST, 429, 0.1, retry_after='120')
+    assert limitador.esperar(HOST, PAUSA) == pytest.approx(0.12, abs=0.02)
+
+
+def test_la_tasa_aprendida_se_conserva_entre_corridas(tmp_path):
+    limitador = crear(tmp_path)
+    limitador.esperar(HOST, PAUSA)
+    for _ in range(5):
+        limitador.observar(HOST, 200, 0.1)
+    aprendida = limitador.tasas()[HOST]
+    limitador.guardar()
+
+    siguiente = crear(tmp_path)
+    siguiente.esperar(HOST, PAUSA)
+    assert siguiente.tasas()[HOST] == pytest.approx(aprendida, abs=1e-4)
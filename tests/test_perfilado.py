@@ -0,0 +1,54 @@
+import threading
+
+import perfilado
+from perfilado import Perfilador
+
+
+def trabajar():
+    return sum(i * i for i in range(20000))
+
+
+def test_fases_concurrentes_no_fallan(tmp_path):
+    perfilador = Perfilador('prueba', str(tmp_path / 'perfiles'))
+    errores = []
+    largada = threading.Barrier(4)
+
+    def en_hilo():
+        try:
+            largada.wait()
+            for _ in range(5):
+                with perfilador.fase('descarga'):
+                    trabajar()
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=en_hilo) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    largada.wait()
+    with perfilador.fase('combinacion'):
+        trabajar()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert getattr(perfilador._local, 'activa', None) is None
+    perfilador.escribir()
+    # Sólo se perfila el hilo principal
+    assert (tmp_path / 'perfiles' / 'combinacion.prof').exists()
+    assert not (tmp_path / 'perfiles' / 'descarga.prof').exists()
+
+
+def test_sin_cpu_si_otro_perfilador_esta_activo(tmp_path, monkeypatch):
+    def ocupado(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(perfilado.cProfile.Profile, 'enable', ocupado)
+    perfilador = Perfilador('prueba', str(tmp_path / 'perfiles'))
+    for _ in range(2):
+        with perfilador.fase('parseo'):
+            trabajar()
+    assert getattr(perfilador._local, 'activa', None) is None
+    perfilador.escribir()
+    assert not (tmp_path / 'perfiles' / 'parseo.prof').exists()
+    assert 'Fase parseo: 2 ejecuciones' in (tmp_path / 'perfiles' / 'memoria.txt').read_text(encoding='utf-8')
@@ -0,0 +1,114 @@
+import tracemalloc
+
+import pytest
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+import scrape_sesiones
+from scrape_sesiones import RangeTooLargeError, TransientWebserviceError
+
+
+class ClienteQueFalla:
+    def __init__(self, error):
+        self.error = error
+
+    def post(self, url, **kwargs):
+        raise self.error
+
+
+@pytest.mark.parametrize('error, esperado', [
+    (requests.ReadTimeout('lectura'), RangeTooLargeError),
+    (requests.ConnectionError(ReadTimeoutError(None, None, 'lectura del cuerpo')), RangeTooLargeError),
+    (requests.ConnectTimeout('conexión'), TransientWebserviceError),
+    (requests.ConnectionError('host inalcanzable'), TransientWebserviceError),
+])
+def test_solo_las_demoras_de_lectura_cuentan_como_rango_grande(monkeypatch, error, esperado):
+    monkeypatch.setattr(scrape_sesiones, 'obtener_cliente', lambda: ClienteQueFalla(error))
+    with pytest.raises(TransientWebserviceError) as info:
+        scrape_sesiones.fetch_sessions('01/01/2024', '31/12/2024', timeout=5)
+    assert type(info.value) is esperado
+
+
+class ServidorRangos:
+    """Responde los rangos de hasta `maximo` días; los demás no responden a tiempo"""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self.pedidos = []
+
+    def __call__(self, desde, hasta, timeout, max_bytes=None):
+        dias = (scrape_sesiones.normalize_date(hasta)[1] - scrape_sesiones.normalize_date(desde)[1]).days + 1
+        self.pedidos.append(dias)
+        if dias > self.maximo:
+            raise RangeTooLargeError("no respondió a tiempo")
+        return []
+
+
+def correr(monkeypatch, ruta, servidor, dias=8, reintentos=0):
+    monkeypatch.setattr(scrape_sesiones, 'fetch_sessions', servidor)
+    monkeypatch.setattr(scrape_sesiones.time, 'sleep', lambda segundos: None)
+    fetcher = scrape_sesiones.AdaptiveFetcher(timeout=30, retries=reintentos, state_path=str(ruta))
+    inicio = scrape_sesiones.datetime(2024, 1, 1)
+    try:
+        for desde, hasta in fetcher.plan(inicio, inicio + scrape_sesiones.timedelta(days=dias - 1)):
+            fetcher.fetch(desde, hasta)
+    finally:
+        fetcher.save()
+    return scrape_sesiones.cargar_json(str(ruta), {})
+
+
+def test_rango_dividido_recuerda_la_falla(monkeypatch, tmp_path):
+    estado = correr(monkeypatch, tmp_path / 'rangos.json', ServidorRangos(maximo=4))
+    assert estado['failed_days'] == 8
+    assert estado['chunk_days'] < 8
+
+
+def test_falla_de_un_dia_no_es_de_tamanio(monkeypatch, tmp_path):
+    with pytest.raises(scrape_sesiones.WebserviceError):
+        correr(monkeypatch, tmp_path / 'rangos.json', ServidorRangos(maximo=0), dias=1)
+    assert 'failed_days' not in scrape_sesiones.cargar_json(str(tmp_path / 'rangos.json'), {})
+
+
+def test_el_tamanio_vuelve_a_crecer_despues_de_corridas_sin_fallas(monkeypatch, tmp_path):
+    ruta = tmp_path / 'rangos.json'
+    hoy = scrape_sesiones.datetime.now().strftime('%Y-%m-%d')
+    scrape_sesiones.guardar_json(str(ruta), {'chunk_days': 1, 'failed_days': 2, 'failed_on': hoy})
+
+    tamanios = []
+    for _ in range(scrape_sesiones.CORRIDAS_PARA_OLVIDAR_FALLA + 2):
+        estado = correr(monkeypatch, ruta, ServidorRangos(maximo=366))
+        tamanios.append(estado['chunk_days'])
+
+    assert 'failed_days' not in estado
+    assert tamanios[-1] > tamanios[0] == 1
+
+
+def respuesta(cantidad):
+    yield b'<?xml version="1.0" encoding="utf-8"?><DataSet xmlns="http://tempuri.org/"><NewDataSet>'
+    for numero in range(cantidad):
+        yield (b'<sesiones><id_sesion_lp>%d</id_sesion_lp><fch_sesion_lp>2013-02-27</fch_sesion_lp>'
+               b'<dsc_sesion_tipo>ORDINARIA</dsc_sesion_tipo></sesiones>' % numero)
+    yield b'</NewDataSet></DataSet>'
+
+
+def pico_de_memoria(cantidad):
+    tracemalloc.start()
+    try:
+        leidas = sum(1 for _ in scrape_sesiones.decode_sessions(respuesta(cantidad)))
+        return leidas, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_decodificar_no_acumula_las_sesiones_en_el_arbol():
+    leidas, pico_chico = pico_de_memoria(1000)
+    assert leidas == 1000
+    leidas, pico_grande = pico_de_memoria(20000)
+    assert leidas == 20000
+    assert pico_grande < 2 * pico_chico
+
+
+def test_decodificar_sesion_anidada():
+    sesion, = scrape_sesiones.decode_sessions(respuesta(1))
+    assert (sesion.id_sesion_lp, sesion.fecha, sesion.dsc_sesion_tipo) == ('0', '2013-02-27', 'ORDINARIA')
+    assert sesion.url_detalle.endswith('/0')
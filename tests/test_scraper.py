@@ -0,0 +1,112 @@
+import csv
+import os
+
+import pytest
+
+import scraper
+from bitacora import leer_bitacora
+from estado import ruta_estado
+
+COMISIONES = [
+    {'orden': '1', 'nombre': 'Agricultura', 'codigo': 'cagyp', 'url': '', 'tipo': '', 'horario': '',
+     'secretario': '', 'sede_contacto': '', 'fecha_extraccion': '2024-01-01'},
+    {'orden': '2', 'nombre': 'Cultura', 'codigo': 'ccultura', 'url': '', 'tipo': '', 'horario': '',
+     'secretario': '', 'sede_contacto': '', 'fecha_extraccion': '2024-01-01'},
+]
+
+
+class SitioFalso:
+    """Páginas de integrantes y reuniones; las claves de `caidas` fallan al descargarse"""
+
+    def __init__(self, caidas=()):
+        self.caidas = set(caidas)
+        self.pedidas = []
+
+    def integrantes(self, codigo, nombre, estricto=False):
+        self.pedidas.append(f"{codigo}|integrantes|")
+        if f"{codigo}|integrantes|" in self.caidas:
+            raise RuntimeError("HTTP 503")
+        return [{'comision_codigo': codigo, 'comision_nombre': nombre, 'codigo_diputado': f"{codigo}-1",
+                 'nombre_completo': 'Diputada Uno', 'cargo': 'Vocal', 'bloque': 'B', 'distrito': 'D'}]
+
+    def reuniones(self, codigo, nombre, anio, estricto=False):
+        self.pedidas.append(f"{codigo}|reuniones|{anio}")
+        if f"{codigo}|reuniones|{anio}" in self.caidas:
+            raise RuntimeError("HTTP 503")
+        return [{'comision_nombre': nombre, 'comision_codigo': codigo, 'id_reunion': f"{anio}-1",
+                 'fecha': f"10/03/{anio}", 'anio': anio, 'texto': '', 'url': '', 'fecha_extraccion': ''}]
+
+
+@pytest.fixture
+def sitio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sitio = SitioFalso()
+    monkeypatch.setattr(scraper, 'obtener_comisiones', lambda: [dict(c) for c in COMISIONES])
+    monkeypatch.setattr(scraper, 'obtener_integrantes_comision', sitio.integrantes)
+    monkeypatch.setattr(scraper, 'obtener_reuniones_anio', sitio.reuniones)
+    monkeypatch.setattr(scraper, 'ANIO_INICIAL', scraper.datetime.now().year - 1)
+    return sitio
+
+
+def leer(nombre_archivo):
+    with open(nombre_archivo, encoding='utf-8', newline='') as archivo:
+        return list(csv.DictReader(archivo))
+
+
+def test_unidad_fallida_conserva_la_bitacora_y_se_completa_con_resume(sitio):
+    anio = scraper.datetime.now().year
+    sitio.caidas = {f"ccultura|reuniones|{anio}"}
+
+    assert scraper.recorrer(scraper.parse_args([])) == 1
+    ruta = ruta_estado(scraper.ARCHIVO_BITACORA)
+    assert os.path.exists(ruta)
+    _, completadas = leer_bitacora(ruta)
+    assert f"ccultura|reuniones|{anio}" not in completadas
+    assert f"cagyp|reuniones|{anio}" in completadas
+
+    sitio.caidas = set()
+    sitio.pedidas = []
+    assert scraper.recorrer(scraper.parse_args(['--resume'])) == 0
+    assert sitio.pedidas == [f"ccultura|reuniones|{anio}"]
+    assert not os.path.exists(ruta)
+    reuniones = {(r['comision_codigo'], r['id_reunion']) for r in leer(scraper.ARCHIVO_REUNIONES)}
+    assert ('ccultura', f"{anio}-1") in reuniones
+
+
+def test_corrida_completa_borra_la_bitacora(sitio):
+    assert scraper.recorrer(scraper.parse_args([])) == 0
+    assert not os.path.exists(ruta_estado(scraper.ARCHIVO_BITACORA))
+
+
+def test_almacenamiento_incremental_no_duplica_reuniones(sitio):
+    assert scraper.recorrer(scraper.parse_args(['--almacenamiento', 'incremental'])) == 0
+    assert scraper.recorrer(scraper.parse_args(['--almacenamiento', 'incremental'])) == 0
+    claves = [scraper.clave_reunion(r) for r in leer(scraper.ARCHIVO_REUNIONES)]
+    assert len(claves) == len(set(claves)) == 2 * len(COMISIONES)
+
+
+@pytest.mark.parametrize('almacenamiento', ['completo', 'sqlite'])
+def test_integrantes_que_fallan_no_parten_los_periodos(sitio, monkeypatch, almacenamiento):
+    anio = scraper.datetime.now().year
+    dia = {'actual': 10}
+
+    class FechaFija(scraper.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(anio, 1, dia['actual'])
+
+    monkeypatch.setattr(scraper, 'datetime', FechaFija)
+    opciones = ['--almacenamiento', almacenamiento]
+
+    assert scraper.recorrer(scraper.parse_args(opciones)) == 0
+    dia['actual'] = 11
+    sitio.caidas = {'ccultura|integrantes|'}
+    assert scraper.recorrer(scraper.parse_args(opciones)) == 1
+    periodos = [fila for fila in leer(scraper.ARCHIVO_INTEGRANTES) if fila['comision_codigo'] == 'ccultura']
+    assert [(p['fecha_inicio'], p['fecha_fin']) for p in periodos] == [(f"{anio}-01-10", f"{anio}-01-10")]
+
+    dia['actual'] = 12
+    sitio.caidas = set()
+    assert scraper.recorrer(scraper.parse_args(opciones)) == 0
+    periodos = [fila for fila in leer(scraper.ARCHIVO_INTEGRANTES) if fila['comision_codigo'] == 'ccultura']
+    assert [(p['fecha_inicio'], p['fecha_fin']) for p in periodos] == [(f"{anio}-01-10", f"{anio}-01-12")]
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Modo vigilancia: corre los scrapers de forma continua en un único proceso.
+
+Cada fuente (diputados, legiscaba, sesiones) se vuelve a consultar con su propio
+intervalo: se acorta (x FACTOR_CON_CAMBIOS) cuando la corrida encontró cambios y se
+alarga (x FACTOR_SIN_CAMBIOS) cuando no, entre un mínimo y un máximo por fuente. El
+cliente HTTP compartido se conserva entre corridas, con sus conexiones abiertas, la
+caché (y los resultados ya extraídos de cada página) en memoria y el ritmo aprendido
+de cada host.
+
+Los cambios que detecta cada corrida (filas agregadas, eliminadas y modificadas de cada
+CSV, ver csv_comun.py) se emiten como eventos: una línea JSON por archivo cambiado en
+.estado/eventos.jsonl (o en --eventos) y, con --webhook, un POST con el mismo JSON. Si
+una corrida falla se emite un evento de error y la fuente se reintenta más tarde.
+
+El intervalo y la próxima consulta de cada fuente se guardan en .estado/vigilancia.json,
+así al reiniciar el proceso se respeta la agenda.
+
+Uso:
+    python vigilancia.py
+    python -m scrappertown vigilar --fuentes sesiones,diputados --webhook http://localhost:8000/eventos
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime
+
+from estado import cargar_json, guardar_json, ruta_estado
+
+ARCHIVO_VIGILANCIA = 'vigilancia.json'
+ARCHIVO_EVENTOS = 'eventos.jsonl'
+
+HORA = 3600
+
+# Fuente -> (opciones del scraper, intervalo inicial, mínimo y máximo en segundos)
+FUENTES = {
+    'diputados': ([], 6 * HORA, HORA, 24 * HORA),
+    'legiscaba': ([], 12 * HORA, 2 * HORA, 48 * HORA),
+    'sesiones': (['--formato', 'csv', '--salida', 'sesiones_legislatura.csv'], 2 * HORA, HORA // 2, 24 * HORA),
+}
+
+FACTOR_CON_CAMBIOS = 0.5
+FACTOR_SIN_CAMBIOS = 1.5
+
+# Filas de cada tipo de cambio que se incluyen en un evento
+MAX_FILAS_EVENTO = 50
+
+
+def ahora_iso():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class Fuente:
+    """Un scraper vigilado y su agenda"""
+
+    def __init__(self, nombre, opciones, intervalo, minimo, maximo, proxima=None):
+        self.nombre = nombre
+        self.opciones = list(opciones)
+        self.minimo = minimo
+        self.maximo = maximo
+        self.intervalo = min(maximo, max(minimo, intervalo))
+        # Sin agenda previa se consulta apenas arranca la vigilancia
+        self.proxima = proxima if proxima is not None else time.time()
+
+    def reprogramar(self, hubo_cambios):
+        factor = FACTOR_CON_CAMBIOS if hubo_cambios else FACTOR_SIN_CAMBIOS
+        self.intervalo = min(self.maximo, max(self.minimo, self.intervalo * factor))
+        self.proxima = time.time() + self.intervalo
+
+    def estado(self):
+        return {'intervalo': round(self.intervalo), 'proxima': round(self.proxima)}
+
+
+def eventos_de_cambios(fuente, resumen):
+    """Un evento por cada archivo que cambió en la corrida (ver RegistroCambios.resumen)"""
+    fecha = ahora_iso()
+    for archivo, datos in resumen['archivos'].items():
+        yield {
+            'tipo': 'cambios',
+            'fecha': fecha,
+            'fuente': fuente,
+            'archivo': archivo,
+            'agregadas': datos['total_agregadas'],
+            'eliminadas': datos['total_eliminadas'],
+            'modificadas': datos['total_modificadas'],
+            'filas': {tipo: datos[tipo][:MAX_FILAS_EVENTO] for tipo in ('agregadas', 'eliminadas', 'modificadas')},
+        }
+
+
+class EmisorEventos:
+    """Escribe los eventos en un archivo JSONL y, si se indica, los envía a un webhook"""
+
+    def __init__(self, ruta, webhook=None):
+        self.ruta = ruta
+        self.webhook = webhook
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+
+    def emitir(self, evento):
+        with open(self.ruta, 'a', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(evento, ensure_ascii=False) + '\n')
+        if self.webhook:
+            from cliente_http import obtener_cliente
+
+            try:
+                response = obtener_cliente().post(self.webhook, json=evento, timeout=(5, 10))
+                if response.status_code >= 400:
+                    print(f"[vigilancia] El webhook respondió {response.status_code}", file=sys.stderr)
+            except Exception as e:
+                print(f"[vigilancia] No se pudo enviar el evento al webhook: {e}", file=sys.stderr)
+
+
+def correr_fuente(fuente, emisor):
+    """Ejecuta una vez el scraper de la fuente, emite sus cambios y devuelve si hubo alguno"""
+    from csv_comun import obtener_cambios
+    from scrappertown import cargar_scraper
+
+    inicio = datetime.now()
+    print(f"[vigilancia] {ahora_iso()} consultando {fuente.nombre}", file=sys.stderr)
+    try:
+        codigo = cargar_scraper(fuente.nombre).main(list(fuente.opciones))
+        error = f"terminó con código {codigo}" if isinstance(codigo, int) and codigo else None
+    except (Exception, SystemExit) as e:
+        error = f"{type(e).__name__}: {e}"
+
+    # El registro de cambios es el de esta corrida sólo si el scraper llegó a reiniciarlo
+    registro = obtener_cambios()
+    resumen = registro.resumen() if registro.scraper == fuente.nombre and registro.inicio >= inicio else None
+    eventos = list(eventos_de_cambios(fuente.nombre, resumen)) if resumen else []
+    for evento in eventos:
+        emisor.emitir(evento)
+    if error:
+        emisor.emitir({'tipo': 'error', 'fecha': ahora_iso(), 'fuente': fuente.nombre, 'error': error})
+
+    print(f"[vigilancia] {fuente.nombre}: {len(eventos)} archivos con cambios"
+          f"{'; ' + error if error else ''}", file=sys.stderr)
+    return bool(eventos)
+
+
+def cargar_fuentes(nombres, ruta_estado_vigilancia):
+    guardado = cargar_json(ruta_estado_vigilancia, {}) or {}
+    fuentes = []
+    for nombre in nombres:
+        opciones, intervalo, minimo, maximo = FUENTES[nombre]
+        previo = guardado.get(nombre, {})
+        fuentes.append(Fuente(nombre, opciones, previo.get('intervalo', intervalo), minimo, maximo,
+                              previo.get('proxima')))
+    return fuentes
+
+
+def guardar_fuentes(fuentes, ruta_estado_vigilancia):
+    guardado = cargar_json(ruta_estado_vigilancia, {}) or {}
+    guardado.update({fuente.nombre: fuente.estado() for fuente in fuentes})
+    guardar_json(ruta_estado_vigilancia, guardado)
+
+
+def vigilar(fuentes, emisor, ruta_estado_vigilancia, una_vez=False):
+    """
+    Consulta cada fuente cuando le toca, hasta que se interrumpa el proceso. Con
+    una_vez=True consulta todas una sola vez, sin esperar.
+    """
+    from cliente_http import obtener_cliente
+
+    pendientes = list(fuentes)
+    while pendientes:
+        fuente = min(pendientes, key=lambda f: f.proxima)
+        espera = fuente.proxima - time.time()
+        if espera > 0 and not una_vez:
+            print(f"[vigilancia] próxima consulta: {fuente.nombre} a las "
+                  f"{datetime.fromtimestamp(fuente.proxima).strftime('%Y-%m-%d %H:%M')}", file=sys.stderr)
+            time.sleep(espera)
+
+        fuente.reprogramar(correr_fuente(fuente, emisor))
+        # Lo aprendido se guarda después de cada corrida, por si el proceso se corta
+        obtener_cliente().guardar_estado()
+        guardar_fuentes(fuentes, ruta_estado_vigilancia)
+        if una_vez:
+            pendientes.remove(fuente)
+
+
+def interpretar_fuentes(texto):
+    nombres = [nombre.strip() for nombre in texto.split(',') if nombre.strip()]
+    desconocidas = [nombre for nombre in nombres if nombre not in FUENTES]
+    if not nombres or desconocidas:
+        raise argparse.ArgumentTypeError(
+            f"fuentes inválidas {', '.join(desconocidas) or texto!r}; opciones: {', '.join(FUENTES)}"
+        )
+    return nombres
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Corre los scrapers de forma continua, cada uno con su intervalo adaptativo, "
+                    "y emite eventos con los cambios que detectan."
+    )
+    parser.add_argument(
+        "--fuentes",
+        type=interpretar_fuentes,
+        default=list(FUENTES),
+        help=f"Fuentes a vigilar, separadas por coma. Default: {','.join(FUENTES)}.",
+    )
+    parser.add_argument(
+        "--eventos",
+        help=f"Archivo JSONL donde se agregan los eventos. Default: {ARCHIVO_EVENTOS} en el directorio de estado.",
+    )
+    parser.add_argument(
+        "--webhook",
+        help="URL a la que se envía cada evento con un POST JSON (por ejemplo, un servicio local).",
+    )
+    parser.add_argument(
+        "--una-vez",
+        action="store_true",
+        help="Consulta cada fuente una vez, sin esperar su horario, y termina.",
+    )
+    return parser.parse_args(argv)
+
+
+def detener(numero_senal, marco):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ruta_estado_vigilancia = ruta_estado(ARCHIVO_VIGILANCIA)
+    emisor = EmisorEventos(args.eventos or ruta_estado(ARCHIVO_EVENTOS), args.webhook)
+    fuentes = cargar_fuentes(args.fuentes, ruta_estado_vigilancia)
+
+    # SIGTERM (por ejemplo, de systemd o docker stop) termina igual que Ctrl+C
+    signal.signal(signal.SIGTERM, detener)
+    print(f"[vigilancia] vigilando {', '.join(args.fuentes)}; eventos en {emisor.ruta}", file=sys.stderr)
+    try:
+        vigilar(fuentes, emisor, ruta_estado_vigilancia, una_vez=args.una_vez)
+    except KeyboardInterrupt:
+        print("[vigilancia] detenida", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())